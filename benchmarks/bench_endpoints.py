@@ -0,0 +1,270 @@
+"""Per-endpoint latency and allocation benchmark on synthetic trips, with a regression gate.
+
+Seeds trips of each size from synthetic_trip.py into the trip store and
+drives the itinerary endpoints through Flask's test client (no network, no
+Claude calls). Timings and tracemalloc allocations are measured in separate
+passes, so tracing does not inflate the latencies.
+
+    python benchmarks/bench_endpoints.py [--days 1 7 14 30 60] [--activities 8] [--todos 3]
+        [--iterations 50] [--repeat 3] [--history benchmarks/endpoint_history.json]
+        [--baseline benchmarks/endpoint_baseline.json] [--update-baseline] [--threshold 0.25]
+
+Every run is appended to the history file. With a baseline present, the run
+fails (exit 1) when an endpoint's p50 latency or peak allocation grows by
+more than --threshold over the baseline for the same trip size, ignoring
+differences below --min-delta-ms / --min-delta-kb as noise. Latencies only
+compare between runs on the same otherwise idle machine, so record the
+baseline where the gate runs; allocations are stable anywhere.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from bench_flow import load_app, percentile
+from synthetic_trip import make_parameters, make_trip
+
+DEFAULT_HISTORY = os.path.join(BENCH_DIR, "endpoint_history.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "endpoint_baseline.json")
+
+
+def seed_trip(app, trip, days):
+    """Stores a synthetic trip and returns a test client whose session points at it."""
+    from utils.trip_store import get_trip_store
+
+    store = get_trip_store()
+    trip_id = store.new_id()
+    store.save(trip_id, trip)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["trip_id"] = trip_id
+        session["trip_parameters"] = make_parameters(days)
+    return client
+
+
+def scenarios(trip):
+    """(name, request function, setup function or None) triples.
+
+    Both functions get the client and the iteration number; setup runs before
+    each request, outside the timed and traced region.
+    """
+    activities = [activity for day in trip for activity in day["activities"]]
+
+    def pick(n):
+        return activities[n % len(activities)]["id"]
+
+    def toggle_todo(client, n):
+        # Bumps the trip version, so the next read rebuilds the payload
+        client.post("/api/trip/todos/save", json={"activityId": pick(n), "todos": [], "eventConfirmed": n % 2})
+
+    etags = {}
+
+    def events_revalidated(client, n):
+        # Nothing edits the trip during this scenario, so one ETag stays current
+        if client not in etags:
+            etags[client] = client.get("/api/trip/events").headers["ETag"]
+        return client.get("/api/trip/events", headers={"If-None-Match": etags[client]})
+
+    def modify(client, n):
+        # Same times, so every iteration edits a trip of the same shape
+        activity = activities[n % len(activities)]
+        return client.post(f"/api/trip/event/{activity['id']}/modify", json={
+            "title": f"Edited {n}",
+            "start_time": activity["start_time"],
+            "end_time": activity["end_time"],
+            "location": activity["location"],
+            "cost": n % 90
+        })
+
+    def save_todos(client, n):
+        return client.post("/api/trip/todos/save", json={
+            "activityId": pick(n),
+            "todos": [{"text": f"Todo {n}-{i}", "completed": bool(i % 2)} for i in range(3)],
+            "eventConfirmed": True
+        })
+
+    def get_events(client, n):
+        return client.get("/api/trip/events")
+
+    def get_itinerary(client, n):
+        return client.get("/itinerary")
+
+    def get_todos(client, n):
+        return client.get("/todos")
+
+    return [
+        ("GET /api/trip/events", get_events, None),
+        ("GET /api/trip/events (after edit)", get_events, toggle_todo),
+        ("GET /api/trip/events (304)", events_revalidated, None),
+        ("POST /api/trip/event/<id>/modify", modify, None),
+        ("POST /api/trip/todos/save", save_todos, None),
+        ("GET /itinerary", get_itinerary, None),
+        ("GET /itinerary (after edit)", get_itinerary, toggle_todo),
+        ("GET /todos", get_todos, None),
+        ("GET /todos (after edit)", get_todos, toggle_todo)
+    ]
+
+
+def run_scenario(client, fn, iterations, warmup, repeat, setup=None):
+    for n in range(warmup):
+        if setup:
+            setup(client, n)
+        response = fn(client, n)
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    # The quietest of `repeat` rounds, as timeit does: noise only ever adds time
+    latencies = None
+    for _ in range(repeat):
+        round_latencies = []
+        for n in range(iterations):
+            if setup:
+                setup(client, n)
+            start = time.perf_counter()
+            fn(client, n)
+            round_latencies.append(time.perf_counter() - start)
+        round_latencies.sort()
+        if latencies is None or percentile(round_latencies, 50) < percentile(latencies, 50):
+            latencies = round_latencies
+
+    # Allocations in a separate, shorter pass: tracing slows every allocation down
+    peaks, nets = [], []
+    tracemalloc.start()
+    try:
+        for n in range(max(1, iterations // 5)):
+            if setup:
+                setup(client, n)
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn(client, n)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            nets.append(current - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "count": iterations,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "peak_kb": sum(peaks) / len(peaks) / 1024,
+        "retained_kb": sum(nets) / len(nets) / 1024
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_delta_ms, min_delta_kb):
+    """Returns a line per (size, endpoint, metric) that regressed against the baseline."""
+    regressions = []
+    for size, endpoints in results.items():
+        for name, row in endpoints.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            for metric, min_delta in (("p50_ms", min_delta_ms), ("peak_kb", min_delta_kb)):
+                old, new = base[metric], row[metric]
+                if new > old * (1 + threshold) and new - old > min_delta:
+                    regressions.append(
+                        f"{size} days, {name}: {metric} {old:.2f} -> {new:.2f} (+{(new / old - 1) * 100 if old else 0:.0f}%)"
+                    )
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'days':>4}  {'endpoint':36} {'mean':>9} {'p50':>9} {'p95':>9} {'peak':>10} {'retained':>10}")
+    for size, endpoints in results.items():
+        for name, row in endpoints.items():
+            print(f"{size:>4}  {name:36} {row['mean_ms']:7.2f}ms {row['p50_ms']:7.2f}ms {row['p95_ms']:7.2f}ms "
+                  f"{row['peak_kb']:8.1f}KB {row['retained_kb']:8.1f}KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[1, 7, 14, 30, 60], help="trip sizes to run")
+    parser.add_argument("--activities", type=int, default=8, help="activities per day")
+    parser.add_argument("--todos", type=int, default=3, help="todos per activity")
+    parser.add_argument("--iterations", type=int, default=50, help="timed requests per endpoint and size")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="timing rounds per endpoint; the fastest is kept")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON file every run is appended to")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="JSON file of results to gate against")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative growth, 0.25 = 25%%")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore p50 changes smaller than this")
+    parser.add_argument("--min-delta-kb", type=float, default=16.0, help="ignore peak changes smaller than this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_endpoints_")
+    # Nothing here calls Claude; the base URL only has to be well-formed
+    app = load_app("http://127.0.0.1:9", workdir)
+
+    results = {}
+    for days in args.days:
+        trip = make_trip(days, args.activities, args.todos)
+        client = seed_trip(app, trip, days)
+        results[str(days)] = {
+            name: run_scenario(client, fn, args.iterations, args.warmup, args.repeat, setup)
+            for name, fn, setup in scenarios(trip)
+        }
+        print(f"{days} days x {args.activities} activities done")
+    print_report(results)
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {key: getattr(args, key) for key in ("days", "activities", "todos", "iterations", "repeat")},
+        "results": results
+    }
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            history = json.load(f)
+    history.append(run)
+    with open(args.history, "w") as f:
+        json.dump(history, f, indent=1)
+
+    status = 0
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(run, f, indent=1)
+        print(f"\nBaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["config"]["activities"] != args.activities or baseline["config"]["todos"] != args.todos:
+            print("\n⚠️ Baseline was recorded with a different trip shape; comparing anyway")
+        regressions = compare(results, baseline["results"], args.threshold, args.min_delta_ms, args.min_delta_kb)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against baseline {baseline.get('revision')}:")
+            for line in regressions:
+                print(f"  {line}")
+            status = 1
+        else:
+            print(f"\nNo regressions beyond {args.threshold:.0%} against baseline {baseline.get('revision')}")
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""End-to-end throughput benchmark against a local fake Messages API.
+
+Boots the Flask app on a local port with ANTHROPIC_BASE_URL pointed at
+fake_anthropic.py, then runs virtual users concurrently through the full
+plan -> suggestions -> select -> itinerary -> edit flow and reports
+p50/p95/p99 latency and requests/sec per endpoint.
+
+    python benchmarks/bench_flow.py [--users 8] [--iterations 3] [--latency 0.2] [--stream]
+
+Each virtual user sends a distinct trip description so the LLM response cache
+only helps when --repeat-input is given.
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from werkzeug.serving import make_server
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_anthropic import add_arguments, server_from_args
+
+START_DATE = "2025-06-01"
+END_DATE = "2025-06-03"
+
+
+def load_app(base_url, workdir):
+    """Imports flask-trip-planner.py with its stores and the LLM backend pointed at local resources."""
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+    os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+    os.environ.setdefault("FLASK_SECRET_KEY", "bench")
+    os.environ.setdefault("TRIP_STORE", "memory")
+    os.environ.setdefault("JOB_BACKEND", "memory")
+    os.environ.setdefault("LLM_CACHE_PATH", os.path.join(workdir, "llm_cache.db"))
+    os.environ.setdefault("DESTINATION_INDEX_PATH", os.path.join(workdir, "destinations.db"))
+    os.environ.setdefault("JINJA_BYTECODE_CACHE", os.path.join(workdir, "jinja_cache"))
+    os.environ.setdefault("LLM_BACKOFF_BASE", "0.05")
+    sys.path.insert(0, ROOT_DIR)
+    spec = importlib.util.spec_from_file_location("flask_trip_planner", os.path.join(ROOT_DIR, "flask-trip-planner.py"))
+    module = importlib.util.module_from_spec(spec)
+    # Flask finds templates/ and static/ through the module's entry in sys.modules
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    """Collects per-endpoint latencies from all virtual users."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, elapsed, ok=True):
+        with self._lock:
+            self.latencies[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+
+    def summary(self, wall_time):
+        rows = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            rows[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "rps": len(values) / wall_time if wall_time else 0.0,
+                "mean_ms": sum(values) / len(values) * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000
+            }
+        return rows
+
+
+class FlowError(Exception):
+    pass
+
+
+class VirtualUser:
+    """One browser session walking the planner flow with its own cookie jar."""
+
+    def __init__(self, base_url, recorder, args, user_id):
+        self.client = httpx.Client(base_url=base_url, timeout=args.timeout)
+        self.recorder = recorder
+        self.args = args
+        self.user_id = user_id
+
+    def request(self, name, method, url, expect=(200,), **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(name, time.perf_counter() - start, ok=False)
+            raise FlowError(f"{name}: {e}") from e
+        ok = response.status_code in expect
+        self.recorder.record(name, time.perf_counter() - start, ok=ok)
+        if not ok:
+            raise FlowError(f"{name}: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def wait(self, name, poll):
+        """Polls until `poll()` returns a value; records the total wait as a flow step."""
+        start = time.perf_counter()
+        deadline = start + self.args.timeout
+        while time.perf_counter() < deadline:
+            result = poll()
+            if result is not None:
+                self.recorder.record(name, time.perf_counter() - start)
+                return result
+            time.sleep(self.args.poll_interval)
+        self.recorder.record(name, time.perf_counter() - start, ok=False)
+        raise FlowError(f"{name}: timed out")
+
+    def run_flow(self, iteration):
+        description = "Museums, food and a little nightlife"
+        if not self.args.repeat_input:
+            description += f" (traveller {self.user_id}, trip {iteration})"
+
+        # Plan
+        self.request("POST /api/trip", "POST", "/api/trip", expect=(202,), json={
+            "startLocation": "New York", "endLocation": "Paris",
+            "startDate": START_DATE, "endDate": END_DATE,
+            "budget": "3000", "peopleCount": "2",
+            "naturalLanguageInput": description
+        })
+
+        # Suggestions: slots arrive progressively, so also time the first one
+        suggestions_start = time.perf_counter()
+        first_seen = []
+
+        def poll_suggestions():
+            response = self.request("GET /api/suggestions", "GET", "/api/suggestions", expect=(200, 202))
+            data = response.json()
+            if data.get("suggestions") and not first_seen:
+                first_seen.append(True)
+                self.recorder.record("flow: first suggestion", time.perf_counter() - suggestions_start)
+            if response.status_code == 200:
+                return data["suggestions"]
+            return None
+
+        suggestions = self.wait("flow: suggestions ready", poll_suggestions)
+        if not suggestions:
+            raise FlowError("no suggestions returned")
+
+        self.request("POST /api/suggestions/alternative", "POST", "/api/suggestions/alternative", json={
+            "rejected": suggestions[0],
+            "previous_suggestions": [s["title"] for s in suggestions]
+        })
+
+        # Select: the main option of every slot
+        selected = [s for s in suggestions if s["option_index"] == 0]
+        if self.args.stream:
+            self.select_streaming(selected)
+        else:
+            job_id = self.request("POST /api/suggestions/select", "POST", "/api/suggestions/select",
+                                  expect=(202,), json={"selected_activities": selected}).json()["job_id"]
+
+            def poll_job():
+                status = self.request("GET /api/jobs/<id>", "GET", f"/api/jobs/{job_id}").json()["status"]
+                if status == "failed":
+                    raise FlowError("itinerary job failed")
+                return status if status == "done" else None
+
+            self.wait("flow: itinerary ready", poll_job)
+
+        # Itinerary
+        self.request("GET /itinerary", "GET", "/itinerary")
+        response = self.request("GET /api/trip/events", "GET", "/api/trip/events")
+        events = response.json()["events"]
+        self.request("GET /api/trip/events (304)", "GET", "/api/trip/events", expect=(304,),
+                     headers={"If-None-Match": response.headers["ETag"]})
+
+        # Edit
+        first, second = events[0], events[1]
+        self.request("POST /api/trip/event/<id>/modify", "POST", f"/api/trip/event/{first['id']}/modify",
+                     json={"title": first["title"] + " (booked)", "start_time": first["start_time"],
+                           "end_time": first["end_time"], "location": first["location"], "cost": first["cost"]})
+        self.request("POST /api/trip/event/add", "POST", "/api/trip/event/add", json={
+            "day_date": START_DATE, "title": "Coffee break", "start_time": "4:00 PM",
+            "end_time": "4:30 PM", "location": "Paris", "cost": 8
+        })
+        self.request("POST /api/trip/events/batch", "POST", "/api/trip/events/batch", json={"operations": [
+            {"op": "confirm", "id": first["id"]},
+            {"op": "todos", "id": second["id"], "todos": [{"text": "Book tickets", "completed": True}]}
+        ]})
+        self.request("GET /todos", "GET", "/todos")
+
+    def select_streaming(self, selected):
+        start = time.perf_counter()
+        first_day = None
+        done = False
+        try:
+            with self.client.stream("POST", "/api/suggestions/select/stream",
+                                    json={"selected_activities": selected}) as response:
+                event = None
+                for line in response.iter_lines():
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                        if event == "day" and first_day is None:
+                            first_day = time.perf_counter() - start
+                        elif event == "error":
+                            break
+                        elif event == "done":
+                            done = True
+        except httpx.HTTPError as e:
+            raise FlowError(f"select/stream: {e}") from e
+        finally:
+            elapsed = time.perf_counter() - start
+            self.recorder.record("POST /api/suggestions/select/stream", elapsed, ok=done)
+            if first_day is not None:
+                self.recorder.record("flow: first streamed day", first_day)
+        if not done:
+            raise FlowError("select/stream: stream ended without a done event")
+
+    def run(self, iterations):
+        failures = []
+        for iteration in range(iterations):
+            start = time.perf_counter()
+            try:
+                self.run_flow(iteration)
+                self.recorder.record("flow: total", time.perf_counter() - start)
+            except FlowError as e:
+                self.recorder.record("flow: total", time.perf_counter() - start, ok=False)
+                failures.append(str(e))
+        self.client.close()
+        return failures
+
+
+def print_report(rows, wall_time, flows):
+    print(f"\n{'endpoint':40} {'count':>6} {'err':>4} {'req/s':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in rows.items():
+        print(f"{name:40} {row['count']:6d} {row['errors']:4d} {row['rps']:8.2f} "
+              f"{row['mean_ms']:7.1f}ms {row['p50_ms']:7.1f}ms {row['p95_ms']:7.1f}ms {row['p99_ms']:7.1f}ms")
+    print(f"\n{flows} flows in {wall_time:.2f}s ({flows / wall_time:.2f} flows/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=3, help="flows per user")
+    parser.add_argument("--stream", action="store_true", help="use /api/suggestions/select/stream")
+    parser.add_argument("--repeat-input", action="store_true",
+                        help="send identical trip descriptions so repeat flows hit the LLM cache")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request and per-wait timeout")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_flow_")
+    fake = server_from_args(args)
+    fake_url = fake.start()
+    app = load_app(fake_url, workdir)
+    # Per-request access logs would drown out the report
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    app_url = f"http://127.0.0.1:{server.server_port}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"App on {app_url}, fake Messages API on {fake_url}")
+
+    recorder = Recorder()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [
+            pool.submit(VirtualUser(app_url, recorder, args, user_id).run, args.iterations)
+            for user_id in range(args.users)
+        ]
+        failures = [failure for future in futures for failure in future.result()]
+    wall_time = time.perf_counter() - start
+
+    client_stats = httpx.get(f"{app_url}/api/llm-client/stats").json()
+    cache_stats = httpx.get(f"{app_url}/api/llm-cache/stats").json()
+    server.shutdown()
+    fake.stop()
+
+    rows = recorder.summary(wall_time)
+    flows = args.users * args.iterations
+    print_report(rows, wall_time, flows)
+    print(f"fake API: {fake.stats['requests']} requests, {fake.stats['errors_injected']} injected errors, "
+          f"{fake.stats['streamed']} streamed, by response {fake.stats['by_response']}")
+    print(f"llm client: {json.dumps(client_stats)}")
+    print(f"llm cache: {json.dumps(cache_stats)}")
+    if failures:
+        print(f"\n{len(failures)} failed flows, first: {failures[0]}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({
+                "config": {key: value for key, value in vars(args).items() if key != "json_path"},
+                "wall_time": wall_time,
+                "flows": flows,
+                "failed_flows": len(failures),
+                "endpoints": rows,
+                "fake_api": fake.stats,
+                "llm_client": client_stats,
+                "llm_cache": cache_stats
+            }, f, indent=2)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
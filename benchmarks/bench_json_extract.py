@@ -0,0 +1,104 @@
+"""Benchmarks utils.json_extract against the old regex-based extractor.
+
+Runs every recorded response in json_extract_corpus.json through both
+extractors, whole and fed in small streaming chunks, and reports throughput
+and how many responses each one handled correctly: parsed, or for entries
+with an "expected" value, returned exactly that (null for responses that
+must be left to the model repair pass).
+
+    python benchmarks/bench_json_extract.py [--rounds 200] [--chunk-size 16]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_extract import JsonExtractor, extract_json
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_extract_corpus.json")
+
+
+def legacy_extract(response_text):
+    """The regex extractor previously in flask-trip-planner.py, minus its logging."""
+    match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', response_text, re.DOTALL)
+    if match:
+        json_str = match.group(1).strip()
+    else:
+        match = re.search(r'(\{[\s\S]*\})', response_text, re.DOTALL)
+        json_str = match.group(1) if match else response_text
+    try:
+        return json.loads(json_str)
+    except json.JSONDecodeError:
+        try:
+            return json.loads(json_str.replace("'", '"'))
+        except json.JSONDecodeError:
+            return None
+
+
+def new_extract(response_text, chunk_size=None):
+    extractor = JsonExtractor()
+    if chunk_size:
+        for i in range(0, len(response_text), chunk_size):
+            extractor.feed(response_text[i:i + chunk_size])
+    else:
+        extractor.feed(response_text)
+    return extractor.result(), extractor.repaired
+
+
+def time_it(fn, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            fn(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH) as f:
+        corpus = json.load(f)
+    texts = [entry["text"] for entry in corpus]
+    total_mb = sum(len(text.encode("utf-8")) for text in texts) * args.rounds / 1e6
+
+    print(f"{'response':34} {'legacy':>8} {'new':>8} {'repaired':>9}")
+    legacy_ok = new_ok = repaired = 0
+    def correct(entry, data):
+        if "expected" in entry:
+            return data == entry["expected"]
+        return data is not None
+
+    for entry in corpus:
+        old = correct(entry, legacy_extract(entry["text"]))
+        data, was_repaired = new_extract(entry["text"])
+        new = correct(entry, data) and correct(entry, extract_json(entry["text"]))
+        legacy_ok += old
+        new_ok += new
+        repaired += data is not None and was_repaired
+        print(f"{entry['name']:34} {'ok' if old else 'FAIL':>8} {'ok' if new else 'FAIL':>8} "
+              f"{'yes' if data is not None and was_repaired else '':>9}")
+
+    print()
+    print(f"correct: legacy {legacy_ok}/{len(corpus)}, new {new_ok}/{len(corpus)} "
+          f"(repair rate {repaired}/{len(corpus)})")
+
+    for label, fn in [
+        ("legacy regex", legacy_extract),
+        ("extract_json (fast path)", extract_json),
+        ("new, whole text", new_extract),
+        (f"new, {args.chunk_size}-char chunks", lambda text: new_extract(text, args.chunk_size))
+    ]:
+        elapsed = time_it(fn, texts, args.rounds)
+        print(f"{label:28} {total_mb / elapsed:8.2f} MB/s  "
+              f"{elapsed / (args.rounds * len(texts)) * 1e6:8.1f} us/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""A local stand-in for the Anthropic Messages API, for offline benchmarks.
+
+Serves POST /v1/messages (plain and `stream: true`) from recorded responses in
+fake_anthropic_responses.json, with configurable latency, token rate and
+error injection. Point the app at it with ANTHROPIC_BASE_URL.
+
+    python benchmarks/fake_anthropic.py [--port 8765] [--latency 0.5] [--tokens-per-second 80]
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPONSES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_anthropic_responses.json")
+
+# Rough chars-per-token ratio for Claude's tokenizer on English/JSON text
+CHARS_PER_TOKEN = 4
+
+
+def load_responses(path=RESPONSES_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+class FakeAnthropicServer:
+    """Threaded HTTP server replaying recorded Messages API responses.
+
+    Each recorded response has a `match` substring; the first one found in the
+    request's system prompt or last user message is replayed, the last entry
+    is the fallback.
+    Latency is applied before the first byte, the token rate paces the body,
+    and `error_rate` of requests fail with `error_status` instead.
+    """
+
+    def __init__(self, responses=None, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 tokens_per_second=None, error_rate=0.0, error_status=529, retry_after=None,
+                 chunk_tokens=4, seed=None):
+        self.responses = responses if responses is not None else load_responses()
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.chunk_tokens = chunk_tokens
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "streamed": 0, "errors_injected": 0, "by_response": {}}
+
+        fake = self
+
+        class Handler(_MessagesHandler):
+            server_fake = fake
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _count_response(self, response_name, streamed=False):
+        with self._lock:
+            if streamed:
+                self.stats["streamed"] += 1
+            by_response = self.stats["by_response"]
+            by_response[response_name] = by_response.get(response_name, 0) + 1
+
+    def _roll(self):
+        with self._lock:
+            return self._random.random()
+
+    def pick_response(self, prompt):
+        for entry in self.responses:
+            if entry.get("match") and entry["match"] in prompt:
+                return entry
+        return self.responses[-1]
+
+    def first_byte_delay(self):
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def token_delay(self, tokens):
+        return tokens / self.tokens_per_second if self.tokens_per_second else 0.0
+
+
+def _text(content):
+    """Flattens a system prompt or message content (string or text blocks) to a string."""
+    if not content:
+        return ""
+    if isinstance(content, str):
+        return content
+    return "\n".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+class _MessagesHandler(BaseHTTPRequestHandler):
+    server_fake = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        fake = self.server_fake
+        if self.path.split("?")[0] != "/v1/messages":
+            self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": "Not found"}})
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        fake._count("requests")
+
+        time.sleep(fake.first_byte_delay())
+        if fake.error_rate and fake._roll() < fake.error_rate:
+            fake._count("errors_injected")
+            self._send_error(fake)
+            return
+
+        messages = body.get("messages") or [{}]
+        prompt = "\n".join(
+            _text(part) for part in (body.get("system"), messages[-1].get("content"))
+        )
+        entry = fake.pick_response(prompt)
+        fake._count_response(entry.get("name", "unnamed"), streamed=bool(body.get("stream")))
+
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "claude-3-opus-20240229"),
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": max(1, len(prompt) // CHARS_PER_TOKEN),
+                "output_tokens": max(1, len(entry["text"]) // CHARS_PER_TOKEN)
+            }
+        }
+        if body.get("stream"):
+            self._stream(fake, message, entry["text"])
+        else:
+            time.sleep(fake.token_delay(message["usage"]["output_tokens"]))
+            message["content"] = [{"type": "text", "text": entry["text"]}]
+            self._send_json(200, message)
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, fake):
+        error_type = {429: "rate_limit_error", 529: "overloaded_error"}.get(fake.error_status, "api_error")
+        headers = {"retry-after": str(fake.retry_after)} if fake.retry_after is not None else None
+        self._send_json(fake.error_status, {
+            "type": "error",
+            "error": {"type": error_type, "message": "Injected by fake_anthropic"}
+        }, headers)
+
+    def _event(self, name, payload):
+        data = f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+        # Chunked transfer encoding so keep-alive clients see where the stream ends
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, fake, message, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        output_tokens = message["usage"]["output_tokens"]
+        start = dict(message, content=[], stop_reason=None, usage=dict(message["usage"], output_tokens=1))
+        self._event("message_start", {"type": "message_start", "message": start})
+        self._event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+        })
+        self._event("ping", {"type": "ping"})
+
+        step = fake.chunk_tokens * CHARS_PER_TOKEN
+        for i in range(0, len(text), step):
+            time.sleep(fake.token_delay(fake.chunk_tokens))
+            self._event("content_block_delta", {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": text[i:i + step]}
+            })
+
+        self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._event("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": output_tokens}
+        })
+        self._event("message_stop", {"type": "message_stop"})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def add_arguments(parser):
+    """Registers the fake server's knobs on an argparse parser (shared with bench_flow.py)."""
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random latency")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0,
+                        help="output token rate; 0 sends the body at once")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=529)
+    parser.add_argument("--retry-after", type=float, default=None, help="retry-after header on injected errors")
+    parser.add_argument("--responses", default=RESPONSES_PATH, help="recorded responses JSON file")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def server_from_args(args, port=0):
+    return FakeAnthropicServer(
+        responses=load_responses(args.responses),
+        port=port,
+        latency=args.latency,
+        jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second or None,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, port=args.port)
+    print(f"Fake Messages API listening on {server.base_url}")
+    print(f"  export ANTHROPIC_BASE_URL={server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Synthetic itineraries for benchmarks: any number of days x activities x todos.
+
+The output has the shape the trip store keeps (Trip.to_list()), with times,
+costs, categories and locations varied enough to exercise sorting, the
+budget ledger and conflict detection.
+
+    python benchmarks/synthetic_trip.py [--days 30] [--activities 8] [--todos 3] [--seed 0] > trip.json
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import date, timedelta
+
+CATEGORIES = ("Sightseeing", "Dining", "Museum", "Outdoors", "Shopping", "Nightlife", "Transportation")
+PLACES = ("Old Town", "Harbour", "Cathedral Square", "Central Market", "Riverside", "Castle Hill", "Museum Quarter")
+TODO_TEXTS = ("Book tickets", "Check opening hours", "Bring passport", "Reserve a table", "Pack sunscreen",
+              "Download offline map", "Confirm pickup time")
+FIRST_START = 8 * 60
+LAST_END = 23 * 60
+
+
+def _clock(minutes):
+    hours, mins = divmod(minutes, 60)
+    return f"{hours % 12 or 12}:{mins:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def make_trip(days, activities=8, todos=3, seed=0, destination="Lisbon", start_date="2025-06-01"):
+    """Returns a list of day dicts with `activities` activities each, `todos` todos per activity."""
+    rng = random.Random(seed)
+    first = date.fromisoformat(start_date)
+    # Activities share the day evenly; some run over into the next slot to produce conflicts
+    slot = max(30, (LAST_END - FIRST_START) // max(1, activities))
+    trip = []
+    for day_index in range(days):
+        day_activities = []
+        for i in range(activities):
+            start = FIRST_START + i * slot + rng.choice((0, 0, 15))
+            end = min(LAST_END, start + rng.randint(slot // 2, slot + 30))
+            category = rng.choice(CATEGORIES)
+            day_activities.append({
+                "id": f"d{day_index + 1}a{i + 1}",
+                "title": f"{category} at {rng.choice(PLACES)} #{day_index + 1}.{i + 1}",
+                "start_time": _clock(start),
+                "end_time": _clock(end),
+                "location": f"{rng.choice(PLACES)}, {destination}",
+                "cost": round(rng.uniform(0, 120), 2),
+                "category": category,
+                "todos": [
+                    {"text": rng.choice(TODO_TEXTS), "completed": rng.random() < 0.3}
+                    for _ in range(todos)
+                ]
+            })
+        trip.append({
+            "day": day_index + 1,
+            "date": (first + timedelta(days=day_index)).isoformat(),
+            "location": destination,
+            "activities": day_activities,
+            "daily_budget": 250
+        })
+    return trip
+
+
+def make_parameters(days, destination="Lisbon", start_date="2025-06-01"):
+    """Trip parameters matching make_trip(), as the planner keeps them in the session."""
+    first = date.fromisoformat(start_date)
+    return {
+        "start_location": "Madrid",
+        "end_location": destination,
+        "start_date": start_date,
+        "end_date": (first + timedelta(days=days - 1)).isoformat(),
+        "budget": str(250 * days),
+        "people_count": "2",
+        "natural_language_input": "synthetic benchmark trip"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--activities", type=int, default=8, help="activities per day")
+    parser.add_argument("--todos", type=int, default=3, help="todos per activity")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    json.dump(make_trip(args.days, args.activities, args.todos, args.seed), sys.stdout, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,35 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response, stream_with_context
 import os
+import logging
 import json
-import re
 import uuid
+import hashlib
 from dotenv import load_dotenv
-import anthropic
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from utils.session_utils import save_trip_to_session, get_trip_from_session, get_or_create_trip_id, get_trip_etag
+from utils.llm_cache import get_response_cache, make_cache_key
+from utils.stream_utils import format_sse
+from utils.json_extract import JsonExtractor, extract_json, extract_json_from_claude
+from utils.trip_model import Trip
+from utils.view_cache import ViewCache
+from utils.trip_ops import apply_operation, apply_batch, check_times, OperationError, MAX_BATCH_OPERATIONS
+from utils.trip_store import get_trip_store
+from utils.jobs import get_job_queue, DONE, FAILED
+from utils.llm_client import get_client_stats
+from utils.model_router import route_message, route_stream, get_route, get_router_stats
+from utils.prompts import get_prompt
+from utils.scheduler import schedule_activities, MAX_TRIP_DAYS
+from utils.alternatives import AlternativesPool
+from utils.single_flight import SingleFlight
+from utils.budget import budget_report
+from utils.compact_session import CompactSessionInterface
+from utils.compression import StaticAssets, compress_variants, precompressed_response
+from utils.conflicts import find_conflicts, trip_conflicts
+from utils.destinations import mentions_destination, get_destination_index
+from utils import metrics
 
 # Load environment variables
 load_dotenv()
@@ -14,45 +38,81 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 if not ANTHROPIC_API_KEY:
     raise ValueError("❌ Error: ANTHROPIC_API_KEY is missing! Check your .env file.")
 
+# Before app.logger is first used, so Flask does not add a second handler of its own
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="[%(asctime)s] %(levelname)s in %(name)s: %(message)s")
+
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY") or os.urandom(24).hex()
-
-
-def extract_json_from_claude(response_text):
-    """Extracts JSON from Claude responses and ensures it is valid."""
-    # Look for JSON in markdown code blocks
-    match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', response_text, re.DOTALL)
-    
-    if match:
-        json_str = match.group(1).strip()  # Extract JSON block
-    else:
-        # Try to find JSON-like content with curly braces
-        match = re.search(r'(\{[\s\S]*\})', response_text, re.DOTALL)
-        if match:
-            json_str = match.group(1)
-        else:
-            json_str = response_text  # Assume raw JSON if no wrapper detected
-    
-    try:
-        return json.loads(json_str)  # Parse JSON safely
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON Parsing Error: {e}")
-        print(f"❌ Raw Response: {response_text}")  
-        
-        # Attempt to fix common JSON errors
-        try:
-            # Replace single quotes with double quotes if needed
-            fixed_json = json_str.replace("'", '"')
-            return json.loads(fixed_json)
-        except:
-            # If all parsing attempts fail
-            return None
+# Compact session cookies that are only rewritten when their content changes
+if os.getenv("SESSION_COMPACT", "1") == "1":
+    app.session_interface = CompactSessionInterface(
+        sample_rate=float(os.getenv("SESSION_METRIC_SAMPLE_RATE", 0.01))
+    )
+metrics.init_app(app)
+# Static files are served precompressed behind content-hashed URLs with long-lived cache headers
+static_assets = StaticAssets(app)
+
+# Compiled templates are kept on disk so a cold worker skips Jinja's parse/compile step; "" disables it.
+# Relative paths are taken from the app directory, not the working directory.
+JINJA_BYTECODE_CACHE = os.getenv("JINJA_BYTECODE_CACHE", os.path.join(app.instance_path, "jinja_cache"))
+if JINJA_BYTECODE_CACHE:
+    JINJA_BYTECODE_CACHE = os.path.join(app.root_path, JINJA_BYTECODE_CACHE)
+    os.makedirs(JINJA_BYTECODE_CACHE, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_BYTECODE_CACHE)
+
+# Fan-out trip planning: split the trip into chunks of days generated concurrently
+TRIP_PLAN_FAN_OUT = os.getenv("TRIP_PLAN_FAN_OUT", "0") == "1"
+TRIP_PLAN_CHUNK_DAYS = int(os.getenv("TRIP_PLAN_CHUNK_DAYS", 1))
+TRIP_PLAN_FAN_OUT_WORKERS = int(os.getenv("TRIP_PLAN_FAN_OUT_WORKERS", 4))
+
+# Alternatives are pre-generated per suggestion slot so "replace" is served from memory
+ALTERNATIVES_PREFETCH = os.getenv("ALTERNATIVES_PREFETCH", "1") == "1"
+ALTERNATIVES_PER_SLOT = int(os.getenv("ALTERNATIVES_PER_SLOT", 3))
+
+# Malformed JSON that local repair cannot fix is sent to a small model (the json_repair route)
+LLM_JSON_REPAIR = os.getenv("LLM_JSON_REPAIR", "1") == "1"
+
+# Identical suggestion requests in flight at the same time share one Claude call;
+# waiters give up and call Claude themselves after this many seconds
+SUGGESTIONS_COALESCE_TIMEOUT = float(os.getenv("SUGGESTIONS_COALESCE_TIMEOUT", 90))
+
+# Generated activities are stored per destination; well-covered destinations get
+# their suggestions from the local index instead of Claude (see utils/destinations.py)
+DESTINATION_INDEX = os.getenv("DESTINATION_INDEX", "1") == "1"
+
+# Final itinerary layout: "local" scheduler only, "polish" (local draft refined by Claude), or "llm"
+ITINERARY_SCHEDULER = os.getenv("ITINERARY_SCHEDULER", "local").lower()
+if ITINERARY_SCHEDULER not in ("local", "polish", "llm"):
+    raise ValueError(f"❌ Error: Unknown ITINERARY_SCHEDULER '{ITINERARY_SCHEDULER}'")
+
+# Formatted /api/trip/events and /api/trip/budget bodies, keyed by trip ETag
+events_view_cache = ViewCache(max_entries=int(os.getenv("EVENTS_VIEW_CACHE_SIZE", 256)))
+budget_view_cache = ViewCache(max_entries=int(os.getenv("BUDGET_VIEW_CACHE_SIZE", 256)))
+# Rendered /itinerary and /todos pages (precompressed) keyed by trip ETag, and their
+# per-day fragments keyed by day content, so an edit re-renders only the day it touched
+page_view_cache = ViewCache(max_entries=int(os.getenv("PAGE_VIEW_CACHE_SIZE", 128)))
+fragment_cache = ViewCache(max_entries=int(os.getenv("FRAGMENT_CACHE_SIZE", 4096)))
+
+
+def template_version():
+    """Fingerprint of templates/ and static/, so page ETags change when either is deployed."""
+    digest = hashlib.md5()
+    for folder in (app.template_folder, app.static_folder):
+        root = os.path.join(app.root_path, folder)
+        for directory, _, filenames in sorted(os.walk(root)):
+            for filename in sorted(filenames):
+                stat = os.stat(os.path.join(directory, filename))
+                digest.update(f"{directory}/{filename}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+    return digest.hexdigest()[:8]
+
+
+TEMPLATE_VERSION = template_version()
 
 
 def validate_trip_data(json_data):
-    """Validates and standardizes the trip data structure."""
+    """Validates and standardizes the trip data structure into a Trip model."""
     if not json_data:
-        return []
+        return Trip()
         
     # Handle if it's already a list of days
     if isinstance(json_data, list):
@@ -62,44 +122,139 @@ def validate_trip_data(json_data):
         days = json_data["days"]
     else:
         print("❌ Error: JSON format is incorrect. Expected 'days' as a list.")
-        return []
+        return Trip()
     
-    # Validate and standardize each day
-    standardized_days = []
-    for day_index, day in enumerate(days):
-        if not isinstance(day, dict):
-            continue
-            
-        std_day = {
-            "day": day.get("day", day_index + 1),
-            "date": day.get("date", ""),
-            "location": day.get("location", "TBD"),
-            "activities": [],
-            "daily_budget": day.get("daily_budget", 0)
-        }
-        
-        # Validate activities
-        if "activities" in day and isinstance(day["activities"], list):
-            for activity in day["activities"]:
-                if not isinstance(activity, dict):
-                    continue
-                    
-                std_activity = {
-                    "title": activity.get("title", "Untitled Activity"),
-                    "start_time": activity.get("start_time", "TBD"),
-                    "end_time": activity.get("end_time", "TBD"),
-                    "location": activity.get("location", std_day["location"]),
-                    "cost": float(activity.get("cost", 0))
-                }
-                std_day["activities"].append(std_activity)
-                
-        standardized_days.append(std_day)
-    
-    return standardized_days
+    # Days and activities are standardized (defaults, float costs, IDs, time order) by the model
+    trip = Trip.from_list(days)
+    conflicts = trip_conflicts(trip)
+    if conflicts:
+        overlaps = sum(conflict["type"] == "overlap" for conflict in conflicts)
+        app.logger.warning("Itinerary has %d overlapping and %d tightly packed activities", overlaps, len(conflicts) - overlaps)
+    return trip
+
+
+def _cache_keys(operation, system, prompt, temperature, max_tokens):
+    """Response cache key per model of the operation's route, in route order."""
+    return {
+        model: make_cache_key(model, system, prompt, temperature, max_tokens)
+        for model in get_route(operation).models
+    }
+
+
+def _cached_response(operation, cache_keys):
+    """The cached text for the first of the route's models that has one, or None."""
+    cached = get_response_cache().get(*cache_keys.values())
+    metrics.llm_cache_lookups.inc(operation=operation, result="miss" if cached is None else "hit")
+    if cached is not None:
+        app.logger.info("Serving Claude response from cache")
+    return cached
+
+
+def _cache_response(cache_keys, details, text, cacheable):
+    """Caches `text` under the model that wrote it, unless it was cut off at max_tokens or fails `cacheable`."""
+    key = cache_keys.get(details.get("model"))
+    if key is None or details.get("stop_reason") == "max_tokens":
+        return
+    if cacheable is None or cacheable(text):
+        get_response_cache().put(key, text)
+
+
+def call_claude(prompt, system=None, max_tokens=4000, temperature=0.7, cacheable=None,
+                operation="other"):
+    """Returns Claude's response text, served from the response cache when possible.
+
+    `operation` picks the model route (see utils/model_router.py). Responses are
+    cached per answering model, and only when complete and `cacheable(text)` is
+    truthy, so truncated or malformed completions are never replayed to other users.
+    """
+    cache_keys = _cache_keys(operation, system, prompt, temperature, max_tokens)
+    cached = _cached_response(operation, cache_keys)
+    if cached is not None:
+        return cached
+
+    request_args = {
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if system:
+        request_args["system"] = system
+    details = {}
+    response = route_message(operation, details=details, **request_args)
+    text = response.content[0].text
+
+    _cache_response(cache_keys, details, text, cacheable)
+    return text
+
+
+def stream_claude(prompt, system=None, max_tokens=4000, temperature=0.7, cacheable=None,
+                  operation="other"):
+    """Yields Claude's response text as it streams in. Cached responses are yielded whole."""
+    cache_keys = _cache_keys(operation, system, prompt, temperature, max_tokens)
+    cached = _cached_response(operation, cache_keys)
+    if cached is not None:
+        yield cached
+        return
+
+    request_args = {
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    if system:
+        request_args["system"] = system
+
+    chunks = []
+    details = {}
+    for text in route_stream(operation, details=details, **request_args):
+        chunks.append(text)
+        yield text
+
+    _cache_response(cache_keys, details, "".join(chunks), cacheable)
+
 
+def parse_claude_json(response_text):
+    """extract_json_from_claude(), with a small-model repair pass when local repair finds nothing."""
+    data = extract_json_from_claude(response_text)
+    if data is not None or not LLM_JSON_REPAIR or not response_text.strip():
+        return data
 
-def generate_trip_plan(natural_input, parameters, use_test_data=False):
-    """Calls Claude AI to generate a structured trip plan including travel logistics.""" 
+    prompt = get_prompt("json_repair").render(
+        units=len(response_text) // 400,
+        response=response_text
+    )
+    try:
+        response = route_message(
+            "json_repair",
+            max_tokens=prompt.max_tokens,
+            temperature=0,
+            system=prompt.system,
+            messages=[{"role": "user", "content": prompt.prompt}]
+        )
+    except Exception as e:
+        app.logger.error("Error repairing JSON: %s", e)
+        return None
+    return extract_json_from_claude(response.content[0].text)
+
+
+def has_json_key(key):
+    """Builds a `cacheable` predicate accepting responses whose JSON contains `key`.
+
+    Uses extract_json() so a bad response is counted and logged once, by the
+    caller's own parse, not again here.
+    """
+    def check(text):
+        data = extract_json(text)
+        return isinstance(data, dict) and key in data
+    return check
+
+
+def generate_trip_plan(natural_input, parameters, use_test_data=False, fan_out=None):
+    """Calls Claude AI to generate a structured trip plan including travel logistics.
+
+    With `fan_out` (default: TRIP_PLAN_FAN_OUT) the trip is split into chunks of
+    TRIP_PLAN_CHUNK_DAYS days that are generated concurrently and merged.
+    """
     
     if use_test_data:
         print("⚡ Using test JSON instead of Claude API") 
@@ -140,175 +295,287 @@ def generate_trip_plan(natural_input, parameters, use_test_data=False):
         # Default to a 3-day trip if date parsing fails
         start_date = datetime.now()
         trip_duration = 3
-    
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-
-    prompt = f"""
-    You are a professional travel planner creating a detailed, realistic travel itinerary.
-
-    **TASK**: 
-    Create a JSON-formatted travel itinerary from {parameters['start_location']} to {parameters['end_location']} 
-    based on the user's request: "{natural_input}"
-
-    **ITINERARY REQUIREMENTS**:
-    - Trip starts on {parameters['start_date']} and ends on {parameters['end_date']}
-    - Budget: ${parameters['budget']} total for {parameters['people_count']} traveler(s)
-    - Include realistic transportation from {parameters['start_location']} to {parameters['end_location']}
-    - Include local attractions, food options, and activities at {parameters['end_location']}
-    - Every activity must include: title, start time, end time, location, and estimated cost
-    - Every day must include: day number, date (YYYY-MM-DD), location, and a list of activities
-
-    **IMPORTANT TRAVEL PLANNING GUIDELINES**:
-    1. Research realistic travel times between {parameters['start_location']} and {parameters['end_location']}
-    2. Consider the appropriate mode of transportation (flight, train, car, etc.)
-    3. Include check-in/check-out times for accommodations
-    4. Plan meals at appropriate times
-    5. Allow sufficient time between activities
-    6. Distribute the budget realistically across transportation, accommodation, food, and activities
-    7. Include popular tourist attractions and local experiences
-
-    **FORMAT YOUR RESPONSE AS VALID JSON ONLY**:
-    ```json
-    {{
-      "destination": "{parameters['end_location']}",
-      "budget": {parameters['budget']},
-      "travelers": {parameters['people_count']},
-      "start_date": "{parameters['start_date']}",
-      "end_date": "{parameters['end_date']}",
-      "days": [
-        {{
-          "day": 1,
-          "date": "{start_date.strftime('%Y-%m-%d')}",
-          "location": "{parameters['start_location']}",
-          "activities": [
-            {{
-              "title": "Flight from {parameters['start_location']} to {parameters['end_location']}",
-              "start_time": "10:00 AM",
-              "end_time": "2:00 PM",
-              "location": "{parameters['start_location']} International Airport",
-              "cost": 700
-            }}
-          ],
-          "daily_budget": 1000
-        }}
-      ]
-    }}
-    ```
-    """
+
+    if fan_out is None:
+        fan_out = TRIP_PLAN_FAN_OUT
+    if fan_out and trip_duration > TRIP_PLAN_CHUNK_DAYS:
+        return generate_trip_plan_fan_out(natural_input, parameters, start_date, trip_duration)
+
+    prompt = get_prompt("trip_plan").render(
+        units=trip_duration,
+        start_location=parameters['start_location'],
+        end_location=parameters['end_location'],
+        start_date=parameters['start_date'],
+        end_date=parameters['end_date'],
+        trip_days=trip_duration,
+        budget=parameters['budget'],
+        people_count=parameters['people_count'],
+        natural_input=natural_input
+    )
 
     try:
-        response = client.messages.create(
-            model="claude-3-opus-20240229",  # Updated to correct model name
-            max_tokens=4000,
+        response_text = call_claude(
+            prompt.prompt,
+            system=prompt.system,
+            max_tokens=prompt.max_tokens,
             temperature=0.7,
-            system="You are a travel planning assistant that creates detailed, realistic travel itineraries with accurate transportation times, costs, and activities.",
-            messages=[{"role": "user", "content": prompt}]
+            cacheable=has_json_key("days"),
+            operation="trip_plan"
         )
 
-        json_data = extract_json_from_claude(response.content[0].text)
+        json_data = parse_claude_json(response_text)
         return validate_trip_data(json_data)
 
     except Exception as e:
         print(f"❌ Error calling Claude API: {e}")
+        return Trip()
+
+
+def generate_trip_plan_fan_out(natural_input, parameters, start_date, trip_duration):
+    """Generates each chunk of days with its own Claude call and merges them in day order."""
+    chunks = []
+    for first_day in range(1, trip_duration + 1, TRIP_PLAN_CHUNK_DAYS):
+        last_day = min(first_day + TRIP_PLAN_CHUNK_DAYS - 1, trip_duration)
+        dates = [
+            (start_date + timedelta(days=day_number - 1)).strftime("%Y-%m-%d")
+            for day_number in range(first_day, last_day + 1)
+        ]
+        chunks.append((first_day, dates))
+
+    app.logger.info("Generating %d days in %d parallel chunks", trip_duration, len(chunks))
+
+    def run_chunk(chunk):
+        first_day, dates = chunk
+        try:
+            prompt = build_day_chunk_prompt(natural_input, parameters, first_day, dates, trip_duration)
+            response_text = call_claude(
+                prompt.prompt,
+                system=prompt.system,
+                max_tokens=prompt.max_tokens,
+                temperature=0.7,
+                cacheable=has_json_key("days"),
+                operation="trip_plan_chunk"
+            )
+            days = validate_trip_data(parse_claude_json(response_text))
+        except Exception as e:
+            app.logger.error("Error generating days %d-%d: %s", first_day, first_day + len(dates) - 1, e)
+            return None
+
+        if len(days) != len(dates):
+            app.logger.error("Expected %d days from chunk starting at day %d, got %d", len(dates), first_day, len(days))
+            return None
+
+        # Pin numbering and dates to the chunk so the merge is always in order
+        for offset, day in enumerate(days):
+            day.day = first_day + offset
+            day.date = dates[offset]
+        return days.days
+
+    with ThreadPoolExecutor(max_workers=TRIP_PLAN_FAN_OUT_WORKERS) as executor:
+        results = list(executor.map(run_chunk, chunks))
+
+    if any(result is None for result in results):
+        return Trip()
+
+    return Trip([day for days in results for day in days])
+
+
+def build_day_chunk_prompt(natural_input, parameters, first_day, dates, trip_duration):
+    """Renders the prompt for one fan-out chunk of consecutive trip days."""
+    last_day = first_day + len(dates) - 1
+    try:
+        daily_budget = float(parameters['budget']) / trip_duration
+    except (TypeError, ValueError, ZeroDivisionError):
+        daily_budget = 0
+
+    notes = []
+    if first_day == 1:
+        notes.append(f"- Day 1 is the arrival day: include transportation from {parameters['start_location']} to {parameters['end_location']} and accommodation check-in")
+    if last_day == trip_duration:
+        notes.append(f"- Day {trip_duration} is the final day: include check-out and the return trip to {parameters['start_location']}")
+    if not notes:
+        notes.append(f"- These are full days at {parameters['end_location']}; do not include long-distance travel")
+
+    return get_prompt("trip_plan_chunk").render(
+        units=len(dates),
+        trip_duration=trip_duration,
+        start_location=parameters['start_location'],
+        end_location=parameters['end_location'],
+        first_day=first_day,
+        last_day=last_day,
+        dates=", ".join(dates),
+        daily_budget=daily_budget,
+        people_count=parameters['people_count'],
+        notes="\n".join(notes),
+        natural_input=natural_input
+    )
+
+
+suggestions_flight = SingleFlight("suggestions", timeout=SUGGESTIONS_COALESCE_TIMEOUT)
+
+
+def _normalized(value):
+    return " ".join(str(value or "").split()).lower()
+
+
+def suggestions_flight_key(parameters):
+    """The inputs of the suggestions prompt, whitespace- and case-normalized so only equivalent requests match."""
+    return tuple(
+        _normalized(parameters.get(name))
+        for name in ('end_location', 'start_date', 'end_date', 'budget', 'people_count', 'natural_language_input')
+    )
+
+
+def generate_trip_suggestions(parameters, on_slot=None):
+    """Generates activity suggestions, sharing the result with identical requests already in flight.
+
+    `on_slot(suggestions_so_far)` is called as each time slot is parsed, by the
+    request that actually calls Claude; coalesced requests only get the result.
+    """
+    return suggestions_flight.do(
+        suggestions_flight_key(parameters), _generate_trip_suggestions, parameters, on_slot
+    )
+
+
+def suggestion_slot_count(parameters):
+    """Returns (trip_days, time slots to generate): two slots a day."""
+    try:
+        start_date = datetime.strptime(parameters['start_date'], "%Y-%m-%d")
+        end_date = datetime.strptime(parameters['end_date'], "%Y-%m-%d")
+        trip_days = (end_date - start_date).days + 1
+    except:
+        trip_days = 2  # Default to 2 days worth
+    return trip_days, trip_days * 2
+
+
+# Keys a suggestion slot and each of its options need before they can be shown
+SUGGESTION_SLOT_KEYS = ("category", "best_time", "options")
+SUGGESTION_OPTION_KEYS = ("title", "description", "duration", "cost", "location")
+
+
+def format_suggestion_slot(slot_index, slot):
+    """Flattens one time slot from Claude into the frontend's suggestion entries.
+
+    Slots and options missing a required key (a partial answer) are skipped.
+    """
+    if not isinstance(slot, dict) or any(key not in slot for key in SUGGESTION_SLOT_KEYS):
         return []
+    return [
+        {
+            "id": f"sug_{slot_index}_{j}",
+            "title": option["title"],
+            "description": option["description"],
+            "duration": option["duration"],
+            "cost": option["cost"],
+            "category": slot["category"],
+            "location": option["location"],
+            "best_time": slot["best_time"],
+            "slot_index": slot_index,
+            "option_index": j
+        }
+        for j, option in enumerate(slot["options"])
+        if isinstance(option, dict) and all(key in option for key in SUGGESTION_OPTION_KEYS)
+    ]
+
+
+def remember_activities(parameters, activities):
+    """Adds generated suggestions or alternatives to the destination index."""
+    if not DESTINATION_INDEX or not activities:
+        return
+    try:
+        get_destination_index().add(parameters['end_location'], activities)
+    except Exception as e:
+        app.logger.warning("Could not update destination index: %s", e)
 
 
-def generate_trip_suggestions(parameters):
-    """Generates high-level activity suggestions with alternatives."""
+def suggestions_from_index(parameters, suggestions_count, on_slot=None):
+    """Suggestions retrieved from the destination index, or None when the destination is not well covered."""
+    try:
+        budget_per_person = float(parameters['budget']) / max(1, int(parameters['people_count']))
+    except (KeyError, TypeError, ValueError):
+        budget_per_person = None
+    try:
+        data = get_destination_index().suggest(
+            parameters['end_location'],
+            suggestions_count,
+            budget_per_person=budget_per_person,
+            preferences=parameters.get('natural_language_input') or "",
+            seed=repr(suggestions_flight_key(parameters))
+        )
+    except Exception as e:
+        app.logger.warning("Destination index lookup failed: %s", e)
+        return None
+    if data is None:
+        return None
+
+    formatted_suggestions = []
+    for i, slot in enumerate(data["time_slots"]):
+        formatted_suggestions.extend(format_suggestion_slot(i, slot))
+        if on_slot:
+            on_slot(list(formatted_suggestions))
+    return formatted_suggestions
+
+
+def _generate_trip_suggestions(parameters, on_slot=None):
+    """Generates high-level activity suggestions with alternatives, streaming them slot by slot."""
     try:
         print("⚡ Starting suggestion generation...")
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        
-        # Calculate slots needed
-        try:
-            start_date = datetime.strptime(parameters['start_date'], "%Y-%m-%d")
-            end_date = datetime.strptime(parameters['end_date'], "%Y-%m-%d")
-            trip_days = (end_date - start_date).days + 1
-            suggestions_count = trip_days * 2  # 2 activities per day
-        except:
-            suggestions_count = 4  # Default to 2 days worth
         
+        trip_days, suggestions_count = suggestion_slot_count(parameters)
+        if DESTINATION_INDEX:
+            indexed = suggestions_from_index(parameters, suggestions_count, on_slot)
+            if indexed:
+                app.logger.info("Served %d suggestions from the destination index", len(indexed))
+                return indexed
+
         print(f"📅 Generating {suggestions_count} time slots with alternatives...")
         
-        prompt = f"""
-        Generate exactly {suggestions_count} activity suggestions for tourists visiting {parameters['end_location']}.
-        Each activity should have ONE alternative option (total of {suggestions_count * 2} activities).
-
-        Trip Details:
-        - Location: {parameters['end_location']}
-        - Duration: {trip_days} days ({suggestions_count} activities needed)
-        - Budget: ${parameters['budget']} total for {parameters['people_count']} people
-        - Dates: {parameters['start_date']} to {parameters['end_date']}
-        - Preferences: {parameters.get('natural_language_input', 'No specific preferences')}
-
-        IMPORTANT: ALL suggestions MUST be real, existing places or activities in {parameters['end_location']}.
-        Do NOT suggest generic activities or places from other locations.
-
-        For each time slot provide:
-        1. One main activity in {parameters['end_location']}
-        2. One alternative activity in {parameters['end_location']} that is:
-           - In the same category (e.g., both cultural, both outdoor)
-           - At a similar time of day
-           - Different from the main activity
-
-        Return ONLY valid JSON matching this EXACT format:
-        {{
-            "time_slots": [
-                {{
-                    "category": "Category name",
-                    "best_time": "Morning/Afternoon/Evening",
-                    "options": [
-                        {{
-                            "title": "Activity in {parameters['end_location']}",
-                            "description": "Brief description",
-                            "duration": "2-3 hours",
-                            "cost": 45,
-                            "location": "Specific location name in {parameters['end_location']}"
-                        }},
-                        {{
-                            "title": "Alternative in {parameters['end_location']}",
-                            "description": "Brief description",
-                            "duration": "2-3 hours",
-                            "cost": 45,
-                            "location": "Different specific location in {parameters['end_location']}"
-                        }}
-                    ]
-                }}
-            ]
-        }}
-        """
-
-        response = client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=2000,
-            temperature=0.7,
-            system=f"You are a local tour guide in {parameters['end_location']}. Only suggest real, specific places and activities in {parameters['end_location']}.",
-            messages=[{"role": "user", "content": prompt}]
+        prompt = get_prompt("suggestions").render(
+            units=suggestions_count,
+            suggestions_count=suggestions_count,
+            options_count=suggestions_count * 2,
+            end_location=parameters['end_location'],
+            trip_days=trip_days,
+            budget=parameters['budget'],
+            people_count=parameters['people_count'],
+            start_date=parameters['start_date'],
+            end_date=parameters['end_date'],
+            preferences=parameters.get('natural_language_input') or 'No specific preferences'
         )
 
-        data = extract_json_from_claude(response.content[0].text)
+        # Each slot is reported as soon as its object closes in the stream
+        extractor = JsonExtractor(item_key="time_slots")
+        chunks = []
+        formatted_suggestions = []
+        slots_parsed = 0
+        for chunk in stream_claude(
+            prompt.prompt,
+            system=prompt.system,
+            max_tokens=prompt.max_tokens,
+            temperature=0.7,
+            cacheable=has_json_key("time_slots"),
+            operation="suggestions"
+        ):
+            chunks.append(chunk)
+            for slot in extractor.feed(chunk):
+                formatted_suggestions.extend(format_suggestion_slot(slots_parsed, slot))
+                slots_parsed += 1
+                if on_slot:
+                    on_slot(list(formatted_suggestions))
+
+        data = extractor.result()
+        if not isinstance(data, dict) or "time_slots" not in data:
+            data = parse_claude_json("".join(chunks))
         
         if not data or "time_slots" not in data:
             print("❌ Error: Invalid suggestions format")
             return []
             
-        # Format suggestions for frontend
+        # The full object is authoritative; slots already reported are a prefix of it
         formatted_suggestions = []
         for i, slot in enumerate(data["time_slots"]):
-            for j, option in enumerate(slot["options"]):
-                suggestion = {
-                    "id": f"sug_{i}_{j}",
-                    "title": option["title"],
-                    "description": option["description"],
-                    "duration": option["duration"],
-                    "cost": option["cost"],
-                    "category": slot["category"],
-                    "location": option["location"],
-                    "best_time": slot["best_time"],
-                    "slot_index": i,
-                    "option_index": j
-                }
-                formatted_suggestions.append(suggestion)
+            formatted_suggestions.extend(format_suggestion_slot(i, slot))
+        remember_activities(parameters, formatted_suggestions)
         
         print(f"✅ Generated {len(formatted_suggestions)} total suggestions")
         return formatted_suggestions
@@ -318,72 +585,82 @@ def generate_trip_suggestions(parameters):
         return []
 
 
-def generate_final_itinerary(selected_activities, parameters):
-    """Generates a detailed itinerary based on selected activities."""
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    
-    activities_str = "\n".join([
-        f"- {act['title']} ({act['duration']}, {act['best_time']}, at {act['location']})"
-        for act in selected_activities
-    ])
-    
-    prompt = f"""
-    Create a detailed day-by-day itinerary incorporating these selected activities:
-    {activities_str}
-
-    Trip Parameters:
-    - Start: {parameters['start_date']} in {parameters['start_location']}
-    - End: {parameters['end_date']} in {parameters['end_location']}
-    - Budget: ${parameters['budget']}
-    - Group Size: {parameters['people_count']}
-
-    Requirements:
-    1. Include all selected activities
-    2. Add necessary travel time between locations
-    3. Include meal breaks if not part of activities
-    4. Balance the schedule across available days
-    5. Consider activity timing preferences (morning/afternoon/evening)
-    6. Include specific start/end times for each activity
-    
-    Return ONLY valid JSON matching this structure:
-    {{
-        "days": [
-            {{
-                "day": 1,
-                "date": "YYYY-MM-DD",
-                "location": "Location name",
-                "activities": [
-                    {{
-                        "title": "Activity name",
-                        "start_time": "HH:MM AM/PM",
-                        "end_time": "HH:MM AM/PM",
-                        "location": "Specific location",
-                        "cost": cost_in_dollars
-                    }}
-                ]
-            }}
-        ]
-    }}
+def generate_final_itinerary(selected_activities, parameters, mode=None):
+    """Generates a detailed itinerary based on selected activities.
+
+    `mode` (default: ITINERARY_SCHEDULER) picks who lays the activities out: the
+    local scheduler alone, the local scheduler with a Claude polish pass (falling
+    back to the draft if Claude fails), or Claude from scratch.
     """
+    mode = mode or ITINERARY_SCHEDULER
+    draft = None
+    if mode in ("local", "polish"):
+        draft = schedule_activities(selected_activities, parameters)
+        if mode == "local":
+            return validate_trip_data(draft)
+    prompt = build_itinerary_prompt(selected_activities, parameters, draft)
 
     try:
-        response = client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=4000,
+        response_text = call_claude(
+            prompt.prompt,
+            system=prompt.system,
+            max_tokens=prompt.max_tokens,
             temperature=0.7,
-            messages=[{"role": "user", "content": prompt}]
+            cacheable=has_json_key("days"),
+            operation="itinerary_polish" if draft else "itinerary"
         )
 
-        itinerary = extract_json_from_claude(response.content[0].text)
+        itinerary = parse_claude_json(response_text)
         if not itinerary or "days" not in itinerary:
             print("❌ Error: Invalid itinerary format")
-            return []
+            return validate_trip_data(draft)
             
-        return itinerary["days"]
+        return validate_trip_data(itinerary)
 
     except Exception as e:
         print(f"❌ Error generating itinerary: {e}")
-        return []
+        return validate_trip_data(draft)
+
+
+def build_itinerary_prompt(selected_activities, parameters, draft=None):
+    """Renders the polish prompt for a scheduler draft, or the from-scratch prompt without one."""
+    if draft is None:
+        return build_final_itinerary_prompt(selected_activities, parameters)
+    return get_prompt("itinerary_polish").render(
+        units=len(draft["days"]),
+        start_date=parameters['start_date'],
+        start_location=parameters['start_location'],
+        end_date=parameters['end_date'],
+        end_location=parameters['end_location'],
+        budget=parameters['budget'],
+        people_count=parameters['people_count'],
+        draft=json.dumps(draft, indent=1)
+    )
+
+
+def build_final_itinerary_prompt(selected_activities, parameters):
+    """Renders the prompt asking Claude to lay out the selected activities across days."""
+    activities_str = "\n".join([
+        f"- {act['title']} ({act['duration']}, {act['best_time']}, at {act['location']})"
+        for act in selected_activities
+    ])
+    
+    try:
+        trip_days = (datetime.strptime(parameters['end_date'], "%Y-%m-%d")
+                     - datetime.strptime(parameters['start_date'], "%Y-%m-%d")).days + 1
+    except (TypeError, ValueError):
+        trip_days = 3
+
+    return get_prompt("itinerary").render(
+        units=trip_days,
+        activities=activities_str,
+        start_date=parameters['start_date'],
+        start_location=parameters['start_location'],
+        end_date=parameters['end_date'],
+        end_location=parameters['end_location'],
+        budget=parameters['budget'],
+        people_count=parameters['people_count']
+    )
 
 
 @app.route('/api/trip', methods=['POST'])
@@ -408,19 +685,32 @@ def create_trip():
             "success": False, 
             "error": "Missing required parameters"
         }), 400
+
+    try:
+        trip_days = (datetime.strptime(parameters['end_date'], "%Y-%m-%d")
+                     - datetime.strptime(parameters['start_date'], "%Y-%m-%d")).days + 1
+    except (TypeError, ValueError):
+        trip_days = None
+    if trip_days is not None and trip_days < 1:
+        return jsonify({
+            "success": False,
+            "error": "The end date must not be before the start date"
+        }), 400
+    # The local scheduler lays out at most MAX_TRIP_DAYS days; longer trips would be cut short
+    if trip_days is not None and trip_days > MAX_TRIP_DAYS and ITINERARY_SCHEDULER in ("local", "polish"):
+        return jsonify({
+            "success": False,
+            "error": f"Trips must be between 1 and {MAX_TRIP_DAYS} days long"
+        }), 400
     
     # Store trip parameters in session
     session['trip_parameters'] = parameters
+    session.pop('trip_suggestions', None)
     
-    # Generate suggestions
+    # Generate suggestions in the background; /api/suggestions picks up the result
     try:
-        suggestions = generate_trip_suggestions(parameters)
-        if isinstance(suggestions, tuple):  # If it's an error response
-            return suggestions
-            
-        # Store the suggestions directly (they're already in the right format)
-        session['trip_suggestions'] = suggestions
-        return jsonify({"success": True})
+        job_id = submit_suggestions_job(parameters)
+        return jsonify({"success": True, "job_id": job_id}), 202
         
     except Exception as e:
         print(f"❌ Error in create_trip: {str(e)}")
@@ -430,89 +720,235 @@ def create_trip():
         }), 500
 
 
-@app.route('/api/trip/events', methods=['GET'])
-def get_trip_events():
-    """Returns the stored trip itinerary."""
-    if 'trip_events' not in session:
+def submit_suggestions_job(parameters):
+    """Queues suggestion generation for this session's trip; returns the job ID."""
+    session['alternatives_pool_id'] = uuid.uuid4().hex
+    job_id = get_job_queue().submit(
+        "suggestions", run_suggestions_job, parameters, session['alternatives_pool_id'],
+        report_progress=True
+    )
+    session['suggestions_job_id'] = job_id
+    return job_id
+
+
+def run_suggestions_job(parameters, pool_id=None, report=None):
+    """Background job body for suggestion generation; starts prefetching alternatives.
+
+    `report` publishes the slots parsed so far as the job's progress.
+    """
+    suggestions = generate_trip_suggestions(parameters, on_slot=report)
+    if not suggestions:
+        raise RuntimeError("Failed to generate suggestions")
+    if pool_id and ALTERNATIVES_PREFETCH:
+        alternatives_pool.prefetch(pool_id, parameters, suggestions)
+    return suggestions
+
+
+def run_itinerary_job(selected_activities, parameters, trip_id):
+    """Background job body for final itinerary generation; saves straight to the trip store."""
+    itinerary = generate_final_itinerary(selected_activities, parameters)
+    if not itinerary:
+        raise RuntimeError("Failed to generate itinerary")
+    get_trip_store().save(trip_id, itinerary.to_list())
+    app.logger.info("Itinerary generated with %d days and %d activities", len(itinerary), len(selected_activities))
+    return {"days": len(itinerary)}
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Returns the status of a background generation job."""
+    job = get_job_queue().get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    # Suggestions live in the session, so attach them once this session's job finishes
+    if (job["status"] == DONE and job["kind"] == "suggestions"
+            and session.get('suggestions_job_id') == job_id):
+        session['trip_suggestions'] = job["result"]
+        session.pop('suggestions_job_id', None)
+
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "kind": job["kind"],
+        "status": job["status"],
+        "error": job["error"]
+    })
+
+
+@app.route('/api/llm-cache/stats', methods=['GET'])
+def llm_cache_stats():
+    """Returns hit/miss counters for the Claude response cache."""
+    return jsonify({"success": True, "stats": get_response_cache().stats()})
+
+
+@app.route('/api/destinations/stats', methods=['GET'])
+def get_destination_stats():
+    """Coverage and hit rate of the destination index."""
+    if not DESTINATION_INDEX:
+        return jsonify({"success": False, "error": "Destination index is disabled"}), 404
+    return jsonify({"success": True, "stats": get_destination_index().stats()})
+
+
+@app.route('/api/alternatives/stats', methods=['GET'])
+def alternatives_stats():
+    """Returns hit/miss counters for the prefetched alternatives pool."""
+    return jsonify({"success": True, "stats": alternatives_pool.stats()})
+
+
+@app.route('/api/model-router/stats', methods=['GET'])
+def model_router_stats():
+    """Returns per-route models, fallbacks and latency for the Claude model router."""
+    return jsonify({"success": True, "stats": get_router_stats()})
+
+
+@app.route('/api/llm-client/stats', methods=['GET'])
+def llm_client_stats():
+    """Returns request, retry and connection reuse counters for the shared Claude client."""
+    return jsonify({"success": True, "stats": get_client_stats()})
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Exposes request, Claude call and payload size metrics for Prometheus to scrape."""
+    return Response(metrics.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def trip_json_view(view_cache, build):
+    """Serves a JSON view of this session's trip, revalidated with an ETag on the trip version.
+
+    `build(trip, parameters)` makes the payload; serialized bodies are memoized
+    in `view_cache` per ETag, since any mutation bumps the version.
+    """
+    etag = get_trip_etag()
+    if etag is None:
         return jsonify({"success": False, "error": "No itinerary found"}), 404
 
-    events = session['trip_events']
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    body = view_cache.get(etag)
+    if body is None:
+        trip = get_trip_from_session(readonly=True)
+        if trip is None:
+            return jsonify({"success": False, "error": "No itinerary found"}), 404
+        body = app.json.dumps(build(trip, session.get('trip_parameters', {})))
+        view_cache.put(etag, body)
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/trip/events', methods=['GET'])
+def get_trip_events():
+    """Returns the stored trip itinerary, revalidated with an ETag on the trip version."""
+    return trip_json_view(events_view_cache, format_trip_events)
 
-    if not isinstance(events, list):
-        return jsonify({"success": False, "error": "Itinerary format error"}), 500
 
+def format_trip_events(events, parameters):
+    """Builds the /api/trip/events payload from a Trip."""
     formatted_events = []
-    total_cost = 0
     
     for day in events:
-        if isinstance(day, dict) and "activities" in day:
-            for activity in day["activities"]:
-                activity_cost = float(activity.get("cost", 0)) if isinstance(activity, dict) else 0
-                total_cost += activity_cost
-                
-                event_id = str(uuid.uuid4())
-                formatted_events.append({
-                    "id": event_id,
-                    "day": day.get("day", "?"),
-                    "date": day.get("date", f"Day {day.get('day', '?')}"),
-                    "location": activity.get("location", day.get("location", "Unknown")),
-                    "title": activity["title"] if isinstance(activity, dict) else str(activity),
-                    "start_time": activity.get("start_time", "TBD"),
-                    "end_time": activity.get("end_time", "TBD"),
-                    "cost": activity_cost,
-                    "confirmed": False
-                })
+        for activity in day.activities:
+            formatted_events.append({
+                "id": activity.id,
+                "day": day.day,
+                "date": day.date or f"Day {day.day}",
+                "location": activity.location or day.location,
+                "title": activity.title,
+                "start_time": activity.start_time,
+                "end_time": activity.end_time,
+                "cost": activity.cost,
+                "confirmed": activity.confirmed
+            })
 
     # Add summary information
     summary = {
-        "total_cost": total_cost,
+        "total_cost": events.total_cost,
         "total_days": len(events),
-        "start_location": session.get('trip_parameters', {}).get('start_location', "Unknown"),
-        "end_location": session.get('trip_parameters', {}).get('end_location', "Unknown"),
-        "budget": session.get('trip_parameters', {}).get('budget', 0),
-        "people_count": session.get('trip_parameters', {}).get('people_count', 1)
+        "start_location": parameters.get('start_location', "Unknown"),
+        "end_location": parameters.get('end_location', "Unknown"),
+        "budget": parameters.get('budget', 0),
+        "people_count": parameters.get('people_count', 1)
     }
 
-    return jsonify({
+    return {
         "success": True, 
         "events": formatted_events,
-        "summary": summary
-    })
+        "summary": summary,
+        "conflicts": trip_conflicts(events)
+    }
+
+
+@app.route('/api/trip/budget', methods=['GET'])
+def get_trip_budget():
+    """Returns spend per day and category against the trip budget, with over-budget flags."""
+    return trip_json_view(
+        budget_view_cache,
+        lambda trip, parameters: {"success": True, "budget": budget_report(trip, parameters)}
+    )
 
 
 @app.route('/api/trip/event/<event_id>/confirm', methods=['POST'])
 def confirm_event(event_id):
-    """Marks an event as confirmed and updates session data."""
-    if 'trip_events' not in session:
+    """Marks an event as confirmed and saves the trip."""
+    events = get_trip_from_session()
+    if events is None:
         return jsonify({"success": False, "error": "No itinerary found"}), 404
         
     # Get the event data from the request
-    data = request.json or {}
-    confirmed = data.get('confirmed', True)
+    data = request.get_json(silent=True) or {}
     
-    # Update session data to mark this event as confirmed
-    # In a real app, you would find and update the specific event
-    # For now, we'll just return success
+    try:
+        result = apply_operation(events, {"op": "confirm", "id": event_id,
+                                          "confirmed": data.get('confirmed', True)})
+    except OperationError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
     
+    save_trip_to_session(events)
     return jsonify({
         "success": True,
         "event_id": event_id,
-        "confirmed": confirmed
+        "confirmed": result["confirmed"]
     })
 
 
-def convert_to_minutes(time_str):
-    """Convert time string to minutes since midnight for sorting"""
-    try:
-        # If time is in 12-hour format (e.g., "8:00 AM")
-        if 'AM' in time_str.upper() or 'PM' in time_str.upper():
-            time_obj = datetime.strptime(time_str, '%I:%M %p')
-        # If time is in 24-hour format (e.g., "14:00")
-        else:
-            time_obj = datetime.strptime(time_str, '%H:%M')
-        return time_obj.hour * 60 + time_obj.minute
-    except ValueError:
-        return 0
+@app.route('/api/trip/events/batch', methods=['POST'])
+def batch_events():
+    """Applies an ordered list of add/modify/delete/confirm/todos operations in one write.
+
+    The batch is atomic: if any operation fails nothing is saved, and the
+    per-operation results show which one failed and why.
+    """
+    events = get_trip_from_session()
+    if events is None:
+        return jsonify({"success": False, "error": "No itinerary found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"success": False, "error": "No operations provided"}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({
+            "success": False,
+            "error": f"Too many operations (max {MAX_BATCH_OPERATIONS})"
+        }), 400
+
+    results, failed = apply_batch(events, operations)
+    if failed:
+        return jsonify({
+            "success": False,
+            "error": results[-1]["error"],
+            "results": results
+        }), results[-1]["status"]
+
+    save_trip_to_session(events)
+    return jsonify({"success": True, "results": results})
 
 
 @app.route('/')
@@ -527,32 +963,43 @@ def plan():
 
 @app.route('/itinerary')
 def show_itinerary():
-    if 'trip_events' not in session:
+    if get_trip_etag() is not None:
+        # Suggestions are done with once there is an itinerary; stop carrying them in the cookie
+        session.pop('trip_suggestions', None)
+    return render_trip_page('itinerary.html', 'partials/itinerary_day.html')
+
+
+def render_day_blocks(template_name, trip):
+    """Renders each day of `trip` with `template_name`, reusing the fragment of every unchanged day."""
+    template = app.jinja_env.get_template(template_name)
+    blocks = []
+    for number, day in enumerate(trip, start=1):
+        content = json.dumps(day.to_dict(), sort_keys=True).encode("utf-8")
+        key = (template_name, number, hashlib.blake2b(content, digest_size=16).digest())
+        block = fragment_cache.get(key)
+        if block is None:
+            block = Markup(template.render(day=day, day_number=number))
+            fragment_cache.put(key, block)
+        blocks.append(block)
+    return blocks
+
+
+def render_trip_page(template_name, day_template):
+    """Renders a page listing the trip's days, cached and precompressed per trip version."""
+    etag = get_trip_etag()
+    if etag is None:
         return redirect(url_for('home'))
-        
-    trip_events = session['trip_events']
-    
-    formatted_events = []
-    for day in trip_events:
-        # Ensure all activities have IDs
-        for activity in day['activities']:
-            if 'id' not in activity or not activity['id']:
-                activity['id'] = str(uuid.uuid4())
-        
-        # Sort activities by converting their times to minutes
-        sorted_activities = sorted(
-            day['activities'],
-            key=lambda x: convert_to_minutes(x['start_time'])
-        )
-        
-        formatted_day = {
-            'date': day['date'],
-            'activities': sorted_activities
-        }
-        formatted_events.append(formatted_day)
-    
-    session.modified = True
-    return render_template('itinerary.html', trip_events=formatted_events)
+    etag = f"{etag}-{TEMPLATE_VERSION}"
+
+    variants = page_view_cache.get((template_name, etag))
+    if variants is None:
+        trip = get_trip_from_session(readonly=True)
+        if trip is None:
+            return redirect(url_for('home'))
+        html = render_template(template_name, day_blocks=render_day_blocks(day_template, trip))
+        variants = compress_variants(html, brotli_quality=5)
+        page_view_cache.put((template_name, etag), variants)
+    return precompressed_response(variants, 'text/html', etag=etag)
 
 
 @app.route('/suggestions')
@@ -563,14 +1010,34 @@ def suggestions():
     return render_template("suggestions.html")
 
 
+def _suggestions_page(suggestions, cursor, complete, total_slots):
+    return {
+        "suggestions": suggestions[cursor:],
+        "cursor": len(suggestions),
+        "complete": complete,
+        "total_slots": total_slots
+    }
+
+
+def _slot_total(suggestions):
+    return max((suggestion["slot_index"] for suggestion in suggestions), default=-1) + 1
+
+
 @app.route('/api/suggestions', methods=['GET'])
 def get_suggestions():
-    """Returns AI-generated activity suggestions for the trip."""
+    """Returns AI-generated activity suggestions for the trip.
+
+    `?cursor=N` returns only suggestions after the first N. While generation
+    is still running the response is a 202 carrying the slots parsed so far,
+    so clients can show the first card before the rest arrive.
+    """
+    cursor = request.args.get('cursor', 0, type=int)
     try:
         if 'trip_suggestions' in session:
+            suggestions = session['trip_suggestions']
             return jsonify({
                 "success": True,
-                "suggestions": session['trip_suggestions']
+                **_suggestions_page(suggestions, cursor, True, _slot_total(suggestions))
             })
             
         if 'trip_parameters' not in session:
@@ -580,16 +1047,39 @@ def get_suggestions():
                 "error": "No trip parameters found"
             }), 404
 
-        parameters = session['trip_parameters']
-        print(f"📋 Retrieved parameters from session: {parameters}")
-        
-        suggestions = generate_trip_suggestions(parameters)
-        session['trip_suggestions'] = suggestions
-        
+        job_id = session.get('suggestions_job_id')
+        job = get_job_queue().get(job_id) if job_id else None
+        if job:
+            if job["status"] == DONE:
+                session['trip_suggestions'] = job["result"]
+                session.pop('suggestions_job_id', None)
+                return jsonify({
+                    "success": True,
+                    **_suggestions_page(job["result"], cursor, True, _slot_total(job["result"]))
+                })
+            if job["status"] == FAILED:
+                session.pop('suggestions_job_id', None)
+                return jsonify({
+                    "success": False,
+                    "error": job["error"]
+                }), 500
+            progress = job.get("progress") or []
+        else:
+            # No job, or one the queue no longer knows (expired, or started by another
+            # process with a memory backend): generate in the background again
+            job_id = submit_suggestions_job(session['trip_parameters'])
+            progress = []
+
+        # Still queued or running: hand over what has been parsed and ask to poll again
         return jsonify({
-            "success": True,
-            "suggestions": suggestions
-        })
+            "success": False,
+            "pending": True,
+            "job_id": job_id,
+            **_suggestions_page(
+                progress, cursor, False,
+                suggestion_slot_count(session['trip_parameters'])[1]
+            )
+        }), 202
 
     except Exception as e:
         print(f"❌ Error in get_suggestions route: {str(e)}")
@@ -603,7 +1093,7 @@ def get_suggestions():
 
 @app.route('/api/suggestions/select', methods=['POST'])
 def select_suggestions():
-    """Generates final itinerary from selected suggestions."""
+    """Queues final itinerary generation from selected suggestions; poll /api/jobs/<id>."""
     if 'trip_parameters' not in session:
         return jsonify({"success": False, "error": "No trip parameters found"}), 404
         
@@ -615,25 +1105,139 @@ def select_suggestions():
     
     try:
         parameters = session['trip_parameters']
-        itinerary = generate_final_itinerary(selected_activities, parameters)
-        
-        if not itinerary:
-            return jsonify({"success": False, "error": "Failed to generate itinerary"}), 500
-            
-        # Store the generated itinerary in session
-        session['trip_events'] = itinerary
-        print(f"✅ Itinerary generated with {len(itinerary)} days and {len(selected_activities)} activities")
-        
-        return jsonify({"success": True})
+        # The job writes to the trip store directly, so the session only needs the ID
+        trip_id = get_or_create_trip_id()
+        job_id = get_job_queue().submit(
+            "itinerary", run_itinerary_job, selected_activities, parameters, trip_id
+        )
+        return jsonify({"success": True, "job_id": job_id}), 202
         
     except Exception as e:
         print(f"❌ Error generating final itinerary: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/api/suggestions/select/stream', methods=['POST'])
+def select_suggestions_stream():
+    """Streams the final itinerary as Server-Sent Events, one `day` event per completed day."""
+    if 'trip_parameters' not in session:
+        return jsonify({"success": False, "error": "No trip parameters found"}), 404
+
+    data = request.json or {}
+    selected_activities = data.get('selected_activities', [])
+
+    if not selected_activities:
+        return jsonify({"success": False, "error": "No activities selected"}), 400
+
+    parameters = session['trip_parameters']
+    draft = None
+    if ITINERARY_SCHEDULER in ("local", "polish"):
+        draft = schedule_activities(selected_activities, parameters)
+    prompt = None if ITINERARY_SCHEDULER == "local" else build_itinerary_prompt(selected_activities, parameters, draft)
+    # The trip ID must be in the session cookie before the stream starts
+    trip_id = get_or_create_trip_id()
+
+    def generate():
+        extractor = JsonExtractor(item_key="days")
+        days = []
+        try:
+            if prompt is None:
+                days = draft["days"]
+                for day in days:
+                    yield format_sse(day, event="day")
+            else:
+                try:
+                    for chunk in stream_claude(prompt.prompt, system=prompt.system, max_tokens=prompt.max_tokens,
+                                               temperature=0.7, cacheable=has_json_key("days"),
+                                               operation="itinerary_polish" if draft else "itinerary"):
+                        for day in extractor.feed(chunk):
+                            days.append(day)
+                            yield format_sse(day, event="day")
+                except Exception:
+                    if draft is None:
+                        raise
+                    app.logger.warning("Itinerary polish failed, keeping the scheduler draft")
+                    days = []
+
+                # The full (possibly repaired) object is authoritative over the per-day events
+                itinerary = extractor.result()
+                if days and itinerary and isinstance(itinerary.get("days"), list):
+                    days = itinerary["days"]
+
+            trip = validate_trip_data(days) or validate_trip_data(draft)
+            if not trip:
+                yield format_sse({"error": "Failed to generate itinerary"}, event="error")
+                return
+
+            get_trip_store().save(trip_id, trip.to_list())
+            app.logger.info("Streamed itinerary with %d days and %d activities", len(trip), len(selected_activities))
+            yield format_sse({"success": True, "days": len(trip)}, event="done")
+
+        except Exception as e:
+            app.logger.error("Error streaming final itinerary: %s", e)
+            yield format_sse({"error": str(e)}, event="error")
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def generate_alternative_candidates(parameters, slots, exclude_titles, count):
+    """Asks Claude for `count` alternatives per slot in one call; returns {slot_index: [options]}."""
+    slots_str = "\n".join(
+        f"- slot_index {index}: {slot['category']}, {slot['best_time']}, about {slot['duration']}"
+        for index, slot in slots.items()
+    )
+    prompt = get_prompt("alternatives_batch").render(
+        units=len(slots) * count,
+        count=count,
+        end_location=parameters['end_location'],
+        slots=slots_str,
+        budget=parameters['budget'],
+        people_count=parameters['people_count'],
+        previous_suggestions="\n".join(f"- {title}" for title in exclude_titles) or "- (none)"
+    )
+    response = route_message(
+        "alternatives_prefetch",
+        max_tokens=prompt.max_tokens,
+        temperature=0.9,
+        system=prompt.system,
+        messages=[{"role": "user", "content": prompt.prompt}]
+    )
+
+    data = parse_claude_json(response.content[0].text)
+    if not data or not isinstance(data.get("slots"), list):
+        app.logger.error("Invalid alternatives format")
+        return {}
+
+    candidates = {}
+    for entry in data["slots"]:
+        slot_index = entry.get("slot_index") if isinstance(entry, dict) else None
+        if slot_index not in slots:
+            continue
+        slot = slots[slot_index]
+        candidates[slot_index] = [
+            {**option, "category": slot['category'], "best_time": slot['best_time']}
+            for option in entry.get("alternatives") or []
+            if isinstance(option, dict)
+        ]
+    remember_activities(parameters, [option for options in candidates.values() for option in options])
+    app.logger.info("Prefetched %d alternatives", sum(len(options) for options in candidates.values()))
+    return candidates
+
+
+alternatives_pool = AlternativesPool(
+    generate_alternative_candidates,
+    per_slot=ALTERNATIVES_PER_SLOT,
+    max_workers=int(os.getenv("ALTERNATIVES_PREFETCH_WORKERS", 2))
+)
+
+
 @app.route('/api/suggestions/alternative', methods=['POST'])
 def generate_alternative_suggestion():
-    """Generates an alternative suggestion based on rejected activity."""
+    """Returns an alternative for a rejected suggestion, from the prefetch pool when possible."""
     if 'trip_parameters' not in session:
         return jsonify({"success": False, "error": "No trip parameters found"}), 404
         
@@ -641,50 +1245,45 @@ def generate_alternative_suggestion():
     rejected = data['rejected']
     previous_suggestions = data.get('previous_suggestions', [])
     parameters = session['trip_parameters']
+    # Keeps the replacement in the rejected suggestion's place on the client
+    placement = {key: rejected[key] for key in ('slot_index', 'option_index') if key in rejected}
+
+    pool_id = session.get('alternatives_pool_id')
+    if pool_id:
+        alternative = alternatives_pool.take(
+            pool_id,
+            slot_index=rejected.get('slot_index'),
+            category=rejected.get('category'),
+            exclude=[rejected['title'], *previous_suggestions]
+        )
+        if alternative:
+            app.logger.info("Serving prefetched alternative: %s", alternative['title'])
+            return jsonify({
+                "success": True,
+                "alternative": {**alternative, **placement, "id": f"alt_{uuid.uuid4().hex[:8]}"}
+            })
     
-    prompt = f"""
-    Generate ONE alternative activity suggestion to replace: "{rejected['title']}"
-    
-    Location: {parameters['end_location']}
-    Requirements:
-    - Similar category: {rejected['category']}
-    - Similar time of day: {rejected['best_time']}
-    - Similar duration: {rejected['duration']}
-    - Must be a DIFFERENT activity from these previously suggested activities: {', '.join(previous_suggestions)}
-    - Must be a real place/activity in {parameters['end_location']}
-    - Should fit within a budget of ${parameters['budget']} for {parameters['people_count']} people
-    
-    DO NOT suggest any of these previous activities:
-    {previous_suggestions}
-    
-    For example:
-    - If a museum was rejected, suggest a different cultural venue
-    - If a restaurant was rejected, suggest a different cuisine or dining experience
-    - If an outdoor activity was rejected, suggest a different outdoor activity
-    
-    Return ONLY valid JSON matching this EXACT format:
-    {{
-        "title": "New Activity Name",
-        "description": "Brief 1-2 sentence description",
-        "duration": "{rejected['duration']}",
-        "cost": similar_cost_to_original,
-        "category": "{rejected['category']}",
-        "location": "Specific location name and address in {parameters['end_location']}",
-        "best_time": "{rejected['best_time']}"
-    }}
-    """
+    prompt = get_prompt("alternative").render(
+        title=rejected['title'],
+        end_location=parameters['end_location'],
+        category=rejected['category'],
+        best_time=rejected['best_time'],
+        duration=rejected['duration'],
+        budget=parameters['budget'],
+        people_count=parameters['people_count'],
+        previous_suggestions="\n".join(f"- {title}" for title in previous_suggestions) or "- (none)"
+    )
     
     try:
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-        response = client.messages.create(
-            model="claude-3-opus-20240229",
-            max_tokens=1000,
+        response = route_message(
+            "alternative",
+            max_tokens=prompt.max_tokens,
             temperature=0.9,  # Increased temperature for more variety
-            system="You are a local tour guide generating alternative activity suggestions. Never repeat a previously suggested activity.",
-            messages=[{"role": "user", "content": prompt}]
+            system=prompt.system,
+            messages=[{"role": "user", "content": prompt.prompt}]
         )
         
-        alternative = extract_json_from_claude(response.content[0].text)
+        alternative = parse_claude_json(response.content[0].text)
         
         # Validate the alternative suggestion
         if not alternative:
@@ -695,11 +1294,17 @@ def generate_alternative_suggestion():
             return jsonify({"success": False, "error": "Generated a duplicate suggestion"}), 500
             
         # Ensure the suggestion is for the correct location
-        if parameters['end_location'].lower() not in alternative['location'].lower():
+        if not mentions_destination(alternative.get('location'), parameters['end_location']):
             return jsonify({"success": False, "error": "Generated suggestion for wrong location"}), 500
             
         # Add a unique ID to the alternative
         alternative['id'] = f"alt_{uuid.uuid4().hex[:8]}"
+        alternative.update(placement)
+        remember_activities(parameters, [{
+            **alternative, "category": rejected['category'], "best_time": rejected['best_time']
+        }])
+        if pool_id:
+            alternatives_pool.mark_seen(pool_id, alternative['title'])
         
         print(f"✅ Generated alternative: {alternative['title']}")
         return jsonify({
@@ -720,98 +1325,104 @@ def modify_event(event_id):
     if not event_id:
         return jsonify({"success": False, "error": "No event ID provided"}), 400
         
-    if 'trip_events' not in session:
+    events = get_trip_from_session()
+    if events is None:
         return jsonify({"success": False, "error": "No itinerary found"}), 404
         
     data = request.json
+    try:
+        check_times(data)
+    except OperationError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
     
-    events = session['trip_events']
-    for day in events:
-        for activity in day['activities']:
-            if str(activity.get('id')) == str(event_id):
-                activity.update({
-                    'title': data['title'],
-                    'start_time': data['start_time'],
-                    'end_time': data['end_time'],
-                    'location': data['location'],
-                    'cost': data['cost']
-                })
-                session.modified = True
-                return jsonify({"success": True, "modifiedEvent": activity})
+    activity = events.update_activity(
+        event_id,
+        title=data['title'],
+        start_time=data['start_time'],
+        end_time=data['end_time'],
+        location=data['location'],
+        cost=data['cost']
+    )
+    if activity is None:
+        return jsonify({"success": False, "error": "Event not found"}), 404
     
-    return jsonify({"success": False, "error": "Event not found"}), 404
+    save_trip_to_session(events)
+    return jsonify({
+        "success": True,
+        "modifiedEvent": activity.to_dict(),
+        "conflicts": find_conflicts(events.get_activity_day(activity.id), activity)
+    })
 
 
 @app.route('/api/trip/event/<event_id>/delete', methods=['DELETE'])
 def delete_event(event_id):
-    if 'trip_events' not in session:
+    events = get_trip_from_session()
+    if events is None:
         return jsonify({"success": False, "error": "No itinerary found"}), 404
     
-    events = session['trip_events']
-    for day in events:
-        day['activities'] = [a for a in day['activities'] if str(a.get('id')) != str(event_id)]
-    
-    session.modified = True
+    if events.remove_activity(event_id) is not None:
+        save_trip_to_session(events)
     return jsonify({"success": True})
 
 
 @app.route('/api/trip/event/add', methods=['POST'])
 def add_event():
-    if 'trip_events' not in session:
+    events = get_trip_from_session()
+    if events is None:
         return jsonify({"success": False, "error": "No itinerary found"}), 404
     
     data = request.json
     if not data:
         return jsonify({"success": False, "error": "No data provided"}), 400
+    try:
+        check_times(data)
+    except OperationError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
     
-    new_event = {
+    new_event = events.add_activity(data['day_date'], {
         'id': str(uuid.uuid4()),
         'title': data['title'],
         'start_time': data['start_time'],
         'end_time': data['end_time'],
         'location': data['location'],
         'cost': data['cost']
-    }
-    
-    # Find the correct day and add the event
-    events = session['trip_events']
-    for day in events:
-        if day['date'] == data['day_date']:
-            day['activities'].append(new_event)
-            session.modified = True
-            return jsonify({"success": True, "newEvent": new_event})
+    })
+    if new_event is None:
+        return jsonify({"success": False, "error": "Day not found"}), 404
     
-    return jsonify({"success": False, "error": "Day not found"}), 404
+    save_trip_to_session(events)
+    return jsonify({
+        "success": True,
+        "newEvent": new_event.to_dict(),
+        "conflicts": find_conflicts(events.get_day(data['day_date']), new_event)
+    })
 
 
 @app.route('/api/trip/todos/save', methods=['POST'])
 def save_todos():
-    if 'trip_events' not in session:
+    events = get_trip_from_session()
+    if events is None:
         return jsonify({"success": False, "error": "No itinerary found"}), 404
     
     data = request.json
     if not data:
         return jsonify({"success": False, "error": "No data provided"}), 400
     
-    events = session['trip_events']
-    for day in events:
-        for activity in day['activities']:
-            if str(activity.get('id')) == str(data['activityId']):
-                activity['todos'] = data['todos']
-                activity['confirmed'] = data['eventConfirmed']
-                session.modified = True
-                return jsonify({"success": True})
+    activity = events.update_activity(
+        data['activityId'],
+        todos=data['todos'],
+        confirmed=bool(data['eventConfirmed'])
+    )
+    if activity is None:
+        return jsonify({"success": False, "error": "Activity not found"}), 404
     
-    return jsonify({"success": False, "error": "Activity not found"}), 404
+    save_trip_to_session(events)
+    return jsonify({"success": True})
 
 
 @app.route('/todos')
 def show_todos():
-    if 'trip_events' not in session:
-        return redirect(url_for('home'))
-    
-    trip_events = session['trip_events']
-    return render_template('todos.html', trip_events=trip_events)
+    return render_trip_page('todos.html', 'partials/todos_day.html')
 
 
 if __name__ == '__main__':
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, session
+from flask import Blueprint, jsonify
 from utils.session_utils import get_trip_from_session
 
 trip_routes = Blueprint("trip_routes", __name__)
@@ -7,19 +7,20 @@ trip_routes = Blueprint("trip_routes", __name__)
 def get_trip_events():
     """Returns the stored trip itinerary."""
     events = get_trip_from_session()
+    if events is None:
+        return jsonify({"success": False, "error": "No itinerary found"}), 404
 
     formatted_events = []
     for day in events:
-        if isinstance(day, dict) and "activities" in day:
-            for activity in day["activities"]:
-                formatted_events.append({
-                    "id": activity["id"],  # ✅ Use stored ID
-                    "date": day.get("date", f"Day {day.get('day', '?')}"),
-                    "location": activity.get("location", day.get("location", "Unknown")),
-                    "title": activity["title"],
-                    "start_time": activity.get("start_time", "TBD"),
-                    "end_time": activity.get("end_time", "TBD"),
-                    "cost": activity.get("cost", 0)
-                })
+        for activity in day.activities:
+            formatted_events.append({
+                "id": activity.id,  # ✅ Use stored ID
+                "date": day.date or f"Day {day.day}",
+                "location": activity.location or day.location,
+                "title": activity.title,
+                "start_time": activity.start_time,
+                "end_time": activity.end_time,
+                "cost": activity.cost
+            })
 
     return jsonify({"success": True, "events": formatted_events})
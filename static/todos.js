@@ -86,38 +86,65 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 
     // Add event listener for checkbox changes
-    document.addEventListener('change', async function(e) {
+    document.addEventListener('change', function(e) {
         if (e.target.matches('.todo-checkbox, .event-checkbox')) {
             const activityRow = e.target.closest('.activity-row');
             const todoItems = activityRow.querySelector('.todo-items');
             const activityId = todoItems.dataset.activityId;
-            
-            try {
-                const response = await fetch('/api/trip/todos/save', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        activityId: activityId,
-                        todos: Array.from(activityRow.querySelectorAll('.todo-item')).map(item => ({
-                            text: item.querySelector('.todo-label').textContent,
-                            completed: item.querySelector('.todo-checkbox').checked
-                        })),
-                        eventConfirmed: activityRow.querySelector('.event-checkbox').checked
-                    })
-                });
 
-                if (!response.ok) {
-                    throw new Error('Failed to save todo state');
-                }
-            } catch (error) {
-                console.error('Error saving todo state:', error);
-            }
+            // Latest state per activity wins; a burst of clicks becomes one batch request
+            pendingTodoSaves[activityId] = {
+                op: 'todos',
+                id: activityId,
+                todos: Array.from(activityRow.querySelectorAll('.todo-item')).map(item => ({
+                    text: item.querySelector('.todo-label').textContent,
+                    completed: item.querySelector('.todo-checkbox').checked
+                })),
+                confirmed: activityRow.querySelector('.event-checkbox').checked
+            };
+            clearTimeout(todoSaveTimer);
+            todoSaveTimer = setTimeout(flushTodoSaves, 400);
+        }
+    });
+
+    // Don't lose edits made just before leaving the page
+    window.addEventListener('pagehide', function() {
+        const operations = Object.values(pendingTodoSaves);
+        if (operations.length) {
+            pendingTodoSaves = {};
+            navigator.sendBeacon('/api/trip/events/batch', new Blob(
+                [JSON.stringify({ operations })],
+                { type: 'application/json' }
+            ));
         }
     });
 });
 
+let pendingTodoSaves = {};
+let todoSaveTimer = null;
+
+async function flushTodoSaves() {
+    const operations = Object.values(pendingTodoSaves);
+    if (!operations.length) return;
+    pendingTodoSaves = {};
+
+    try {
+        const response = await fetch('/api/trip/events/batch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ operations })
+        });
+
+        if (!response.ok) {
+            throw new Error('Failed to save todo state');
+        }
+    } catch (error) {
+        console.error('Error saving todo state:', error);
+    }
+}
+
 function toggleTodos(button) {
     const activityRow = button.closest('.activity-row');
     const todosContainer = activityRow.querySelector('.todo-items');
@@ -0,0 +1,64 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    """flask-trip-planner.py with in-memory stores and every file under a temporary directory.
+
+    Nothing here reaches Claude; the key only has to be set for the module to load.
+    """
+    workdir = tmp_path_factory.mktemp("app")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "test")
+    os.environ.setdefault("FLASK_SECRET_KEY", "test")
+    os.environ["TRIP_STORE"] = "memory"
+    os.environ["JOB_BACKEND"] = "memory"
+    os.environ["LLM_CACHE_PATH"] = str(workdir / "llm_cache.db")
+    os.environ["DESTINATION_INDEX_PATH"] = str(workdir / "destinations.db")
+    os.environ["JINJA_BYTECODE_CACHE"] = ""
+    spec = importlib.util.spec_from_file_location("flask_trip_planner", os.path.join(ROOT_DIR, "flask-trip-planner.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    module.app.config["TESTING"] = True
+    return module.app
+
+
+@pytest.fixture
+def trip_client(app):
+    """Returns a function that stores a trip (a list of day dicts) and gives a test client whose session holds it."""
+    from utils.trip_store import get_trip_store
+
+    def make(days, parameters=None):
+        store = get_trip_store()
+        trip_id = store.new_id()
+        store.save(trip_id, days)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["trip_id"] = trip_id
+            session["trip_parameters"] = parameters or {"end_location": "Lisbon"}
+        return client
+
+    return make
+
+
+@pytest.fixture
+def two_day_trip():
+    return [
+        {"day": 1, "date": "2025-06-01", "location": "Lisbon", "activities": [
+            {"id": "a1", "title": "Castle", "start_time": "9:00 AM", "end_time": "11:00 AM",
+             "location": "Castelo, Lisbon", "cost": 15},
+            {"id": "a2", "title": "Lunch", "start_time": "12:30 PM", "end_time": "1:30 PM",
+             "location": "Alfama, Lisbon", "cost": 25, "category": "Dining"}
+        ]},
+        {"day": 2, "date": "2025-06-02", "location": "Lisbon", "activities": [
+            {"id": "b1", "title": "Tram 28", "start_time": "10:00 AM", "end_time": "11:00 AM",
+             "location": "Martim Moniz, Lisbon", "cost": 3}
+        ]}
+    ]
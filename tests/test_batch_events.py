@@ -0,0 +1,84 @@
+def events(client):
+    response = client.get("/api/trip/events")
+    assert response.status_code == 200
+    return {event["id"]: event for event in response.json["events"]}
+
+
+def test_batch_applies_every_operation_in_one_write(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    response = client.post("/api/trip/events/batch", json={"operations": [
+        {"op": "modify", "id": "a1", "title": "Castle tour"},
+        {"op": "delete", "id": "b1"},
+        {"op": "add", "day_date": "2025-06-02", "title": "Belém", "start_time": "2:00 PM",
+         "end_time": "5:00 PM", "location": "Belém, Lisbon", "cost": 10},
+        {"op": "confirm", "id": "a2"}
+    ]})
+    assert response.status_code == 200
+    assert [result["success"] for result in response.json["results"]] == [True] * 4
+
+    stored = events(client)
+    assert stored["a1"]["title"] == "Castle tour"
+    assert "b1" not in stored
+    assert {event["title"] for event in stored.values()} == {"Castle tour", "Lunch", "Belém"}
+
+
+def test_failing_operation_rolls_back_the_whole_batch(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    before = events(client)
+    etag = client.get("/api/trip/events").headers["ETag"]
+
+    response = client.post("/api/trip/events/batch", json={"operations": [
+        {"op": "modify", "id": "a1", "title": "Changed"},
+        {"op": "delete", "id": "a2"},
+        {"op": "delete", "id": "missing"},
+        {"op": "delete", "id": "b1"}
+    ]})
+    assert response.status_code == 404
+    results = response.json["results"]
+    assert [result["success"] for result in results] == [True, True, False]
+    assert results[-1]["index"] == 2 and results[-1]["error"] == "Event not found"
+
+    # Nothing was saved: same version, same events
+    assert client.get("/api/trip/events").headers["ETag"] == etag
+    assert events(client) == before
+
+
+def test_discarded_batch_does_not_leak_into_later_edits(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    # Loads the trip into the parsed trip cache
+    assert client.post("/api/trip/event/a1/confirm", json={"confirmed": True}).status_code == 200
+
+    response = client.post("/api/trip/events/batch", json={"operations": [
+        {"op": "delete", "id": "a2"},
+        {"op": "bogus"}
+    ]})
+    assert response.status_code == 400
+
+    assert client.post("/api/trip/event/b1/confirm", json={"confirmed": True}).status_code == 200
+    stored = events(client)
+    assert set(stored) == {"a1", "a2", "b1"}
+    assert stored["a1"]["confirmed"] and stored["b1"]["confirmed"]
+
+
+def test_invalid_batches_are_rejected(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    assert client.post("/api/trip/events/batch", json={"operations": []}).status_code == 400
+    assert client.post("/api/trip/events/batch", json={"operations": [{"op": "delete"}] * 201}).status_code == 400
+    response = client.post("/api/trip/events/batch", json={"operations": ["delete a1"]})
+    assert response.status_code == 400
+    assert response.json["results"][0]["error"] == "Operation must be an object"
+
+
+def test_non_string_times_are_rejected(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    response = client.post("/api/trip/events/batch", json={"operations": [
+        {"op": "modify", "id": "a1", "start_time": ["9"]}
+    ]})
+    assert response.status_code == 400
+    assert response.json["results"][0]["error"] == "start_time must be a string"
+
+    response = client.post("/api/trip/event/a1/modify", json={
+        "title": "Castle", "start_time": "9:00 AM", "end_time": {"hour": 11}, "location": "Castelo", "cost": 15
+    })
+    assert response.status_code == 400
+    assert events(client)["a1"]["end_time"] == "11:00 AM"
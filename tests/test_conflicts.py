@@ -0,0 +1,89 @@
+from utils.conflicts import OVERLAP, TIGHT_GAP, day_conflicts, find_conflicts, trip_conflicts
+from utils.trip_model import Trip
+
+
+def make_trip(*activities):
+    return Trip.from_list([{
+        "day": 1,
+        "date": "2025-06-01",
+        "location": "Lisbon",
+        "activities": [
+            {"id": activity_id, "title": activity_id, "start_time": start, "end_time": end, "location": location}
+            for activity_id, start, end, location in activities
+        ]
+    }])
+
+
+def pairs(conflicts):
+    return sorted((conflict["with_id"], conflict["id"], conflict["type"], conflict["minutes"]) for conflict in conflicts)
+
+
+def test_overlap_is_reported_with_its_length():
+    trip = make_trip(("a", "9:00 AM", "11:00 AM", "Castle"), ("b", "10:30 AM", "12:00 PM", "Castle"))
+    day = trip.days[0]
+    assert pairs(find_conflicts(day, trip.get_activity("b"))) == [("b", "a", OVERLAP, 30)]
+    assert pairs(find_conflicts(day, trip.get_activity("a"))) == [("a", "b", OVERLAP, 30)]
+
+
+def test_touching_intervals_do_not_overlap():
+    trip = make_trip(("a", "9:00 AM", "10:00 AM", "Castle"), ("b", "10:00 AM", "11:00 AM", "Castle"))
+    assert find_conflicts(trip.days[0], trip.get_activity("b")) == []
+
+
+def test_tight_gap_only_between_different_locations():
+    trip = make_trip(
+        ("a", "9:00 AM", "10:00 AM", "Castle"),
+        ("b", "10:05 AM", "11:00 AM", "Harbour"),
+        ("c", "11:05 AM", "12:00 PM", "Harbour")
+    )
+    day = trip.days[0]
+    assert pairs(find_conflicts(day, trip.get_activity("b"), min_gap=15)) == [("b", "a", TIGHT_GAP, 5)]
+    assert find_conflicts(day, trip.get_activity("c"), min_gap=15) == []
+
+
+def test_long_activity_is_found_from_far_earlier_start():
+    # Starts long before "b" but still runs over it; found through the day's longest duration
+    trip = make_trip(
+        ("long", "8:00 AM", "6:00 PM", "Park"),
+        ("x", "9:00 AM", "9:30 AM", "Park"),
+        ("b", "4:00 PM", "5:00 PM", "Park")
+    )
+    assert pairs(find_conflicts(trip.days[0], trip.get_activity("b"))) == [("b", "long", OVERLAP, 60)]
+
+
+def test_overnight_activity_runs_past_midnight():
+    trip = make_trip(("late", "10:00 PM", "1:00 AM", "Club"), ("show", "11:00 PM", "11:30 PM", "Club"))
+    assert pairs(find_conflicts(trip.days[0], trip.get_activity("show"))) == [("show", "late", OVERLAP, 30)]
+
+
+def test_unscheduled_activities_never_conflict():
+    trip = make_trip(("a", "TBD", "TBD", "Castle"), ("b", "9:00 AM", "10:00 AM", "Castle"))
+    assert find_conflicts(trip.days[0], trip.get_activity("a")) == []
+    assert find_conflicts(trip.days[0], trip.get_activity("b")) == []
+
+
+def test_day_sweep_matches_pairwise_checks():
+    trip = make_trip(
+        ("a", "9:00 AM", "11:00 AM", "Castle"),
+        ("b", "10:00 AM", "10:30 AM", "Castle"),
+        ("c", "10:15 AM", "12:00 PM", "Harbour"),
+        ("d", "12:05 PM", "1:00 PM", "Museum"),
+        ("e", "3:00 PM", "4:00 PM", "Museum")
+    )
+    day = trip.days[0]
+    swept = {frozenset((conflict["id"], conflict["with_id"])) for conflict in day_conflicts(day, min_gap=15)}
+    pairwise = {
+        frozenset((conflict["id"], conflict["with_id"]))
+        for activity in day.activities
+        for conflict in find_conflicts(day, activity, min_gap=15)
+    }
+    assert swept == pairwise == {
+        frozenset(("a", "b")), frozenset(("a", "c")), frozenset(("b", "c")), frozenset(("c", "d"))
+    }
+    assert all(conflict["day"] == 1 for conflict in trip_conflicts(trip, min_gap=15))
+
+
+def test_moved_activity_is_checked_at_its_new_time():
+    trip = make_trip(("a", "9:00 AM", "10:00 AM", "Castle"), ("b", "2:00 PM", "3:00 PM", "Castle"))
+    activity = trip.update_activity("b", start_time="9:30 AM", end_time="10:30 AM")
+    assert pairs(find_conflicts(trip.get_activity_day("b"), activity)) == [("b", "a", OVERLAP, 30)]
@@ -0,0 +1,34 @@
+from utils.destinations import DestinationIndex, canonical_destination, mentions_destination
+
+
+def test_country_qualifiers_merge_with_the_bare_city():
+    assert canonical_destination("Paris") == "paris"
+    assert canonical_destination(" Paris, France ") == "paris"
+    assert canonical_destination("Paris (FR)") == "paris"
+    assert canonical_destination("Roma, Italy") == "rome"
+    assert canonical_destination("New York, USA") == canonical_destination("NYC") == "new york"
+
+
+def test_other_qualifiers_keep_cities_apart():
+    assert canonical_destination("Paris, Texas") == "paris texas"
+    assert canonical_destination("Albany, NY") == "albany ny"
+    assert canonical_destination("Washington, DC") == "washington"
+    assert canonical_destination("New York, NY") == "new york"
+
+
+def test_index_shares_activities_between_spellings(tmp_path):
+    index = DestinationIndex(str(tmp_path / "destinations.db"), min_activities=1, coverage=1)
+    activities = [
+        {"title": f"Stop {n}", "best_time": best_time, "location": "Louvre, Paris", "cost": 10}
+        for n, best_time in enumerate(("Morning", "Morning", "Afternoon", "Afternoon", "Evening", "Evening"))
+    ]
+    assert index.add("Paris", activities) == 6
+
+    assert index.suggest("Paris, France", slots=3) is not None
+    assert index.suggest("Paris, Texas", slots=3) is None
+
+
+def test_mentions_destination_matches_the_city():
+    assert mentions_destination("Louvre, Paris", "Paris, France")
+    assert mentions_destination("Rome, Italy", "Roma")
+    assert not mentions_destination("Louvre, Paris", "Lyon, France")
@@ -0,0 +1,64 @@
+def test_events_revalidate_with_304(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    first = client.get("/api/trip/events")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    again = client.get("/api/trip/events", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.get_data() == b""
+
+
+def test_edit_changes_the_etag(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    etag = client.get("/api/trip/events").headers["ETag"]
+
+    assert client.post("/api/trip/event/a1/confirm", json={"confirmed": True}).status_code == 200
+    response = client.get("/api/trip/events", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert next(event for event in response.json["events"] if event["id"] == "a1")["confirmed"]
+
+
+def test_trip_parameters_are_part_of_the_etag(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    etag = client.get("/api/trip/events").headers["ETag"]
+    with client.session_transaction() as session:
+        session["trip_parameters"] = {"end_location": "Porto"}
+    assert client.get("/api/trip/events", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_stale_or_foreign_etags_get_a_full_body(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    other = trip_client(two_day_trip)
+    foreign = other.get("/api/trip/events").headers["ETag"]
+    assert client.get("/api/trip/events", headers={"If-None-Match": foreign}).status_code == 200
+    assert client.get("/api/trip/events", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_budget_revalidates_and_follows_edits(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    first = client.get("/api/trip/budget")
+    assert first.status_code == 200 and first.json["success"]
+    etag = first.headers["ETag"]
+    assert client.get("/api/trip/budget", headers={"If-None-Match": etag}).status_code == 304
+
+    assert client.delete("/api/trip/event/b1/delete").status_code == 200
+    response = client.get("/api/trip/budget", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_data() != first.get_data()
+
+
+def test_pages_revalidate_with_304(trip_client, two_day_trip):
+    client = trip_client(two_day_trip)
+    for path in ("/itinerary", "/todos"):
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_no_itinerary_is_a_404(app):
+    assert app.test_client().get("/api/trip/events").status_code == 404
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from utils.json_extract import JsonExtractor, extract_json
+
+
+def feed_in_chunks(text, size, item_key=None):
+    extractor = JsonExtractor(item_key=item_key)
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(extractor.feed(text[i:i + size]))
+    return extractor, items
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('Here you go:\n```json\n{"a": [1, 2]}\n```\nEnjoy!', {"a": [1, 2]}),
+    ('{"a": [1, 2,], "b": {"c": "d",},}', {"a": [1, 2], "b": {"c": "d"}}),
+    ("{'title': 'Louvre', 'cost': 20}", {"title": "Louvre", "cost": 20}),
+    ('{“title”: “Louvre”}', {"title": "Louvre"}),
+    ("{'open': True, 'closed': False, 'note': None}", {"open": True, "closed": False, "note": None}),
+    ('{"text": "line one\nline two"}', {"text": "line one\nline two"}),
+    ("{'name': 'Musée d\\'Orsay'}", {"name": "Musée d'Orsay"}),
+])
+def test_repairs_common_defects(text, expected):
+    assert extract_json(text) == expected
+    for size in (1, 5, 64):
+        assert feed_in_chunks(text, size)[0].result() == expected
+
+
+def test_prefers_fenced_object_over_earlier_braces():
+    text = 'Example: {"x": 1}\n```json\n{"a": {"b": 1}}\n```'
+    assert extract_json(text) == {"a": {"b": 1}}
+
+
+def test_resumes_after_prose_braces():
+    text = 'Pick {"art" or "food"} then\n```json\n{"a": 1}\n```'
+    assert extract_json(text) == {"a": 1}
+    for size in (1, 3, 7, 100):
+        assert feed_in_chunks(text, size)[0].result() == {"a": 1}
+
+
+def test_resumes_inside_an_abandoned_candidate():
+    # The real object starts inside the brace that turned out to be prose
+    assert extract_json('Choose {one of {"a": 1}') == {"a": 1}
+
+
+@pytest.mark.parametrize("text", [
+    '{"a": tru',
+    '{"a":',
+    "{'title': 'Musée d'Orsay'}",
+    '{"cost": $25}',
+    'no json here',
+    '',
+])
+def test_unusable_input_returns_none(text):
+    assert extract_json(text) is None
+    assert feed_in_chunks(text, 2)[0].result() is None
+
+
+def test_truncation_keeps_complete_elements():
+    assert extract_json('{"a": [1, 2') == {"a": [1, 2]}
+    assert extract_json('{"a": 1, "b": tru') == {"a": 1}
+    assert extract_json('{"a": "x", "b": "cut off') == {"a": "x"}
+    assert extract_json('{"a": ["x", "y') == {"a": ["x"]}
+
+
+def test_truncation_drops_unfinished_objects():
+    slot = {"category": "Art", "best_time": "Morning", "options": [{"title": "Louvre"}]}
+    text = '{"time_slots": [' + json.dumps(slot) + ', {"category": "Art", "best_time": "Eve'
+    assert extract_json(text) == {"time_slots": [slot]}
+    text = '{"time_slots": [{"category": "Art", "options": [{"title": "Seine"}, {"title": "Lou'
+    assert extract_json(text) == {"time_slots": []}
+    for size in (1, 6):
+        assert feed_in_chunks(text, size)[0].result() == {"time_slots": []}
+
+
+def test_marks_repaired_output():
+    extractor, _ = feed_in_chunks('{"a": 1}', 3)
+    assert extractor.result() == {"a": 1} and not extractor.repaired
+    extractor, _ = feed_in_chunks('{"a": 1,}', 3)
+    assert extractor.result() == {"a": 1} and extractor.repaired
+
+
+def test_item_key_reports_items_as_they_complete():
+    text = '```json\n{"days": [{"day": 1, "activities": []}, {"day": 2, "activities": [{"title": "x"}]}]}\n```'
+    extractor, items = feed_in_chunks(text, 4, item_key="days")
+    assert items == [{"day": 1, "activities": []}, {"day": 2, "activities": [{"title": "x"}]}]
+    assert extractor.result()["days"] == items
+
+
+def test_stops_at_the_end_of_the_first_object():
+    extractor, _ = feed_in_chunks('{"a": 1} and then {"b": 2}', 4)
+    assert extractor.done
+    assert extractor.result() == {"a": 1}
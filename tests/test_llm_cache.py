@@ -0,0 +1,56 @@
+import sys
+import types
+
+import pytest
+
+from utils.llm_cache import ResponseCache, make_cache_key
+from utils.model_router import HAIKU, SONNET
+
+
+@pytest.fixture
+def planner(app, monkeypatch, tmp_path):
+    """The app module with a fresh response cache and route_message answering from `answers` (model, stop_reason)."""
+    module = sys.modules["flask_trip_planner"]
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(module, "get_response_cache", lambda: cache)
+    answers = []
+
+    def route_message(operation, details=None, **kwargs):
+        model, stop_reason = answers.pop(0)
+        details.update(model=model, stop_reason=stop_reason)
+        return types.SimpleNamespace(content=[types.SimpleNamespace(text=f'{{"answer": "{model}"}}')])
+
+    monkeypatch.setattr(module, "route_message", route_message)
+    return types.SimpleNamespace(module=module, cache=cache, answers=answers)
+
+
+def test_truncated_responses_are_not_cached(planner):
+    planner.answers.extend([(HAIKU, "max_tokens"), (HAIKU, "end_turn")])
+    planner.module.call_claude("plan", operation="alternative")
+    assert planner.cache.stats()["entries"] == 0
+
+    planner.module.call_claude("plan", operation="alternative")
+    assert planner.cache.stats()["entries"] == 1
+    assert planner.module.call_claude("plan", operation="alternative") == f'{{"answer": "{HAIKU}"}}'
+    assert not planner.answers
+
+
+def test_responses_are_keyed_on_the_model_that_answered(planner):
+    planner.answers.append((SONNET, "end_turn"))
+    planner.module.call_claude("plan", max_tokens=100, temperature=0, operation="alternative")
+
+    assert planner.cache.get(make_cache_key(SONNET, None, "plan", 0, 100)) is not None
+    assert planner.cache.get(make_cache_key(HAIKU, None, "plan", 0, 100)) is None
+    # The route's lookup finds the fallback model's answer
+    assert planner.module.call_claude("plan", max_tokens=100, temperature=0, operation="alternative") \
+        == f'{{"answer": "{SONNET}"}}'
+
+
+def test_cache_check_does_not_count_parse_failures(app):
+    from utils.metrics import json_parse_failures
+
+    has_json_key = sys.modules["flask_trip_planner"].has_json_key
+    before = json_parse_failures.render()
+    assert not has_json_key("days")("Sorry, I can't help with that.")
+    assert has_json_key("days")('{"days": []}')
+    assert json_parse_failures.render() == before
@@ -0,0 +1,79 @@
+import anthropic
+import httpx
+import pytest
+
+from utils import model_router
+from utils.model_router import HAIKU, SONNET, Route
+
+
+def overloaded():
+    request = httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+    return anthropic.InternalServerError(
+        "Overloaded", response=httpx.Response(529, request=request), body=None
+    )
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replaces create_message/stream_message; each test sets `failing` to the models that are overloaded."""
+    calls = {"models": [], "failing": set()}
+
+    def create_message(operation, max_retries, model, **kwargs):
+        calls["models"].append(model)
+        if model in calls["failing"]:
+            raise overloaded()
+        return f"answer from {model}"
+
+    def stream_message(operation, max_retries, model, **kwargs):
+        calls["models"].append(model)
+        if model in calls["failing"]:
+            raise overloaded()
+        yield from ("answer ", "from ", model)
+
+    monkeypatch.setattr(model_router, "create_message", create_message)
+    monkeypatch.setattr(model_router, "stream_message", stream_message)
+    monkeypatch.setitem(model_router.ROUTES, "test_route", Route((HAIKU, SONNET), timeout=5))
+    return calls
+
+
+def test_first_model_answers(calls):
+    assert model_router.route_message("test_route", max_tokens=10, messages=[]) == f"answer from {HAIKU}"
+    assert calls["models"] == [HAIKU]
+
+
+def test_falls_back_on_overload(calls):
+    calls["failing"] = {HAIKU}
+    assert model_router.route_message("test_route", max_tokens=10, messages=[]) == f"answer from {SONNET}"
+    assert "".join(model_router.route_stream("test_route", max_tokens=10, messages=[])) == f"answer from {SONNET}"
+    assert calls["models"] == [HAIKU, SONNET, HAIKU, SONNET]
+
+
+def test_last_model_failure_is_raised(calls):
+    calls["failing"] = {HAIKU, SONNET}
+    with pytest.raises(anthropic.InternalServerError):
+        model_router.route_message("test_route", max_tokens=10, messages=[])
+
+
+def test_non_retryable_errors_do_not_fall_back(calls, monkeypatch):
+    def create_message(operation, max_retries, model, **kwargs):
+        calls["models"].append(model)
+        raise ValueError("bad request")
+
+    monkeypatch.setattr(model_router, "create_message", create_message)
+    with pytest.raises(ValueError):
+        model_router.route_message("test_route", max_tokens=10, messages=[])
+    assert calls["models"] == [HAIKU]
+
+
+def test_cost_budget_skips_expensive_models():
+    route = Route((SONNET, HAIKU), max_cost=0.001)
+    assert model_router.candidate_models(route, {"max_tokens": 200, "messages": [{"content": "hi"}]}) == [HAIKU]
+    # Nothing fits: the cheapest model is still tried
+    assert model_router.candidate_models(route, {"max_tokens": 100000, "messages": []}) == [HAIKU]
+
+
+def test_route_overrides_from_environment():
+    routes = model_router.load_routes({"LLM_ROUTE_ALTERNATIVE": f"{SONNET}", "LLM_ROUTE_ALTERNATIVE_TIMEOUT": "7"})
+    assert routes["alternative"].models == (SONNET,)
+    assert routes["alternative"].timeout == 7.0
+    assert routes["suggestions"] == model_router.DEFAULT_ROUTES["suggestions"]
@@ -0,0 +1,10 @@
+from utils.prompts import MIN_CACHEABLE_TOKENS, PromptTemplate
+
+
+def test_only_long_prefixes_are_marked_for_prompt_caching():
+    short = PromptTemplate("short", system="Be brief.", instructions="Answer.", request="{q}", output_base=10)
+    assert "cache_control" not in short.system[0]
+
+    long = PromptTemplate("long", system="x" * (MIN_CACHEABLE_TOKENS * 4), instructions="", request="{q}", output_base=10)
+    assert long.system[0]["cache_control"] == {"type": "ephemeral"}
+    assert long.render(q="?").system is long.system
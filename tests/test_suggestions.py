@@ -0,0 +1,41 @@
+import sys
+
+
+def test_partial_slots_and_options_are_skipped(app):
+    format_suggestion_slot = sys.modules["flask_trip_planner"].format_suggestion_slot
+    option = {"title": "Louvre", "description": "Art", "duration": "2 hours", "cost": 20, "location": "Louvre, Paris"}
+    slot = {"category": "Culture", "best_time": "Morning", "options": [{"title": "Seine"}, option]}
+
+    suggestions = format_suggestion_slot(0, slot)
+    assert [(suggestion["id"], suggestion["title"]) for suggestion in suggestions] == [("sug_0_1", "Louvre")]
+    assert format_suggestion_slot(1, {"category": "Art", "best_time": "Eve"}) == []
+    assert format_suggestion_slot(2, "Morning") == []
+
+
+def test_unknown_job_is_resubmitted_in_the_background(app, monkeypatch):
+    module = sys.modules["flask_trip_planner"]
+    monkeypatch.setattr(module, "run_suggestions_job", lambda parameters, pool_id=None, report=None: [])
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["trip_parameters"] = {"start_date": "2025-06-01", "end_date": "2025-06-02"}
+        session["suggestions_job_id"] = "expired"
+
+    response = client.get("/api/suggestions")
+    assert response.status_code == 202
+    assert response.json["pending"] and response.json["suggestions"] == []
+    with client.session_transaction() as session:
+        assert session["suggestions_job_id"] == response.json["job_id"] != "expired"
+
+
+def test_trip_length_limit_only_applies_to_the_local_scheduler(app, monkeypatch):
+    module = sys.modules["flask_trip_planner"]
+    monkeypatch.setattr(module, "run_suggestions_job", lambda parameters, pool_id=None, report=None: [])
+    trip = {"startLocation": "Porto", "endLocation": "Lisbon", "startDate": "2025-06-01", "budget": 5000,
+            "peopleCount": 2, "naturalLanguageInput": "Museums"}
+    client = app.test_client()
+
+    long_trip = {**trip, "endDate": "2025-08-01"}
+    assert client.post("/api/trip", json=long_trip).status_code == 400
+    monkeypatch.setattr(module, "ITINERARY_SCHEDULER", "llm")
+    assert client.post("/api/trip", json=long_trip).status_code == 202
+    assert client.post("/api/trip", json={**trip, "endDate": "2025-05-01"}).status_code == 400
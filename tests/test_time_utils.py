@@ -0,0 +1,64 @@
+import pytest
+
+from utils.time_utils import UNSCHEDULED, normalize_time, parse_time, parse_time_range, sort_minutes
+from utils.trip_model import Activity
+
+
+@pytest.mark.parametrize("text, minutes", [
+    ("9:00 AM", 9 * 60),
+    ("9am", 9 * 60),
+    ("9 a.m.", 9 * 60),
+    ("12:30 PM", 12 * 60 + 30),
+    ("12 AM", 0),
+    ("09:00", 9 * 60),
+    ("14h30", 14 * 60 + 30),
+    ("1430", 14 * 60 + 30),
+    ("noon", 12 * 60),
+    ("Midnight", 0),
+])
+def test_parse_single_times(text, minutes):
+    assert parse_time(text) == minutes
+    assert parse_time_range(text) == (minutes, None)
+
+
+@pytest.mark.parametrize("text", ["TBD", "Flexible", "", "25:00", "9:75", "13pm", None, 930])
+def test_unparseable_times(text):
+    assert parse_time(text) is None
+    assert sort_minutes(text) == UNSCHEDULED
+    assert sort_minutes(text, end=True) == UNSCHEDULED
+
+
+@pytest.mark.parametrize("text, start, end", [
+    ("14:00-15:00", 14 * 60, 15 * 60),
+    ("9:00 AM – 10:30 AM", 9 * 60, 10 * 60 + 30),
+    ("10-11am", 10 * 60, 11 * 60),
+    ("11-1pm", 11 * 60, 13 * 60),
+    ("11am-1", 11 * 60, 13 * 60),
+    ("2pm-4", 14 * 60, 16 * 60),
+    ("noon to 2pm", 12 * 60, 14 * 60),
+])
+def test_parse_ranges(text, start, end):
+    assert parse_time_range(text) == (start, end)
+    assert parse_time(text) == start
+    assert sort_minutes(text) == start
+    assert sort_minutes(text, end=True) == end
+
+
+def test_normalize_rewrites_single_times_only():
+    assert normalize_time("9am") == "9:00 AM"
+    assert normalize_time("1430") == "2:30 PM"
+    assert normalize_time("14:00-15:00") == "14:00-15:00"
+    assert normalize_time("TBD") == "TBD"
+
+
+def test_activity_keeps_range_end_time_and_spans_it():
+    activity = Activity.from_dict({"title": "Museum", "start_time": "2pm", "end_time": "14:00-15:00"})
+    assert activity.start_time == "2:00 PM"
+    assert activity.end_time == "14:00-15:00"
+    assert (activity.start_minutes, activity.end_minutes) == (14 * 60, 15 * 60)
+
+
+def test_non_string_times_do_not_parse():
+    assert parse_time_range(["9"]) is None
+    assert parse_time({"start": "9am"}) is None
+    assert sort_minutes(None) == UNSCHEDULED
@@ -0,0 +1,106 @@
+from utils.trip_model import Activity, Trip
+
+
+def test_round_trip_keeps_compact_dicts(two_day_trip):
+    trip = Trip.from_list(two_day_trip)
+    days = trip.to_list()
+    assert [activity["id"] for day in days for activity in day["activities"]] == ["a1", "a2", "b1"]
+    # Optional state is only written once set
+    assert "todos" not in days[0]["activities"][0] and "confirmed" not in days[0]["activities"][0]
+    assert days[0]["activities"][1]["category"] == "Dining"
+    assert Trip.from_list(days).to_list() == days
+
+
+def test_activities_are_sorted_by_start_time():
+    trip = Trip.from_list([{"day": 1, "date": "2025-06-01", "activities": [
+        {"id": "late", "title": "Dinner", "start_time": "7:00 PM", "end_time": "8:00 PM"},
+        {"id": "tbd", "title": "Someday", "start_time": "TBD", "end_time": "TBD"},
+        {"id": "early", "title": "Breakfast", "start_time": "8am", "end_time": "9am"}
+    ]}])
+    assert [activity.id for activity in trip.days[0].activities] == ["early", "late", "tbd"]
+
+
+def test_index_follows_add_update_and_remove(two_day_trip):
+    trip = Trip.from_list(two_day_trip)
+    assert trip.get_activity("b1").title == "Tram 28"
+    assert trip.get_activity_day("b1").date == "2025-06-02"
+
+    added = trip.add_activity("2025-06-01", {"id": "a0", "title": "Coffee", "start_time": "8:00 AM",
+                                             "end_time": "8:30 AM", "cost": 4})
+    assert trip.days[0].activities[0] is added
+    assert trip.add_activity("2030-01-01", {"title": "Nowhere"}) is None
+
+    trip.update_activity("a0", start_time="3:00 PM", end_time="3:30 PM")
+    assert trip.days[0].activities[-1].id == "a0"
+    assert trip.update_activity("missing", title="x") is None
+
+    assert trip.remove_activity("a0").id == "a0"
+    assert trip.get_activity("a0") is None
+    assert trip.remove_activity("a0") is None
+
+
+def test_cost_ledger_tracks_edits(two_day_trip):
+    trip = Trip.from_list(two_day_trip)
+    assert trip.total_cost == 43
+    assert [day.spent for day in trip] == [40, 3]
+    assert trip.category_costs == {"Uncategorized": (18.0, 2), "Dining": (25.0, 1)}
+
+    trip.update_activity("a2", cost="$30", category="Food")
+    trip.remove_activity("b1")
+    assert trip.total_cost == 45
+    assert [day.spent for day in trip] == [45, 0]
+    assert trip.category_costs == {"Uncategorized": (15.0, 1), "Food": (30.0, 1)}
+
+
+def test_activity_from_llm_output_gets_an_id_and_clean_values():
+    activity = Activity.from_dict({"title": "Museum", "start_time": "10am", "end_time": "noon", "cost": "Free"})
+    assert activity.id
+    assert (activity.start_time, activity.end_time, activity.cost) == ("10:00 AM", "12:00 PM", 0.0)
+
+
+def test_parsed_trip_is_reused_only_after_a_save(app, trip_client, two_day_trip):
+    from utils.session_utils import get_trip_from_session, save_trip_to_session
+
+    client = trip_client(two_day_trip)
+    with client.session_transaction() as session:
+        cookie_session = dict(session)
+
+    def load():
+        with app.test_request_context():
+            from flask import session
+            session.update(cookie_session)
+            return get_trip_from_session()
+
+    # Unsaved trips are never handed out again, so edits that are discarded cannot leak
+    first = load()
+    first.remove_activity("a1")
+    assert load().get_activity("a1") is not None
+
+    with app.test_request_context():
+        from flask import session
+        session.update(cookie_session)
+        trip = get_trip_from_session()
+        trip.update_activity("a2", title="Late lunch")
+        save_trip_to_session(trip)
+        app.process_response(app.response_class())
+
+    reused = load()
+    assert reused is trip
+    assert reused.get_activity("a2").title == "Late lunch"
+    # Taken out of the cache while in use
+    assert load() is not trip
+
+
+def test_read_only_views_return_the_trip_to_the_cache(trip_client, two_day_trip, monkeypatch):
+    from utils import session_utils
+
+    client = trip_client(two_day_trip)
+    assert client.post("/api/trip/event/a1/confirm", json={"confirmed": True}).status_code == 200
+
+    parsed = []
+    from_list = Trip.from_list
+    monkeypatch.setattr(session_utils.Trip, "from_list", lambda days: parsed.append(days) or from_list(days))
+    for path in ("/api/trip/events", "/api/trip/budget", "/itinerary", "/todos"):
+        assert client.get(path).status_code == 200
+    assert client.post("/api/trip/event/b1/confirm", json={"confirmed": True}).status_code == 200
+    assert parsed == []
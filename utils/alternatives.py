@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.destinations import mentions_destination
+
+logger = logging.getLogger(__name__)
+
+
+class _TripAlternatives:
+    __slots__ = ("parameters", "slots", "queues", "seen", "refilling", "created_at")
+
+    def __init__(self, parameters, slots, seen):
+        self.parameters = parameters
+        self.slots = slots  # slot_index -> {"category", "best_time", "duration"}
+        self.queues = {slot_index: deque() for slot_index in slots}
+        self.seen = seen  # lower-cased titles already shown, served or rejected
+        self.refilling = set()
+        self.created_at = time.time()
+
+
+class AlternativesPool:
+    """Per-trip pools of pre-generated alternative suggestions, keyed by slot_index.
+
+    `prefetch` registers a trip's suggestions and fills every slot in the
+    background with one `generate(parameters, slots, exclude_titles, count)`
+    call, which returns {slot_index: [candidate, ...]}. `take` serves a
+    candidate from memory and refills the slot once it runs low. Candidates
+    that repeat a seen title or are not in the destination are dropped both
+    when they arrive and when they are served.
+    """
+
+    def __init__(self, generate, per_slot=3, low_water=1, max_trips=500, ttl=3600, max_workers=2):
+        self._generate = generate
+        self.per_slot = per_slot
+        self.low_water = low_water
+        self.max_trips = max_trips
+        self.ttl = ttl
+        self._trips = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="alternatives")
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def prefetch(self, pool_id, parameters, suggestions):
+        slots = {}
+        for suggestion in suggestions:
+            slots.setdefault(suggestion["slot_index"], {
+                "category": suggestion.get("category", ""),
+                "best_time": suggestion.get("best_time", ""),
+                "duration": suggestion.get("duration", "")
+            })
+        seen = {str(suggestion.get("title", "")).lower() for suggestion in suggestions}
+        with self._lock:
+            self._trips[pool_id] = _TripAlternatives(parameters, slots, seen)
+            self._trips.move_to_end(pool_id)
+            while len(self._trips) > self.max_trips:
+                self._trips.popitem(last=False)
+        self._schedule_refill(pool_id, list(slots))
+
+    def take(self, pool_id, slot_index=None, category=None, exclude=()):
+        """Returns a fresh alternative for the slot (or, without a slot, the category), or None."""
+        with self._lock:
+            trip = self._get(pool_id)
+            if trip is None:
+                self.misses += 1
+                return None
+            trip.seen.update(str(title).lower() for title in exclude)
+            if slot_index not in trip.slots:
+                slot_index = next(
+                    (index for index, slot in trip.slots.items() if slot["category"] == category), None
+                )
+            queue = trip.queues.get(slot_index)
+            candidate = None
+            while queue:
+                option = queue.popleft()
+                if self._acceptable(trip, option):
+                    candidate = option
+                    break
+                self.rejected += 1
+            if candidate is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                trip.seen.add(candidate["title"].lower())
+            low = [index for index, pending in trip.queues.items()
+                   if len(pending) <= self.low_water and index not in trip.refilling]
+        if low:
+            self._schedule_refill(pool_id, low)
+        return candidate
+
+    def mark_seen(self, pool_id, *titles):
+        with self._lock:
+            trip = self._get(pool_id)
+            if trip is not None:
+                trip.seen.update(str(title).lower() for title in titles)
+
+    def stats(self):
+        with self._lock:
+            pooled = sum(len(queue) for trip in self._trips.values() for queue in trip.queues.values())
+            trips = len(self._trips)
+        total = self.hits + self.misses
+        return {
+            "trips": trips,
+            "pooled": pooled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rejected": self.rejected,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def _get(self, pool_id):
+        trip = self._trips.get(pool_id)
+        if trip is not None and time.time() - trip.created_at > self.ttl:
+            del self._trips[pool_id]
+            return None
+        return trip
+
+    def _acceptable(self, trip, option):
+        if not isinstance(option, dict) or not option.get("title") or not option.get("location"):
+            return False
+        if option["title"].lower() in trip.seen:
+            return False
+        return mentions_destination(option["location"], trip.parameters.get("end_location", ""))
+
+    def _schedule_refill(self, pool_id, slot_indices):
+        with self._lock:
+            trip = self._get(pool_id)
+            if trip is None:
+                return
+            slot_indices = [index for index in slot_indices if index not in trip.refilling]
+            if not slot_indices:
+                return
+            trip.refilling.update(slot_indices)
+        self._executor.submit(self._refill, pool_id, slot_indices)
+
+    def _refill(self, pool_id, slot_indices):
+        with self._lock:
+            trip = self._get(pool_id)
+            if trip is None:
+                return
+            parameters = trip.parameters
+            slots = {index: trip.slots[index] for index in slot_indices}
+            exclude = sorted(trip.seen | {
+                option["title"].lower() for index in slot_indices for option in trip.queues[index]
+            })
+        try:
+            generated = self._generate(parameters, slots, exclude, self.per_slot) or {}
+        except Exception as e:
+            logger.error("Error prefetching alternatives: %s", e)
+            generated = {}
+        finally:
+            with self._lock:
+                trip.refilling.difference_update(slot_indices)
+
+        with self._lock:
+            pending_titles = {option["title"].lower() for queue in trip.queues.values() for option in queue}
+            for slot_index, options in generated.items():
+                if slot_index not in trip.queues:
+                    continue
+                for option in options:
+                    if self._acceptable(trip, option) and option["title"].lower() not in pending_titles:
+                        pending_titles.add(option["title"].lower())
+                        trip.queues[slot_index].append(option)
+                    else:
+                        self.rejected += 1
@@ -0,0 +1,55 @@
+# Spend within a cent of a budget is not reported as over it
+TOLERANCE = 0.005
+
+
+def _number(value, default=0.0):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _money(value):
+    return round(value, 2)
+
+
+def budget_report(trip, parameters):
+    """Compares a Trip's running cost ledger with the trip's budget.
+
+    Activity costs are for the whole group; `per_person` splits them over
+    people_count. Days without their own daily_budget get an even share of the
+    trip budget. Reads only the ledger, so it costs O(days + categories)
+    however many activities the trip has.
+    """
+    budget = _number(parameters.get('budget'))
+    people_count = max(1, int(_number(parameters.get('people_count'), 1)))
+    share = budget / len(trip) if budget and len(trip) else 0.0
+
+    days = []
+    for day in trip:
+        daily_budget = _number(day.daily_budget) or share
+        days.append({
+            "day": day.day,
+            "date": day.date,
+            "spent": _money(day.spent),
+            "daily_budget": _money(daily_budget),
+            "remaining": _money(daily_budget - day.spent) if daily_budget else None,
+            "over_budget": bool(daily_budget) and day.spent > daily_budget + TOLERANCE
+        })
+
+    total = trip.total_cost
+    return {
+        "total_cost": _money(total),
+        "budget": budget,
+        "remaining": _money(budget - total) if budget else None,
+        "over_budget": bool(budget) and total > budget + TOLERANCE,
+        "people_count": people_count,
+        "per_person": _money(total / people_count),
+        "budget_per_person": _money(budget / people_count) if budget else None,
+        "days": days,
+        "over_budget_days": [day["day"] for day in days if day["over_budget"]],
+        "categories": {
+            category: {"spent": _money(cost), "activities": count}
+            for category, (cost, count) in sorted(trip.category_costs.items())
+        }
+    }
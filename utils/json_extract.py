@@ -0,0 +1,352 @@
+import json
+import logging
+import re
+
+from utils.metrics import json_parse_failures
+
+logger = logging.getLogger(__name__)
+
+# Closing delimiter for each opening quote we accept as a JSON string delimiter
+QUOTE_PAIRS = {'"': '"', '“': '”', "'": "'", '‘': '’'}
+CLOSERS = {'{': '}', '[': ']'}
+
+WHITESPACE = re.compile(r'\s*')
+LITERAL = re.compile(r'[^\s{}\[\],:"\'“”‘’]+')
+STRING_SPECIALS = {
+    '"': re.compile(r'[\\"\n\r\t]'),
+    '”': re.compile(r'[\\"”\n\r\t]'),
+    "'": re.compile(r'[\\"\'\n\r\t]'),
+    '’': re.compile(r'[\\"’\n\r\t]')
+}
+CONTROL_ESCAPES = {'\n': '\\n', '\r': '\\r', '\t': '\\t'}
+JSON_LITERAL = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+PYTHON_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+# A ```json (or bare ```) fence opening an object
+FENCE = re.compile(r'```(?:json)?\s*(?=\{)', re.IGNORECASE)
+
+# What the scanner accepts next: a key or '}', a ':', a value (or ']' in an array),
+# or a ',' or closing bracket after a complete value
+KEY, COLON, VALUE, NEXT = "key", "colon", "value", "next"
+
+# How many earlier cut points to try when repairing a truncated response
+MAX_REPAIR_ATTEMPTS = 4
+
+
+class JsonExtractor:
+    """Single-pass, chunk-fed extractor for the first JSON object in an LLM response.
+
+    Text before the first `{` (prose, markdown fences) is skipped and anything
+    after the object closes is ignored. A `{` that turns out not to start an
+    object (prose like "pick {art or food}") is abandoned and scanning resumes
+    right after it. While scanning, the object is rewritten into strict JSON:
+    trailing commas are dropped, smart and single quotes become double quotes,
+    Python's True/False/None become JSON literals and raw control characters
+    inside strings are escaped. If the response is cut off, `result()` closes
+    whatever is still open after dropping the element being written: a cut-off
+    string, or a nested object that never closed and may be missing keys.
+
+    With `item_key`, `feed()` also returns every object that completes inside an
+    array stored under that key (e.g. each day of `"days": [...]`), so callers
+    can act on items before the full response arrives.
+    """
+
+    def __init__(self, item_key=None):
+        self.item_key = item_key
+        self._reset()
+
+    def feed(self, chunk):
+        """Consumes the next chunk of response text; returns newly completed items."""
+        items = []
+        while chunk:
+            chunk = self._scan(chunk, items)
+        return items
+
+    def _scan(self, chunk, items):
+        """Scans one chunk; returns the text to rescan when the current candidate is abandoned."""
+        i = 0
+        n = len(chunk)
+        # Where the candidate object starts in this chunk, for rescanning if it fails
+        candidate_start = 0
+
+        while i < n and not self.done:
+            if not self.started:
+                i = chunk.find('{', i)
+                if i == -1:
+                    break
+                candidate_start = i
+                self.started = True
+                self._open('{')
+                i += 1
+                continue
+
+            if self._in_string:
+                i = self._scan_string(chunk, i)
+                continue
+
+            if self._literal is not None:
+                match = LITERAL.match(chunk, i)
+                if match:
+                    self._literal += match.group()
+                    i = match.end()
+                    if i >= n:
+                        break
+                if not self._end_literal():
+                    return self._abandon(chunk, candidate_start)
+
+            i = WHITESPACE.match(chunk, i).end()
+            if i >= n:
+                break
+            char = chunk[i]
+
+            if char in '{[':
+                if self._expect != VALUE:
+                    return self._abandon(chunk, candidate_start)
+                self._flush_comma()
+                self._open(char)
+                i += 1
+            elif char in '}]':
+                bracket = self._stack[-1][0]
+                allowed = (KEY, NEXT) if bracket == '{' else (VALUE, NEXT)
+                if CLOSERS[bracket] != char or self._expect not in allowed:
+                    return self._abandon(chunk, candidate_start)
+                if self._pending_comma:
+                    self._pending_comma = False
+                    self.repaired = True
+                item = self._close()
+                if item is not None:
+                    items.append(item)
+                i += 1
+            elif char == ',':
+                if self._expect != NEXT:
+                    return self._abandon(chunk, candidate_start)
+                self._safe_points.append((len(self._out), [frame[0] for frame in self._stack]))
+                self._pending_comma = True
+                self._expect = KEY if self._stack[-1][0] == '{' else VALUE
+                i += 1
+            elif char == ':':
+                if self._expect != COLON:
+                    return self._abandon(chunk, candidate_start)
+                self._out.append(':')
+                self._expect = VALUE
+                if self._last_string is not None:
+                    start, end = self._last_string
+                    self._key = json.loads(''.join(self._out[start:end]))
+                    self._last_string = None
+                i += 1
+            elif char in QUOTE_PAIRS:
+                if self._expect not in (KEY, VALUE):
+                    return self._abandon(chunk, candidate_start)
+                self._flush_comma()
+                if char != '"':
+                    self.repaired = True
+                self._string_is_key = self._expect == KEY
+                self._key = None
+                self._in_string = True
+                self._closing_quote = QUOTE_PAIRS[char]
+                self._string_start = len(self._out)
+                self._out.append('"')
+                i += 1
+            elif char in '”’':
+                self.repaired = True  # Stray closing smart quote outside a string
+                i += 1
+            else:
+                if self._expect != VALUE:
+                    return self._abandon(chunk, candidate_start)
+                match = LITERAL.match(chunk, i)
+                self._flush_comma()
+                self._key = None
+                self._last_string = None
+                self._literal = match.group()
+                i = match.end()
+                # A literal running to the end of the chunk may continue in the next one
+                if i < n and not self._end_literal():
+                    return self._abandon(chunk, candidate_start)
+
+        if self.started and not self.done:
+            self._candidate.append(chunk[candidate_start:])
+        return None
+
+    def result(self):
+        """Returns the parsed object, repairing truncation if the stream ended early.
+
+        None when nothing usable was found, including a truncated object that
+        repairs to an empty one.
+        """
+        if not self.started:
+            return None
+        if self.done:
+            try:
+                return json.loads(''.join(self._out))
+            except json.JSONDecodeError:
+                return None
+
+        self.repaired = True
+        if self._literal is not None and not self._end_literal():
+            self._literal = None  # Cut off mid-literal ("tru"): drop it with its element
+        # Cut before the outermost unfinished nested object, or else an unfinished string
+        nested = [start for bracket, _, start in self._stack[1:] if bracket == '{']
+        cut = nested[0] if nested else self._string_start if self._in_string else None
+        if cut is None:
+            try:
+                return json.loads(''.join(self._out) + self._closers([frame[0] for frame in self._stack])) or None
+            except json.JSONDecodeError:
+                cut = len(self._out)
+
+        # Close from the last few complete elements before the cut
+        safe_points = [point for point in self._safe_points if point[0] <= cut]
+        for position, brackets in reversed(safe_points[-MAX_REPAIR_ATTEMPTS:]):
+            try:
+                return json.loads(''.join(self._out[:position]) + self._closers(brackets)) or None
+            except json.JSONDecodeError:
+                continue
+        return None
+
+    def _reset(self):
+        self.started = False
+        self.done = False
+        self.repaired = False
+        self._out = []
+        self._stack = []  # [bracket, key it sits under, index of bracket in _out]
+        self._expect = None
+        self._in_string = False
+        self._string_is_key = False
+        self._closing_quote = None
+        self._string_start = 0
+        self._escaped = False
+        self._literal = None
+        self._pending_comma = False
+        self._last_string = None
+        self._key = None
+        self._safe_points = []
+        self._candidate = []  # Raw text of the current candidate from earlier chunks
+
+    def _abandon(self, chunk, candidate_start):
+        """Drops the current candidate and returns its text after the opening `{` for rescanning."""
+        text = ''.join(self._candidate) + chunk[candidate_start:]
+        self._reset()
+        return text[1:]
+
+    def _end_literal(self):
+        """Validates and emits the pending literal; False if it is not a JSON value."""
+        literal, self._literal = self._literal, None
+        if literal in PYTHON_LITERALS:
+            literal = PYTHON_LITERALS[literal]
+            self.repaired = True
+        if not JSON_LITERAL.fullmatch(literal):
+            return False
+        self._out.append(literal)
+        self._expect = NEXT
+        return True
+
+    def _scan_string(self, chunk, i):
+        n = len(chunk)
+        if self._escaped:
+            self._escaped = False
+            i = self._escape(chunk[i], i)
+            return i
+        match = STRING_SPECIALS[self._closing_quote].search(chunk, i)
+        if not match:
+            self._out.append(chunk[i:])
+            return n
+        self._out.append(chunk[i:match.start()])
+        char = match.group()
+        i = match.end()
+        if char == '\\':
+            if i < n:
+                i = self._escape(chunk[i], i)
+            else:
+                self._escaped = True
+        elif char == self._closing_quote:
+            self._out.append('"')
+            self._in_string = False
+            self._last_string = (self._string_start, len(self._out))
+            self._expect = COLON if self._string_is_key else NEXT
+        elif char == '"':
+            self._out.append('\\"')
+        else:
+            self._out.append(CONTROL_ESCAPES[char])
+            self.repaired = True
+        return i
+
+    def _escape(self, char, i):
+        # \' is valid in single-quoted strings but not in JSON
+        if char == "'":
+            self._out.append("'")
+        else:
+            self._out.append('\\' + char)
+        return i + 1
+
+    def _flush_comma(self):
+        if self._pending_comma:
+            self._out.append(',')
+            self._pending_comma = False
+
+    def _open(self, bracket):
+        self._stack.append([bracket, self._key, len(self._out)])
+        self._out.append(bracket)
+        self._expect = KEY if bracket == '{' else VALUE
+        self._key = None
+        self._last_string = None
+        self._safe_points.append((len(self._out), [frame[0] for frame in self._stack]))
+
+    def _close(self):
+        bracket, _, start = self._stack.pop()
+        self._out.append(CLOSERS[bracket])
+        self._key = None
+        self._last_string = None
+
+        item = None
+        if (self.item_key is not None and bracket == '{' and self._stack
+                and self._stack[-1][0] == '[' and self._stack[-1][1] == self.item_key):
+            try:
+                item = json.loads(''.join(self._out[start:]))
+            except json.JSONDecodeError:
+                item = None
+
+        self._expect = NEXT
+        if not self._stack:
+            self.done = True
+        else:
+            self._safe_points.append((len(self._out), [frame[0] for frame in self._stack]))
+        return item
+
+    @staticmethod
+    def _closers(brackets):
+        return ''.join(CLOSERS[bracket] for bracket in reversed(brackets))
+
+
+_decoder = json.JSONDecoder()
+
+
+def _extract_from(response_text, start):
+    # Fast path: well-formed objects are decoded by the C scanner in one call
+    try:
+        data, _ = _decoder.raw_decode(response_text, start)
+        return data
+    except json.JSONDecodeError:
+        pass
+    extractor = JsonExtractor()
+    extractor.feed(response_text[start:])
+    return extractor.result()
+
+
+def extract_json(response_text):
+    """Extracts and repairs the first JSON object in a complete response text, preferring a ```json fence."""
+    fence = FENCE.search(response_text)
+    if fence:
+        data = _extract_from(response_text, fence.end())
+        if data is not None:
+            return data
+    start = response_text.find('{')
+    if start == -1:
+        return None
+    return _extract_from(response_text, start)
+
+
+def extract_json_from_claude(response_text):
+    """Extracts JSON from Claude responses, repairing common defects; None if nothing usable."""
+    data = extract_json(response_text)
+    if data is None:
+        json_parse_failures.inc()
+        logger.error("No usable JSON object in %d-char response: %r", len(response_text), response_text[:200])
+    return data
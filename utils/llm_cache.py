@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(model, system, prompt, temperature, max_tokens):
+    """Content-addressed key for a Claude request; whitespace in prompts is normalized.
+
+    `system` may be a string or a list of text blocks (cache_control markers are ignored).
+    """
+    if isinstance(system, list):
+        system = "\n".join(block.get("text", "") for block in system)
+    payload = json.dumps([
+        model,
+        " ".join((system or "").split()),
+        " ".join(prompt.split()),
+        temperature,
+        max_tokens
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of raw Claude response texts, written through to SQLite."""
+
+    def __init__(self, path, ttl=86400, max_entries=1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (text, created_at)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        """Warms the in-memory LRU from disk, most recently used last."""
+        cutoff = time.time() - self.ttl
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+        rows = self._conn.execute(
+            "SELECT key, text, created_at FROM responses ORDER BY last_used DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for key, text, created_at in reversed(rows):
+            self._entries[key] = (text, created_at)
+        self._conn.commit()
+
+    def get(self, *keys):
+        """Text stored under the first of `keys` that has a live entry; one lookup in the hit/miss stats."""
+        with self._lock:
+            now = time.time()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                text, created_at = entry
+                if now - created_at > self.ttl:
+                    del self._entries[key]
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    continue
+                self._entries.move_to_end(key)
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self._conn.commit()
+                self.hits += 1
+                return text
+            self.misses += 1
+            return None
+
+    def put(self, key, text):
+        with self._lock:
+            now = time.time()
+            self._entries[key] = (text, now)
+            self._entries.move_to_end(key)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, text, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, text, now, now)
+            )
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (evicted,))
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+_cache = None
+
+
+def get_response_cache():
+    """Returns the process-wide response cache configured from LLM_CACHE_* env vars."""
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache(
+            os.getenv("LLM_CACHE_PATH", "llm_cache.db"),
+            ttl=float(os.getenv("LLM_CACHE_TTL", 86400)),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1000))
+        )
+    return _cache
@@ -0,0 +1,233 @@
+import functools
+import inspect
+import logging
+import os
+import random
+import threading
+import time
+
+import anthropic
+
+from utils.metrics import llm_cost_dollars, llm_request_duration, llm_requests, llm_tokens
+
+logger = logging.getLogger(__name__)
+
+# 529 is Anthropic's "overloaded" status
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 1.0))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 20.0))
+
+# USD per million input/output tokens, for the spend estimate in /metrics
+MODEL_PRICING = {
+    "claude-3-opus-20240229": (15.0, 75.0),
+    "claude-3-5-sonnet-20240620": (3.0, 15.0),
+    "claude-3-sonnet-20240229": (3.0, 15.0),
+    "claude-3-haiku-20240307": (0.25, 1.25)
+}
+
+_client = None
+_client_lock = threading.Lock()
+_semaphore = threading.BoundedSemaphore(int(os.getenv("LLM_MAX_CONCURRENCY", 8)))
+
+_stats_lock = threading.Lock()
+_stats = {
+    "requests": 0,
+    "connections_opened": 0,
+    "retries": 0,
+    "failures": 0,
+    "in_flight": 0
+}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _trace(event_name, info):
+    # httpcore reports a TCP connect only when the pool has no idle connection to reuse
+    if event_name == "connection.connect_tcp.complete":
+        _count("connections_opened")
+
+
+def _on_request(request):
+    _count("requests")
+    request.extensions["trace"] = _trace
+
+
+def get_client():
+    """Returns the process-wide Anthropic client backed by a keep-alive connection pool."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # The SDK's own client class: newer SDK releases bundle a renamed httpx fork, and a
+                # plain httpx.Client is rejected there. Limits/Timeout come from the same package.
+                http_client = anthropic.DefaultHttpxClient(
+                    limits=type(anthropic.DEFAULT_CONNECTION_LIMITS)(
+                        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", 20)),
+                        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", 10)),
+                        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60))
+                    ),
+                    timeout=anthropic.Timeout(
+                        float(os.getenv("LLM_READ_TIMEOUT", 120)),
+                        connect=float(os.getenv("LLM_CONNECT_TIMEOUT", 10))
+                    ),
+                    event_hooks={"request": [_on_request]}
+                )
+                # Retries are handled here so the concurrency slot and backoff stay under our control
+                _client = anthropic.Anthropic(
+                    api_key=os.getenv("ANTHROPIC_API_KEY"),
+                    http_client=http_client,
+                    max_retries=0
+                )
+    return _client
+
+
+@functools.lru_cache(maxsize=None)
+def _declared_params(method):
+    """Keyword names `method` declares, or None when it takes any (**kwargs)."""
+    parameters = inspect.signature(method).parameters.values()
+    if any(parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters):
+        return None
+    return frozenset(parameter.name for parameter in parameters)
+
+
+def _request_kwargs(method, kwargs):
+    """Moves request fields the installed SDK method does not declare into extra_body.
+
+    SDK releases differ in which sampling fields (temperature, ...) they accept
+    as keywords; the API takes them all in the request body.
+    """
+    declared = _declared_params(getattr(method, "__func__", method))
+    if declared is None:
+        return kwargs
+    extra = {key: kwargs[key] for key in kwargs if key not in declared}
+    if not extra:
+        return kwargs
+    kwargs = {key: value for key, value in kwargs.items() if key in declared}
+    kwargs["extra_body"] = {**extra, **(kwargs.get("extra_body") or {})}
+    return kwargs
+
+
+def is_retryable(error):
+    """True for connection errors/timeouts and statuses worth retrying (rate limits, overload)."""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES
+
+
+def backoff_delay(attempt, error=None):
+    """Exponential backoff with full jitter, honoring Retry-After when the API sends one."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def estimate_cost(model, input_tokens, output_tokens):
+    input_price, output_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1e6
+
+
+def _record_usage(model, operation, usage):
+    if usage is None:
+        return
+    input_tokens = getattr(usage, "input_tokens", 0) or 0
+    output_tokens = getattr(usage, "output_tokens", 0) or 0
+    llm_tokens.observe(input_tokens, model=model, operation=operation, direction="input")
+    llm_tokens.observe(output_tokens, model=model, operation=operation, direction="output")
+    llm_cost_dollars.inc(estimate_cost(model, input_tokens, output_tokens), model=model, operation=operation)
+
+
+def _final_message(stream):
+    # Usage and stop_reason arrive in the closing message_delta; a stream without it still succeeded
+    try:
+        return stream.get_final_message()
+    except Exception:
+        return None
+
+
+def create_message(operation="other", max_retries=None, **kwargs):
+    """Sends a Messages API request through the shared client with concurrency limiting and retries.
+
+    `operation` names the calling feature in metrics; `max_retries` overrides
+    LLM_MAX_RETRIES; everything else goes to the SDK.
+    """
+    model = kwargs.get("model", "unknown")
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    with _semaphore, llm_request_duration.time(model=model, operation=operation, stream="false"):
+        _count("in_flight")
+        try:
+            for attempt in range(max_retries + 1):
+                try:
+                    messages = get_client().messages
+                    response = messages.create(**_request_kwargs(messages.create, kwargs))
+                    llm_requests.inc(model=model, operation=operation, outcome="ok")
+                    _record_usage(model, operation, getattr(response, "usage", None))
+                    return response
+                except Exception as e:
+                    if not is_retryable(e) or attempt == max_retries:
+                        _count("failures")
+                        llm_requests.inc(model=model, operation=operation, outcome="error")
+                        raise
+                    delay = backoff_delay(attempt, e)
+                    logger.warning("Claude API busy (%s), retrying in %.1fs", e.__class__.__name__, delay)
+                    _count("retries")
+                    time.sleep(delay)
+        finally:
+            _count("in_flight", -1)
+
+
+def stream_message(operation="other", max_retries=None, details=None, **kwargs):
+    """Yields text chunks from a streamed Messages API request.
+
+    Retries only happen before the first chunk arrives; a stream that fails
+    midway is surfaced to the caller. `details`, if given, is a dict that
+    receives the final message's "stop_reason" once the stream completes.
+    """
+    model = kwargs.get("model", "unknown")
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    with _semaphore, llm_request_duration.time(model=model, operation=operation, stream="true"):
+        _count("in_flight")
+        try:
+            for attempt in range(max_retries + 1):
+                started = False
+                try:
+                    messages = get_client().messages
+                    with messages.stream(**_request_kwargs(messages.stream, kwargs)) as stream:
+                        for text in stream.text_stream:
+                            started = True
+                            yield text
+                        llm_requests.inc(model=model, operation=operation, outcome="ok")
+                        final = _final_message(stream)
+                        _record_usage(model, operation, getattr(final, "usage", None))
+                        if details is not None:
+                            details["stop_reason"] = getattr(final, "stop_reason", None)
+                    return
+                except Exception as e:
+                    if started or not is_retryable(e) or attempt == max_retries:
+                        _count("failures")
+                        llm_requests.inc(model=model, operation=operation, outcome="error")
+                        raise
+                    delay = backoff_delay(attempt, e)
+                    logger.warning("Claude API busy (%s), retrying in %.1fs", e.__class__.__name__, delay)
+                    _count("retries")
+                    time.sleep(delay)
+        finally:
+            _count("in_flight", -1)
+
+
+def get_client_stats():
+    """Returns request, retry and connection reuse counters for the shared client."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["connections_reused"] = max(stats["requests"] - stats["connections_opened"], 0)
+    stats["reuse_rate"] = stats["connections_reused"] / stats["requests"] if stats["requests"] else 0.0
+    return stats
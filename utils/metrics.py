@@ -0,0 +1,247 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask.sessions import SecureCookieSessionInterface
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    """Base for labelled metrics; values are kept per tuple of label values."""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labelvalues, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labelvalues, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("_total", key, (), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [("", key, (), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        samples = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", key, (("le", _format_value(float(bound))),), cumulative))
+            samples.append(("_sum", key, (), total))
+            samples.append(("_count", key, (), count))
+        return samples
+
+
+REGISTRY = []
+
+
+def render_metrics():
+    """Renders every registered metric in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# HTTP
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route",
+    ["method", "endpoint", "status"]
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "Requests currently being handled", ["method", "endpoint"]
+)
+session_payload_bytes = Histogram(
+    "session_payload_bytes", "Size of the session cookie written to responses",
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384)
+)
+session_bytes_saved = Histogram(
+    "session_bytes_saved", "Cookie bytes a response avoided writing compared with the default JSON session",
+    labelnames=("reason",), buckets=(0, 64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+)
+trip_payload_bytes = Histogram(
+    "trip_payload_bytes", "Size of itinerary JSON written to the trip store",
+    buckets=(1024, 4096, 16384, 65536, 262144, 1048576)
+)
+
+# Claude
+llm_request_duration = Histogram(
+    "llm_request_duration_seconds", "Claude API call latency, including retries",
+    ["model", "operation", "stream"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+)
+llm_requests = Counter(
+    "llm_requests", "Claude API calls by outcome", ["model", "operation", "outcome"]
+)
+llm_tokens = Histogram(
+    "llm_tokens", "Tokens per Claude call", ["model", "operation", "direction"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000)
+)
+llm_cost_dollars = Counter(
+    "llm_cost_dollars", "Estimated Claude spend from reported token usage", ["model", "operation"]
+)
+llm_route_requests = Counter(
+    "llm_route_requests", "Routed Claude calls by route, model tried and outcome", ["route", "model", "outcome"]
+)
+prompt_tokens_estimate = Histogram(
+    "prompt_tokens_estimate", "Estimated input tokens per rendered prompt, measured before sending",
+    ["template"], buckets=(250, 500, 1000, 2000, 4000, 8000)
+)
+llm_cache_lookups = Counter(
+    "llm_cache_lookups", "Response cache lookups before calling Claude", ["operation", "result"]
+)
+single_flight_calls = Counter(
+    "single_flight_calls", "Coalesced generation calls: leaders ran it, followers shared the result",
+    ["name", "role"]
+)
+destination_index_lookups = Counter(
+    "destination_index_lookups", "Suggestion requests served from the destination index (hit) or sent to Claude (miss)",
+    ["result"]
+)
+json_parse_failures = Counter(
+    "json_parse_failures", "Claude responses with no usable JSON object"
+)
+
+
+def init_app(app):
+    """Registers per-route timing and session size instrumentation on a Flask app."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        http_requests_in_progress.inc(method=request.method, endpoint=g._metrics_endpoint)
+
+    @app.teardown_request
+    def _stop_timer(exc):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return
+        endpoint = g.pop("_metrics_endpoint")
+        status = g.pop("_metrics_status", 500)
+        http_requests_in_progress.dec(method=request.method, endpoint=endpoint)
+        http_request_duration.observe(
+            time.perf_counter() - start, method=request.method, endpoint=endpoint, status=status
+        )
+
+    @app.after_request
+    def _record_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    if type(app.session_interface) is SecureCookieSessionInterface:
+        app.session_interface = MeasuredSessionInterface()
+
+
+class MeasuredSessionInterface(SecureCookieSessionInterface):
+    """The default cookie session, recording the size of each cookie it writes."""
+
+    def save_session(self, app, session, response):
+        super().save_session(app, session, response)
+        size = self.written_size(app, response)
+        if size is not None:
+            session_payload_bytes.observe(size)
+
+    def written_size(self, app, response):
+        """Length of the session cookie value set on `response`, or None if it sets none."""
+        name = self.get_cookie_name(app)
+        for header in response.headers.getlist("Set-Cookie"):
+            if header.startswith(name + "="):
+                return len(header.split(";", 1)[0]) - len(name) - 1
+        return None
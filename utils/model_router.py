@@ -0,0 +1,209 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from utils.llm_client import create_message, estimate_cost, is_retryable, stream_message
+from utils.metrics import llm_route_requests
+from utils.prompts import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+OPUS = "claude-3-opus-20240229"
+SONNET = "claude-3-5-sonnet-20240620"
+HAIKU = "claude-3-haiku-20240307"
+
+# Latency samples kept per route for the p95 in /api/model-router/stats
+LATENCY_WINDOW = 500
+
+
+@dataclass(frozen=True)
+class Route:
+    """Models to try in order for one task, with its latency and cost budget.
+
+    `timeout` is the per-request timeout in seconds; a model that times out or
+    is overloaded after `retries` retries hands over to the next one. Models
+    whose estimated cost for a call exceeds `max_cost` dollars are skipped
+    unless none fit, in which case the cheapest is used.
+    """
+    models: tuple
+    timeout: float = 120.0
+    max_cost: float = None
+    retries: int = 1
+
+
+DEFAULT_ROUTES = {
+    "trip_plan": Route((SONNET, OPUS), timeout=120),
+    "trip_plan_chunk": Route((SONNET, HAIKU), timeout=60),
+    "suggestions": Route((SONNET, HAIKU), timeout=45),
+    "itinerary": Route((SONNET, OPUS), timeout=90),
+    "itinerary_polish": Route((SONNET, HAIKU), timeout=60),
+    "alternative": Route((HAIKU, SONNET), timeout=15, max_cost=0.01),
+    "alternatives_prefetch": Route((HAIKU, SONNET), timeout=30),
+    "json_repair": Route((HAIKU, SONNET), timeout=20, max_cost=0.02),
+    "other": Route((OPUS, SONNET), timeout=120)
+}
+
+
+def load_routes(environ=os.environ):
+    """Applies LLM_ROUTE_<NAME>=model,model and LLM_ROUTE_<NAME>_TIMEOUT/_MAX_COST/_RETRIES overrides."""
+    routes = {}
+    for name, route in DEFAULT_ROUTES.items():
+        prefix = f"LLM_ROUTE_{name.upper()}"
+        models = environ.get(prefix)
+        max_cost = environ.get(f"{prefix}_MAX_COST")
+        routes[name] = Route(
+            models=tuple(model.strip() for model in models.split(",") if model.strip()) if models else route.models,
+            timeout=float(environ.get(f"{prefix}_TIMEOUT", route.timeout)),
+            max_cost=float(max_cost) if max_cost else route.max_cost,
+            retries=int(environ.get(f"{prefix}_RETRIES", route.retries))
+        )
+        if not routes[name].models:
+            raise ValueError(f"{prefix} must list at least one model")
+    return routes
+
+
+ROUTES = load_routes()
+
+
+def get_route(name):
+    return ROUTES.get(name, ROUTES["other"])
+
+
+def _input_text(kwargs):
+    system = kwargs.get("system") or ""
+    if not isinstance(system, str):
+        system = "".join(block.get("text", "") for block in system)
+    return system + "".join(
+        message["content"] if isinstance(message["content"], str) else str(message["content"])
+        for message in kwargs.get("messages", [])
+    )
+
+
+def candidate_models(route, kwargs):
+    """The route's models that fit its cost budget for this request, in order."""
+    if route.max_cost is None:
+        return list(route.models)
+    input_tokens = estimate_tokens(_input_text(kwargs))
+    output_tokens = kwargs.get("max_tokens", 0)
+    costs = {model: estimate_cost(model, input_tokens, output_tokens) for model in route.models}
+    within = [model for model in route.models if costs[model] <= route.max_cost]
+    return within or [min(route.models, key=costs.get)]
+
+
+class _RouteStats:
+    __slots__ = ("requests", "fallbacks", "failures", "served_by", "latencies")
+
+    def __init__(self):
+        self.requests = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.served_by = {}
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _record(route_name, model, outcome, elapsed=None):
+    llm_route_requests.inc(route=route_name, model=model, outcome=outcome)
+    with _stats_lock:
+        stats = _stats.setdefault(route_name, _RouteStats())
+        if outcome == "fallback":
+            stats.fallbacks += 1
+            return
+        stats.requests += 1
+        stats.latencies.append(elapsed)
+        if outcome == "ok":
+            stats.served_by[model] = stats.served_by.get(model, 0) + 1
+        else:
+            stats.failures += 1
+
+
+def route_message(route_name, details=None, **kwargs):
+    """create_message() on the first model of the route that answers.
+
+    Falls back to the next model on timeouts, connection errors and retryable
+    statuses (overload, rate limits); other errors are raised immediately.
+    `details`, if given, is a dict that receives the "model" that answered and
+    the "stop_reason" of its response.
+    """
+    route = get_route(route_name)
+    models = candidate_models(route, kwargs)
+    start = time.perf_counter()
+    for position, model in enumerate(models):
+        try:
+            response = create_message(
+                operation=route_name, max_retries=route.retries,
+                model=model, timeout=route.timeout, **kwargs
+            )
+        except Exception as e:
+            if is_retryable(e) and position < len(models) - 1:
+                logger.warning("%s unavailable for %s (%s), falling back to %s", model, route_name, e.__class__.__name__, models[position + 1])
+                _record(route_name, model, "fallback")
+                continue
+            _record(route_name, model, "error", time.perf_counter() - start)
+            raise
+        _record(route_name, model, "ok", time.perf_counter() - start)
+        if details is not None:
+            details.update(model=model, stop_reason=getattr(response, "stop_reason", None))
+        return response
+
+
+def route_stream(route_name, details=None, **kwargs):
+    """stream_message() with the same fallback, which only applies before the first chunk.
+
+    `details`, if given, is a dict that receives the "model" that answered and
+    the "stop_reason" of its response.
+    """
+    route = get_route(route_name)
+    models = candidate_models(route, kwargs)
+    start = time.perf_counter()
+    for position, model in enumerate(models):
+        started = False
+        try:
+            for text in stream_message(
+                operation=route_name, max_retries=route.retries,
+                model=model, timeout=route.timeout, details=details, **kwargs
+            ):
+                started = True
+                yield text
+        except Exception as e:
+            if not started and is_retryable(e) and position < len(models) - 1:
+                logger.warning("%s unavailable for %s (%s), falling back to %s", model, route_name, e.__class__.__name__, models[position + 1])
+                _record(route_name, model, "fallback")
+                continue
+            _record(route_name, model, "error", time.perf_counter() - start)
+            raise
+        _record(route_name, model, "ok", time.perf_counter() - start)
+        if details is not None:
+            details["model"] = model
+        return
+
+
+def get_router_stats():
+    """Returns each route's models, budgets, fallback counts and latency percentiles."""
+    with _stats_lock:
+        snapshot = {
+            name: (stats.requests, stats.fallbacks, stats.failures, dict(stats.served_by), sorted(stats.latencies))
+            for name, stats in _stats.items()
+        }
+    result = {}
+    for name in sorted(set(ROUTES) | set(snapshot)):
+        route = get_route(name)
+        requests, fallbacks, failures, served_by, latencies = snapshot.get(name, (0, 0, 0, {}, []))
+        result[name] = {
+            "models": list(route.models),
+            "timeout": route.timeout,
+            "max_cost": route.max_cost,
+            "requests": requests,
+            "fallbacks": fallbacks,
+            "failures": failures,
+            "served_by": served_by,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else None
+        }
+    return result
@@ -0,0 +1,415 @@
+import math
+import textwrap
+from dataclasses import dataclass
+from string import Formatter
+
+from utils.metrics import prompt_tokens_estimate
+
+# Rough chars-per-token for English prose mixed with JSON; errs towards overestimating
+CHARS_PER_TOKEN = 3.5
+# Claude 3 models stop at 4096 output tokens regardless of the request
+MAX_OUTPUT_TOKENS = 4096
+# Anthropic ignores cache_control on prefixes shorter than this (Opus/Sonnet; Haiku needs 2048)
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@dataclass(frozen=True, slots=True)
+class RenderedPrompt:
+    system: list
+    prompt: str
+    max_tokens: int
+    input_tokens: int
+
+
+class PromptTemplate:
+    """A prompt split into a static system prefix and a per-request part.
+
+    The system text and instructions never change between requests, so they are
+    sent as one system block. It is marked for Anthropic prompt caching only once
+    it reaches MIN_CACHEABLE_TOKENS, below which the API ignores the marker; the
+    current templates are all shorter, so prompt caching is inactive for now.
+    Only `request` is formatted per call; `output_format` is appended to the
+    instructions verbatim. `max_tokens` for a response is sized as
+    `output_base + output_per_unit * units`, where a unit is whatever the output
+    scales with (trip days, time slots).
+    """
+
+    def __init__(self, name, system, instructions, request, output_base, output_per_unit=0,
+                 output_format="", max_output_tokens=MAX_OUTPUT_TOKENS):
+        self.name = name
+        self.request = textwrap.dedent(request).strip()
+        self.fields = frozenset(field for _, field, _, _ in Formatter().parse(self.request) if field)
+        self.output_base = output_base
+        self.output_per_unit = output_per_unit
+        self.max_output_tokens = max_output_tokens
+
+        prefix = "\n\n".join(
+            part for part in (system.strip(), textwrap.dedent(instructions).strip(), output_format) if part
+        )
+        self.prefix_tokens = estimate_tokens(prefix)
+        self.system = [{"type": "text", "text": prefix}]
+        if self.prefix_tokens >= MIN_CACHEABLE_TOKENS:
+            self.system[0]["cache_control"] = {"type": "ephemeral"}
+
+    def max_tokens(self, units=1):
+        return min(self.max_output_tokens, self.output_base + self.output_per_unit * max(units, 1))
+
+    def render(self, units=1, **values):
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Prompt '{self.name}' is missing values for: {', '.join(sorted(missing))}")
+        prompt = self.request.format(**values)
+        input_tokens = self.prefix_tokens + estimate_tokens(prompt)
+        prompt_tokens_estimate.observe(input_tokens, template=self.name)
+        return RenderedPrompt(self.system, prompt, self.max_tokens(units), input_tokens)
+
+
+PROMPTS = {}
+
+
+def register_prompt(template):
+    if template.name in PROMPTS:
+        raise ValueError(f"Prompt '{template.name}' is already registered")
+    PROMPTS[template.name] = template
+    return template
+
+
+def get_prompt(name):
+    return PROMPTS[name]
+
+
+_ACTIVITY_JSON = """\
+{
+  "title": "Activity name",
+  "start_time": "10:00 AM",
+  "end_time": "12:00 PM",
+  "location": "Specific location",
+  "cost": 40
+}"""
+
+_DAYS_JSON = """\
+{
+  "days": [
+    {
+      "day": 1,
+      "date": "YYYY-MM-DD",
+      "location": "City name",
+      "activities": [
+""" + textwrap.indent(_ACTIVITY_JSON, " " * 8) + """
+      ],
+      "daily_budget": 250
+    }
+  ]
+}"""
+
+_PLANNER_SYSTEM = (
+    "You are a travel planning assistant that creates detailed, realistic travel itineraries "
+    "with accurate transportation times, costs, and activities."
+)
+
+register_prompt(PromptTemplate(
+    "trip_plan",
+    system=_PLANNER_SYSTEM,
+    instructions="""
+        You are a professional travel planner creating a detailed, realistic travel itinerary
+        from the traveler's origin to their destination, based on their request.
+
+        **ITINERARY REQUIREMENTS**:
+        - Cover every date from the start date to the end date, one entry in "days" per date
+        - Keep the total cost within the budget for the whole group
+        - Include realistic transportation from the origin to the destination and back
+        - Include local attractions, food options, and activities at the destination
+        - Every activity must include: title, start time, end time, location, and estimated cost in dollars
+        - Every day must include: day number, date (YYYY-MM-DD), location, a list of activities and a daily budget
+
+        **IMPORTANT TRAVEL PLANNING GUIDELINES**:
+        1. Use realistic travel times between the origin and the destination
+        2. Choose the appropriate mode of transportation (flight, train, car, etc.)
+        3. Include check-in/check-out times for accommodations
+        4. Plan meals at appropriate times
+        5. Allow sufficient time between activities
+        6. Distribute the budget realistically across transportation, accommodation, food, and activities
+        7. Include popular tourist attractions and local experiences
+
+        **FORMAT YOUR RESPONSE AS VALID JSON ONLY**, matching this structure:
+    """,
+    output_format=_DAYS_JSON,
+    request="""
+        Origin: {start_location}
+        Destination: {end_location}
+        Dates: {start_date} to {end_date} ({trip_days} days)
+        Budget: ${budget} total for {people_count} traveler(s)
+        Request: "{natural_input}"
+    """,
+    output_base=400,
+    output_per_unit=600
+))
+
+register_prompt(PromptTemplate(
+    "trip_plan_chunk",
+    system=_PLANNER_SYSTEM,
+    instructions="""
+        You are a professional travel planner creating PART of a detailed, realistic travel itinerary.
+        Plan ONLY the requested days; other days are planned separately.
+
+        **ITINERARY REQUIREMENTS**:
+        - One entry in "days" per requested date, numbered as given
+        - Stay close to the given daily budget for the whole group
+        - Follow the notes about arrival, departure and travel days
+        - Include local attractions, food options, and activities at the destination
+        - Every activity must include: title, start time, end time, location, and estimated cost in dollars
+        - Plan meals at appropriate times and allow sufficient time between activities
+
+        **FORMAT YOUR RESPONSE AS VALID JSON ONLY**, matching this structure:
+    """,
+    output_format=_DAYS_JSON,
+    request="""
+        Trip: {trip_duration} days from {start_location} to {end_location}
+        Plan days {first_day} to {last_day} only, dates: {dates}
+        Budget: about ${daily_budget:.0f} per day for {people_count} traveler(s)
+        Notes:
+        {notes}
+        Request: "{natural_input}"
+    """,
+    output_base=200,
+    output_per_unit=600
+))
+
+register_prompt(PromptTemplate(
+    "suggestions",
+    system=(
+        "You are a local tour guide. Only suggest real, specific places and activities "
+        "in the city the traveler is visiting."
+    ),
+    instructions="""
+        Generate activity suggestions for tourists, grouped into time slots.
+
+        IMPORTANT: ALL suggestions MUST be real, existing places or activities in the destination.
+        Do NOT suggest generic activities or places from other locations.
+
+        For each time slot provide:
+        1. One main activity in the destination
+        2. One alternative activity in the destination that is:
+           - In the same category (e.g., both cultural, both outdoor)
+           - At a similar time of day
+           - Different from the main activity
+
+        Return ONLY valid JSON matching this EXACT format:
+        {
+          "time_slots": [
+            {
+              "category": "Category name",
+              "best_time": "Morning/Afternoon/Evening",
+              "options": [
+                {
+                  "title": "Activity in the destination",
+                  "description": "Brief description",
+                  "duration": "2-3 hours",
+                  "cost": 45,
+                  "location": "Specific location name in the destination"
+                },
+                {
+                  "title": "Alternative in the destination",
+                  "description": "Brief description",
+                  "duration": "2-3 hours",
+                  "cost": 45,
+                  "location": "Different specific location in the destination"
+                }
+              ]
+            }
+          ]
+        }
+    """,
+    request="""
+        Generate exactly {suggestions_count} time slots for tourists visiting {end_location},
+        each with one alternative option (total of {options_count} activities).
+
+        Trip Details:
+        - Location: {end_location}
+        - Duration: {trip_days} days ({suggestions_count} activities needed)
+        - Budget: ${budget} total for {people_count} people
+        - Dates: {start_date} to {end_date}
+        - Preferences: {preferences}
+    """,
+    output_base=200,
+    output_per_unit=200
+))
+
+register_prompt(PromptTemplate(
+    "itinerary",
+    system="You are a travel planning assistant that lays out chosen activities into a realistic schedule.",
+    instructions="""
+        Create a detailed day-by-day itinerary incorporating the traveler's selected activities.
+
+        Requirements:
+        1. Include all selected activities
+        2. Add necessary travel time between locations
+        3. Include meal breaks if not part of activities
+        4. Balance the schedule across available days
+        5. Consider activity timing preferences (morning/afternoon/evening)
+        6. Include specific start/end times for each activity, formatted "HH:MM AM/PM"
+
+        Return ONLY valid JSON matching this structure:
+    """,
+    output_format=_DAYS_JSON,
+    request="""
+        Selected activities:
+        {activities}
+
+        Trip Parameters:
+        - Start: {start_date} in {start_location}
+        - End: {end_date} in {end_location}
+        - Budget: ${budget}
+        - Group Size: {people_count}
+    """,
+    output_base=250,
+    output_per_unit=500
+))
+
+register_prompt(PromptTemplate(
+    "alternative",
+    system=(
+        "You are a local tour guide generating alternative activity suggestions. "
+        "Never repeat a previously suggested activity."
+    ),
+    instructions="""
+        Generate ONE alternative activity suggestion to replace one the traveler rejected.
+
+        Requirements:
+        - Same category, similar time of day and similar duration as the rejected activity
+        - Must be a DIFFERENT activity from every previously suggested activity
+        - Must be a real place/activity in the destination
+        - Should fit within the group's budget
+
+        For example:
+        - If a museum was rejected, suggest a different cultural venue
+        - If a restaurant was rejected, suggest a different cuisine or dining experience
+        - If an outdoor activity was rejected, suggest a different outdoor activity
+
+        Return ONLY valid JSON matching this EXACT format:
+        {
+          "title": "New Activity Name",
+          "description": "Brief 1-2 sentence description",
+          "duration": "Same duration as the rejected activity",
+          "cost": 45,
+          "category": "Same category as the rejected activity",
+          "location": "Specific location name and address in the destination",
+          "best_time": "Same best time as the rejected activity"
+        }
+    """,
+    request="""
+        Replace: "{title}"
+
+        Location: {end_location}
+        - Category: {category}
+        - Time of day: {best_time}
+        - Duration: {duration}
+        - Budget: ${budget} for {people_count} people
+
+        DO NOT suggest any of these previous activities:
+        {previous_suggestions}
+    """,
+    output_base=400
+))
+
+register_prompt(PromptTemplate(
+    "itinerary_polish",
+    system="You are a travel planning assistant that refines draft itineraries into realistic schedules.",
+    instructions="""
+        You are given a draft day-by-day itinerary that was laid out automatically from the
+        traveler's selected activities. Polish it:
+
+        1. Keep every activity on its day unless it clearly cannot work there
+        2. Adjust start/end times for realistic travel between locations and opening hours
+        3. Replace generic "Lunch break" / "Dinner" entries with specific places near the previous activity
+        4. Give activities with "TBD" times a realistic slot, moving them to another day if needed
+        5. Do not drop or rename selected activities
+        6. Use "HH:MM AM/PM" for all times and keep costs in dollars
+
+        Return the complete itinerary as valid JSON ONLY, matching this structure:
+    """,
+    output_format=_DAYS_JSON,
+    request="""
+        Trip Parameters:
+        - Start: {start_date} in {start_location}
+        - End: {end_date} in {end_location}
+        - Budget: ${budget}
+        - Group Size: {people_count}
+
+        Draft itinerary:
+        {draft}
+    """,
+    output_base=250,
+    output_per_unit=500
+))
+
+register_prompt(PromptTemplate(
+    "alternatives_batch",
+    system=(
+        "You are a local tour guide generating alternative activity suggestions. "
+        "Never repeat a previously suggested activity."
+    ),
+    instructions="""
+        Generate alternative activity suggestions for several time slots of a trip, so the
+        traveler can swap out suggestions they do not like.
+
+        Requirements for every alternative:
+        - Same category, similar time of day and similar duration as its slot
+        - Must be DIFFERENT from every previously suggested activity and from each other
+        - Must be a real place/activity in the destination, with the destination's name in its location
+        - Should fit within the group's budget
+
+        Return ONLY valid JSON matching this EXACT format:
+        {
+          "slots": [
+            {
+              "slot_index": 0,
+              "alternatives": [
+                {
+                  "title": "New Activity Name",
+                  "description": "Brief 1-2 sentence description",
+                  "duration": "2 hours",
+                  "cost": 45,
+                  "location": "Specific location name and address in the destination"
+                }
+              ]
+            }
+          ]
+        }
+    """,
+    request="""
+        Generate {count} alternatives for each of these time slots in {end_location}:
+        {slots}
+
+        Budget: ${budget} for {people_count} people
+
+        DO NOT suggest any of these previous activities:
+        {previous_suggestions}
+    """,
+    output_base=150,
+    output_per_unit=110
+))
+
+register_prompt(PromptTemplate(
+    "json_repair",
+    system="You repair malformed JSON produced by another model. You never add commentary.",
+    instructions="""
+        The response below was supposed to be a single JSON object but could not be parsed.
+        Rewrite it as ONE valid JSON object:
+        - Keep every key and value that is present; do not invent new data
+        - Fix quoting, escaping, missing commas and unbalanced brackets
+        - If the response was cut off, drop the incomplete last element and close the structure
+
+        Return ONLY the JSON object.
+    """,
+    request="""
+        Response to repair:
+        {response}
+    """,
+    output_base=200,
+    output_per_unit=110
+))
@@ -0,0 +1,193 @@
+import math
+import re
+from datetime import datetime, timedelta
+
+from utils.trip_model import parse_cost
+from utils.time_utils import format_time
+
+DAY_START = 8 * 60
+DAY_END = 23 * 60
+# Walking/transit time kept free between consecutive blocks
+TRAVEL_BUFFER = 30
+DEFAULT_DURATION = 120
+MAX_TRIP_DAYS = 30
+
+# Windows an activity may *start* in, by the suggestion's best_time
+TIME_WINDOWS = {
+    "morning": (9 * 60, 12 * 60),
+    "afternoon": (13 * 60 + 30, 18 * 60),
+    "evening": (18 * 60 + 30, 22 * 60)
+}
+ANY_TIME = (DAY_START, DAY_END)
+
+# (title, earliest start, latest start, duration); skipped when a dining activity covers the window
+MEAL_BREAKS = (
+    ("Lunch break", 12 * 60, 14 * 60, 60),
+    ("Dinner", 18 * 60 + 30, 21 * 60, 75)
+)
+DINING_KEYWORDS = ("lunch", "dinner", "restaurant", "bistro", "brasserie", "cafe", "café",
+                   "food", "dining", "brunch", "tasting", "market", "picnic")
+
+DURATION_PART = re.compile(
+    r'(\d+(?:\.\d+)?)(?:\s*(?:-|–|to)\s*(\d+(?:\.\d+)?))?\s*(hours?|hrs?|h|minutes?|mins?|m)\b',
+    re.IGNORECASE
+)
+
+
+def parse_duration(text, default=DEFAULT_DURATION):
+    """Parses suggestion durations ("2-3 hours", "90 minutes", "1 hour 30 minutes", "Half day") to minutes."""
+    if isinstance(text, (int, float)):
+        return max(15, int(text))
+    text = str(text or "").lower()
+    if "full day" in text or "all day" in text:
+        return 8 * 60
+    if "half day" in text or "half-day" in text:
+        return 4 * 60
+
+    total = 0.0
+    for low, high, unit in DURATION_PART.findall(text):
+        # Ranges are scheduled at their midpoint
+        value = (float(low) + float(high)) / 2 if high else float(low)
+        total += value * (60 if unit.startswith("h") else 1)
+    if not total:
+        return default
+    # Round to the quarter hour so generated times look hand-written
+    return max(15, int(round(total / 15)) * 15)
+
+
+def _window(best_time):
+    best_time = str(best_time or "").lower()
+    for name, window in TIME_WINDOWS.items():
+        if name in best_time:
+            return window
+    return ANY_TIME
+
+
+def _is_dining(activity):
+    text = f"{activity.get('category', '')} {activity.get('title', '')}".lower()
+    return any(keyword in text for keyword in DINING_KEYWORDS)
+
+
+class _DayPlan:
+    __slots__ = ("blocks", "unscheduled", "load")
+
+    def __init__(self):
+        self.blocks = []  # (start, end, activity dict), kept sorted by start
+        self.unscheduled = []  # activities that did not fit anywhere in the day
+        self.load = 0
+
+    def earliest_fit(self, duration, window, buffer=TRAVEL_BUFFER):
+        """Earliest start within `window` that leaves `buffer` minutes around existing blocks."""
+        first, last = window
+        candidates = [first] + [end + buffer for _, end, _ in self.blocks]
+        for start in sorted(candidate for candidate in candidates if first <= candidate <= last):
+            end = start + duration
+            if end > DAY_END:
+                continue
+            if all(end + buffer <= other_start or start >= other_end + buffer
+                   for other_start, other_end, _ in self.blocks):
+                return start
+        return None
+
+    def place(self, start, duration, activity):
+        self.blocks.append((start, start + duration, activity))
+        self.blocks.sort(key=lambda block: block[0])
+        self.load += duration
+
+    def covers(self, first, last):
+        return any(_is_dining(activity) and start <= last and end >= first
+                   for start, end, activity in self.blocks)
+
+
+def _trip_dates(parameters, activity_count):
+    try:
+        start = datetime.strptime(parameters["start_date"], "%Y-%m-%d")
+        end = datetime.strptime(parameters["end_date"], "%Y-%m-%d")
+        count = (end - start).days + 1
+    except (KeyError, TypeError, ValueError):
+        # Two activities a day when the dates are unusable
+        return [""] * max(1, min(MAX_TRIP_DAYS, math.ceil(activity_count / 2)))
+    count = max(1, min(MAX_TRIP_DAYS, count))
+    return [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(count)]
+
+
+def _scheduled(activity, start_time, end_time, destination):
+    return {
+        "title": activity.get("title", "Untitled Activity"),
+        "start_time": start_time,
+        "end_time": end_time,
+        "location": activity.get("location") or destination,
+        "cost": parse_cost(activity.get("cost", 0)),
+        "category": activity.get("category", "")
+    }
+
+
+def schedule_activities(selected_activities, parameters):
+    """Lays selected suggestions out across the trip's days without calling Claude.
+
+    Each activity goes to the least-busy day that has room for it in its
+    Morning/Afternoon/Evening window, at the earliest start that keeps a travel
+    buffer around other blocks. Activities that fit nowhere in their window are
+    placed at any free time; if a trip is too full even for that, they are kept
+    with "TBD" times for the traveler to place. Lunch and dinner breaks are added where no dining activity covers them.
+    Returns the same {"days": [...]} structure Claude is asked for.
+    """
+    dates = _trip_dates(parameters, len(selected_activities))
+    plans = [_DayPlan() for _ in dates]
+
+    for activity in selected_activities:
+        duration = parse_duration(activity.get("duration"))
+        placement = None
+        for window in (_window(activity.get("best_time")), ANY_TIME):
+            fits = []
+            for index, plan in enumerate(plans):
+                start = plan.earliest_fit(duration, window)
+                if start is not None:
+                    fits.append((plan.load, index, start))
+            if fits:
+                placement = min(fits)
+                break
+        if placement is None:
+            # Keep it on the least-busy day without inventing impossible times
+            plan = min(plans, key=lambda day_plan: day_plan.load)
+            plan.unscheduled.append(activity)
+            plan.load += duration
+            continue
+        _, index, start = placement
+        plans[index].place(start, duration, activity)
+
+    destination = parameters.get("end_location") or "TBD"
+    for plan in plans:
+        for title, first, last, duration in MEAL_BREAKS:
+            if plan.covers(first, last + duration):
+                continue
+            # Meals are taken near the previous venue, so they need no travel buffer
+            start = plan.earliest_fit(duration, (first, last), buffer=0)
+            if start is not None:
+                previous = [activity for _, end, activity in plan.blocks if end <= start]
+                location = previous[-1].get("location") if previous else None
+                plan.place(start, duration, {"title": title, "location": location or destination, "cost": 0, "category": "Dining"})
+
+    try:
+        daily_budget = round(float(parameters.get("budget")) / len(dates), 2)
+    except (TypeError, ValueError):
+        daily_budget = 0
+
+    return {
+        "days": [
+            {
+                "day": number,
+                "date": date,
+                "location": destination,
+                "activities": [
+                    _scheduled(activity, format_time(start), format_time(end), destination)
+                    for start, end, activity in plan.blocks
+                ] + [
+                    _scheduled(activity, "TBD", "TBD", destination)
+                    for activity in plan.unscheduled
+                ],
+                "daily_budget": daily_budget
+            }
+            for number, (date, plan) in enumerate(zip(dates, plans), start=1)
+        ]
+    }
@@ -1,15 +1,104 @@
-from flask import session, jsonify
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from flask import after_this_request, session
+from utils.trip_store import get_trip_store
+from utils.trip_model import Trip
 
-def save_trip_to_session(trip_plan, parameters):
-    """Stores the trip plan in session with correct IDs."""
-    session['trip_events'] = trip_plan
-    session['trip_parameters'] = parameters
-    session['locked_events'] = set()
-    session.modified = True
+# Parsed trips by trip ID as (store version, Trip), so edits skip re-parsing the stored JSON.
+# A request takes its entry out and it only goes back after the request saved the trip, or
+# when the request promised not to change it (readonly): no two requests share a Trip, and
+# edits a request discards (a failed batch) never return.
+TRIP_CACHE_SIZE = int(os.getenv("TRIP_CACHE_SIZE", 256))
+_parsed_trips = OrderedDict()
+_parsed_trips_lock = threading.Lock()
 
-def get_trip_from_session():
-    """Retrieves the stored trip from session."""
-    if 'trip_events' not in session:
-        return jsonify({"success": False, "error": "No itinerary found"}), 404
 
-    return session['trip_events']
+def _remember_trip(trip_id, version, trip, replace=True):
+    with _parsed_trips_lock:
+        if not replace and trip_id in _parsed_trips:
+            return
+        _parsed_trips[trip_id] = (version, trip)
+        _parsed_trips.move_to_end(trip_id)
+        while len(_parsed_trips) > TRIP_CACHE_SIZE:
+            _parsed_trips.popitem(last=False)
+
+
+def save_trip_to_session(trip_plan, parameters=None):
+    """Stores the trip plan server-side and keeps only its trip ID in the session."""
+    store = get_trip_store()
+    trip_id = session.get('trip_id') or store.new_id()
+    is_trip = isinstance(trip_plan, Trip)
+    version = store.save(trip_id, trip_plan.to_list() if is_trip else trip_plan)
+    session['trip_id'] = trip_id
+    if is_trip:
+        # Cached once the view is done with it, so no other request can see it half-read
+        @after_this_request
+        def remember(response):
+            _remember_trip(trip_id, version, trip_plan)
+            return response
+    # The cookie no longer needs the suggestions the itinerary was built from
+    session.pop('trip_suggestions', None)
+    if parameters is not None:
+        session['trip_parameters'] = parameters
+
+def get_trip_from_session(readonly=False):
+    """Retrieves the stored trip for this session as a Trip, or None if there is no itinerary.
+
+    The Trip belongs to the caller until it is saved: it comes from the parsed
+    trip cache when that still holds the stored version, otherwise it is
+    rebuilt from the store. With `readonly`, the caller must not change it and
+    it goes back into the cache once the request is done.
+    """
+    trip_id = session.get('trip_id')
+    if not trip_id:
+        return None
+    store = get_trip_store()
+    version = store.get_version(trip_id)
+    if version is None:
+        return None
+    with _parsed_trips_lock:
+        cached = _parsed_trips.pop(trip_id, None)
+    if cached is not None and cached[0] == version:
+        trip = cached[1]
+    else:
+        days = store.load(trip_id)
+        if days is None:
+            return None
+        trip = Trip.from_list(days)
+    if readonly:
+        # A save by another request in the meantime cached a newer version; keep that one
+        @after_this_request
+        def remember(response):
+            _remember_trip(trip_id, version, trip, replace=False)
+            return response
+    return trip
+
+def get_or_create_trip_id():
+    """Returns this session's trip ID, allocating one if needed.
+
+    Streaming responses call this before the first byte is sent, since the
+    session cookie can no longer change once headers are out.
+    """
+    trip_id = session.get('trip_id')
+    if not trip_id:
+        trip_id = get_trip_store().new_id()
+        session['trip_id'] = trip_id
+    return trip_id
+
+def get_trip_etag():
+    """Returns an ETag for this session's trip, or None if there is no itinerary.
+
+    It changes whenever the stored trip is saved (version bump) or the trip
+    parameters shown alongside it change, and costs no trip deserialization.
+    """
+    trip_id = session.get('trip_id')
+    if not trip_id:
+        return None
+    version = get_trip_store().get_version(trip_id)
+    if version is None:
+        return None
+    parameters = json.dumps(session.get('trip_parameters', {}), sort_keys=True)
+    return f"{trip_id}-{version}-{hashlib.md5(parameters.encode('utf-8')).hexdigest()[:8]}"
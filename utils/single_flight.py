@@ -0,0 +1,69 @@
+import copy
+import logging
+import threading
+
+from utils.metrics import single_flight_calls
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait up to `timeout` seconds and get a deep copy of its
+    result (or its exception) instead of running it again. A waiter that times
+    out runs the function itself. Nothing is kept once the call finishes, so
+    this only deduplicates in-flight work; repeats later on are the response
+    cache's job.
+    """
+
+    def __init__(self, name, timeout=60.0):
+        self.name = name
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(self.timeout):
+                single_flight_calls.inc(name=self.name, role="follower")
+                if call.error is not None:
+                    raise call.error
+                return copy.deepcopy(call.result)
+            single_flight_calls.inc(name=self.name, role="timeout")
+            logger.warning("Gave up waiting on in-flight %s after %ss, running it again", self.name, self.timeout)
+            return fn(*args, **kwargs)
+
+        single_flight_calls.inc(name=self.name, role="leader")
+        try:
+            result = fn(*args, **kwargs)
+            # Waiters copy from a snapshot, so the leader's caller may mutate its own result
+            call.result = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,10 @@
+import json
+
+
+def format_sse(data, event=None):
+    """Formats a payload as a Server-Sent Events message."""
+    message = f"data: {json.dumps(data)}\n\n"
+    if event:
+        message = f"event: {event}\n{message}"
+    return message
+
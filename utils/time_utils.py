@@ -0,0 +1,130 @@
+from functools import lru_cache
+
+MINUTES_PER_DAY = 24 * 60
+# Sort key for times that cannot be parsed ("TBD", "Flexible"): after everything else in the day
+UNSCHEDULED = MINUTES_PER_DAY
+
+NAMED_TIMES = {"noon": 12 * 60, "midday": 12 * 60, "midnight": 0}
+RANGE_SEPARATORS = ("–", "—", " to ", "-")
+MERIDIEMS = {"am": "am", "a.m.": "am", "a.m": "am", "a": "am", "pm": "pm", "p.m.": "pm", "p.m": "pm", "p": "pm"}
+
+
+def _scan_clock(text):
+    """Parses "10", "10:30", "10.30", "14h30", "1430" with an optional am/pm suffix.
+
+    Returns (hours, minutes, meridiem or None), or None if `text` is not a time.
+    """
+    i, n = 0, len(text)
+    while i < n and text[i].isdigit():
+        i += 1
+    digits = text[:i]
+    if not digits or len(digits) > 4:
+        return None
+    if len(digits) > 2:
+        # Military style "1430" / "930"
+        hours, minutes = int(digits[:-2]), int(digits[-2:])
+    else:
+        hours, minutes = int(digits), 0
+        if i < n and text[i] in ":.h" and text[i + 1:i + 3].isdigit():
+            minutes = int(text[i + 1:i + 3])
+            i += 3
+        elif i < n and text[i] == "h":
+            i += 1
+
+    suffix = text[i:].strip()
+    meridiem = None
+    if suffix:
+        meridiem = MERIDIEMS.get(suffix)
+        if meridiem is None:
+            return None
+    if minutes > 59 or hours > 24 or (hours == 24 and minutes) or (meridiem and not 1 <= hours <= 12):
+        return None
+    return hours, minutes, meridiem
+
+
+def _to_minutes(hours, minutes, meridiem):
+    if meridiem == "am":
+        hours %= 12
+    elif meridiem == "pm":
+        hours = hours % 12 + 12
+    return (hours * 60 + minutes) % MINUTES_PER_DAY
+
+
+def parse_time_range(text):
+    """(start, end) in minutes since midnight for a time or a range, or None.
+
+    `end` is None for a single time. In ranges such as "14:00-15:00" or
+    "10-11am", a side without am/pm takes the other side's.
+    """
+    # Checked before the cache, which cannot hash lists or dicts from request JSON
+    if not isinstance(text, str):
+        return None
+    return _parse_time_range(text)
+
+
+@lru_cache(maxsize=4096)
+def _parse_time_range(text):
+    text = " ".join(text.lower().split())
+    if text in NAMED_TIMES:
+        return NAMED_TIMES[text], None
+
+    for separator in RANGE_SEPARATORS:
+        if separator in text:
+            start, end = (part.strip() for part in text.split(separator, 1))
+            start_clock = _scan_clock(start) if start not in NAMED_TIMES else (NAMED_TIMES[start] // 60, 0, None)
+            end_clock = _scan_clock(end) if end not in NAMED_TIMES else (NAMED_TIMES[end] // 60, 0, None)
+            if start_clock is None or end_clock is None:
+                return None
+            hours, minutes, meridiem = start_clock
+            if meridiem is None and end_clock[2] is not None and 1 <= hours <= 12:
+                meridiem = end_clock[2]
+                # "11-1pm" starts in the morning
+                if _to_minutes(hours, minutes, meridiem) > _to_minutes(*end_clock):
+                    meridiem = "am"
+            start_minutes = _to_minutes(hours, minutes, meridiem)
+            hours, minutes, end_meridiem = end_clock
+            if end_meridiem is None and meridiem is not None and 1 <= hours <= 12:
+                end_meridiem = meridiem
+                # "11am-1" ends in the afternoon
+                if _to_minutes(hours, minutes, end_meridiem) < start_minutes:
+                    end_meridiem = "pm"
+            return start_minutes, _to_minutes(hours, minutes, end_meridiem)
+
+    clock = _scan_clock(text)
+    return (_to_minutes(*clock), None) if clock else None
+
+
+def parse_time(text):
+    """Minutes since midnight for the times Claude and the UI produce, or None.
+
+    Handles "9:00 AM", "9am", "9 a.m.", "09:00", "14h30", "1430", "noon" and
+    ranges such as "14:00-15:00" or "10-11am" (the start is returned).
+    """
+    parsed = parse_time_range(text)
+    return None if parsed is None else parsed[0]
+
+
+def sort_minutes(text, end=False):
+    """parse_time() for use as a sort key; unparseable times sort last.
+
+    With `end`, a range gives its end, for use as an activity's end time.
+    """
+    parsed = parse_time_range(text)
+    if parsed is None:
+        return UNSCHEDULED
+    start, range_end = parsed
+    return range_end if end and range_end is not None else start
+
+
+def format_time(minutes):
+    """Formats minutes since midnight like the rest of the app ("9:00 AM")."""
+    hours, mins = divmod(int(minutes) % MINUTES_PER_DAY, 60)
+    return f"{hours % 12 or 12}:{mins:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def normalize_time(text):
+    """Rewrites a single parseable time in the canonical "9:00 AM" form; ranges and anything else are returned as-is."""
+    parsed = parse_time_range(text)
+    if parsed is None or parsed[1] is not None:
+        return text
+    return format_time(parsed[0])
@@ -0,0 +1,240 @@
+import uuid
+from bisect import insort
+from dataclasses import dataclass, field
+
+from utils.time_utils import UNSCHEDULED, normalize_time, sort_minutes
+from utils.conflicts import span
+
+
+def parse_cost(value):
+    """Coerces an LLM- or user-supplied cost ("45", 45, "$45", "Free") to a float."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace('$', '').replace(',', '').strip())
+    except ValueError:
+        return 0.0
+
+
+@dataclass(slots=True, eq=False)
+class Activity:
+    id: str
+    title: str
+    start_time: str = "TBD"
+    end_time: str = "TBD"
+    location: str = ""
+    cost: float = 0.0
+    category: str = ""
+    confirmed: bool = False
+    todos: list = field(default_factory=list)
+    # Parsed once here so sorting and overlap checks never re-parse the strings
+    start_minutes: int = UNSCHEDULED
+    end_minutes: int = UNSCHEDULED
+
+    def __post_init__(self):
+        self.start_minutes = sort_minutes(self.start_time)
+        self.end_minutes = sort_minutes(self.end_time, end=True)
+
+    @classmethod
+    def from_dict(cls, data, default_location=""):
+        return cls(
+            id=str(data.get("id") or uuid.uuid4()),
+            title=data.get("title", "Untitled Activity"),
+            start_time=normalize_time(data.get("start_time", "TBD")),
+            end_time=normalize_time(data.get("end_time", "TBD")),
+            location=data.get("location", default_location),
+            cost=parse_cost(data.get("cost", 0)),
+            category=data.get("category") or "",
+            confirmed=bool(data.get("confirmed", False)),
+            todos=data.get("todos") or []
+        )
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "title": self.title,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "location": self.location,
+            "cost": self.cost
+        }
+        # Only persist optional state once it has been set
+        if self.category:
+            data["category"] = self.category
+        if self.confirmed:
+            data["confirmed"] = True
+        if self.todos:
+            data["todos"] = self.todos
+        return data
+
+
+def _activity_sort_key(activity):
+    return activity.start_minutes
+
+
+@dataclass(slots=True)
+class Day:
+    day: int
+    date: str = ""
+    location: str = "TBD"
+    daily_budget: float = 0
+    activities: list = field(default_factory=list)
+    # Sum of activity costs, kept current by Trip; never persisted
+    spent: float = 0.0
+    # Upper bound on any activity's duration, for the overlap search in utils/conflicts.py
+    longest: int = 0
+
+    @classmethod
+    def from_dict(cls, data, day_number):
+        day = cls(
+            day=data.get("day", day_number),
+            date=data.get("date", ""),
+            location=data.get("location", "TBD"),
+            daily_budget=data.get("daily_budget", 0)
+        )
+        for activity in data.get("activities") or []:
+            if isinstance(activity, dict):
+                activity = Activity.from_dict(activity, day.location)
+                day.activities.append(activity)
+                day.spent += activity.cost
+                day.fit(activity)
+        day.activities.sort(key=_activity_sort_key)
+        return day
+
+    def to_dict(self):
+        return {
+            "day": self.day,
+            "date": self.date,
+            "location": self.location,
+            "activities": [activity.to_dict() for activity in self.activities],
+            "daily_budget": self.daily_budget
+        }
+
+    def insert(self, activity):
+        """Inserts an activity keeping the list sorted by start time."""
+        insort(self.activities, activity, key=_activity_sort_key)
+        self.fit(activity)
+
+    def fit(self, activity):
+        """Widens `longest` to cover the activity; it never shrinks, which only widens searches."""
+        activity_span = span(activity)
+        if activity_span is not None:
+            self.longest = max(self.longest, activity_span[1] - activity_span[0])
+
+
+UNCATEGORIZED = "Uncategorized"
+
+
+class Trip:
+    """An itinerary: days with time-sorted activities and an id -> activity index.
+
+    Also keeps a running cost ledger (trip total, per-category totals and each
+    day's `spent`) that add/update/remove maintain incrementally, so budget
+    views never walk the activities.
+    """
+
+    __slots__ = ("days", "_index", "total_cost", "category_costs")
+
+    def __init__(self, days=None):
+        self.days = days or []
+        self._index = {}
+        self.total_cost = 0.0
+        self.category_costs = {}  # category -> (cost, activity count)
+        for day in self.days:
+            for activity in day.activities:
+                self._index[activity.id] = (day, activity)
+                self._charge_category(activity, 1)
+            self.total_cost += day.spent
+
+    def _charge_category(self, activity, sign):
+        category = activity.category or UNCATEGORIZED
+        cost, count = self.category_costs.get(category, (0.0, 0))
+        if count + sign:
+            self.category_costs[category] = (cost + sign * activity.cost, count + sign)
+        else:
+            self.category_costs.pop(category, None)
+
+    def _charge(self, day, activity, sign):
+        day.spent += sign * activity.cost
+        self.total_cost += sign * activity.cost
+        self._charge_category(activity, sign)
+
+    @classmethod
+    def from_list(cls, days_data):
+        """Builds a trip from a list of day dicts (stored JSON or LLM output)."""
+        return cls([
+            Day.from_dict(day, day_index + 1)
+            for day_index, day in enumerate(days_data)
+            if isinstance(day, dict)
+        ])
+
+    def to_list(self):
+        return [day.to_dict() for day in self.days]
+
+    def __iter__(self):
+        return iter(self.days)
+
+    def __len__(self):
+        return len(self.days)
+
+    def get_activity(self, activity_id):
+        entry = self._index.get(str(activity_id))
+        return entry[1] if entry else None
+
+    def get_activity_day(self, activity_id):
+        entry = self._index.get(str(activity_id))
+        return entry[0] if entry else None
+
+    def get_day(self, date):
+        for day in self.days:
+            if day.date == date:
+                return day
+        return None
+
+    def add_activity(self, date, data):
+        """Adds an activity to the day with the given date; returns it, or None if no such day."""
+        day = self.get_day(date)
+        if day is None:
+            return None
+        activity = Activity.from_dict(data, day.location)
+        day.insert(activity)
+        self._index[activity.id] = (day, activity)
+        self._charge(day, activity, 1)
+        return activity
+
+    def update_activity(self, activity_id, **fields):
+        """Updates an activity in place, re-sorting its day if the start time moved."""
+        entry = self._index.get(str(activity_id))
+        if entry is None:
+            return None
+        day, activity = entry
+        if "cost" in fields:
+            fields["cost"] = parse_cost(fields["cost"])
+        for name in ("start_time", "end_time"):
+            if name in fields:
+                fields[name] = normalize_time(fields[name])
+        recharge = "cost" in fields or "category" in fields
+        if recharge:
+            self._charge(day, activity, -1)
+        for name, value in fields.items():
+            setattr(activity, name, value)
+        if recharge:
+            self._charge(day, activity, 1)
+        if "end_time" in fields:
+            activity.end_minutes = sort_minutes(activity.end_time, end=True)
+        if "start_time" in fields:
+            day.activities.remove(activity)
+            activity.start_minutes = sort_minutes(activity.start_time)
+            day.insert(activity)
+        elif "end_time" in fields:
+            day.fit(activity)
+        return activity
+
+    def remove_activity(self, activity_id):
+        entry = self._index.pop(str(activity_id), None)
+        if entry is None:
+            return None
+        day, activity = entry
+        day.activities.remove(activity)
+        self._charge(day, activity, -1)
+        return activity
@@ -0,0 +1,103 @@
+import uuid
+
+from utils.conflicts import find_conflicts
+
+MODIFIABLE_FIELDS = ('title', 'start_time', 'end_time', 'location', 'cost', 'category')
+NEW_EVENT_FIELDS = ('title', 'start_time', 'end_time', 'location', 'cost')
+OPTIONAL_EVENT_FIELDS = ('category',)
+TIME_FIELDS = ('start_time', 'end_time')
+MAX_BATCH_OPERATIONS = 200
+
+
+class OperationError(Exception):
+    """An itinerary operation that cannot be applied; carries the HTTP status to report."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def check_times(fields):
+    """Raises OperationError unless every start/end time in `fields` is a string."""
+    for name in TIME_FIELDS:
+        if name in fields and not isinstance(fields[name], str):
+            raise OperationError(f"{name} must be a string")
+
+
+def _require_activity(trip, op):
+    if 'id' not in op:
+        raise OperationError("Missing event id")
+    activity = trip.get_activity(op['id'])
+    if activity is None:
+        raise OperationError("Event not found", 404)
+    return activity
+
+
+def apply_operation(trip, op):
+    """Applies one add/modify/delete/confirm/todos operation to a Trip in memory."""
+    kind = op.get('op')
+
+    if kind == 'add':
+        missing = [name for name in ('day_date',) + NEW_EVENT_FIELDS if name not in op]
+        if missing:
+            raise OperationError(f"Missing fields: {', '.join(missing)}")
+        check_times(op)
+        data = {name: op[name] for name in NEW_EVENT_FIELDS + OPTIONAL_EVENT_FIELDS if name in op}
+        data['id'] = str(uuid.uuid4())
+        activity = trip.add_activity(op['day_date'], data)
+        if activity is None:
+            raise OperationError("Day not found", 404)
+        return {"event": activity.to_dict(), "conflicts": find_conflicts(trip.get_day(op['day_date']), activity)}
+
+    if kind == 'modify':
+        _require_activity(trip, op)
+        fields = {name: op[name] for name in MODIFIABLE_FIELDS if name in op}
+        if not fields:
+            raise OperationError("No fields to modify")
+        check_times(fields)
+        activity = trip.update_activity(op['id'], **fields)
+        conflicts = find_conflicts(trip.get_activity_day(activity.id), activity)
+        return {"event": activity.to_dict(), "conflicts": conflicts}
+
+    if kind == 'delete':
+        _require_activity(trip, op)
+        trip.remove_activity(op['id'])
+        return {"id": str(op['id'])}
+
+    if kind == 'confirm':
+        _require_activity(trip, op)
+        activity = trip.update_activity(op['id'], confirmed=bool(op.get('confirmed', True)))
+        return {"id": activity.id, "confirmed": activity.confirmed}
+
+    if kind == 'todos':
+        _require_activity(trip, op)
+        if not isinstance(op.get('todos'), list):
+            raise OperationError("todos must be a list")
+        fields = {'todos': op['todos']}
+        if 'confirmed' in op:
+            fields['confirmed'] = bool(op['confirmed'])
+        activity = trip.update_activity(op['id'], **fields)
+        return {"id": activity.id, "confirmed": activity.confirmed}
+
+    raise OperationError(f"Unknown operation: {kind}")
+
+
+def apply_batch(trip, operations):
+    """Applies operations in order; stops at the first failure.
+
+    Returns (results, failed) where `failed` is False only when every operation
+    succeeded. Callers must discard the trip on failure so the batch stays atomic.
+    """
+    results = []
+    for index, op in enumerate(operations):
+        try:
+            if not isinstance(op, dict):
+                raise OperationError("Operation must be an object")
+            result = apply_operation(trip, op)
+        except OperationError as e:
+            results.append({"index": index, "op": op.get('op') if isinstance(op, dict) else None,
+                            "success": False, "error": e.message, "status": e.status})
+            return results, True
+        results.append({"index": index, "op": op['op'], "success": True, **result})
+    return results, False
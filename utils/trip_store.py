@@ -0,0 +1,203 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from utils.metrics import trip_payload_bytes
+
+
+# Seconds between sweeps for expired trips; they run on save, so an idle store does no work
+PRUNE_INTERVAL = 300
+
+
+class TripStore:
+    """Base class for server-side itinerary storage keyed by trip ID.
+
+    Trips not saved for `ttl` seconds are expired: reads treat them as missing
+    and saves periodically delete them.
+    """
+
+    ttl = None
+
+    def new_id(self):
+        return uuid.uuid4().hex
+
+    def load(self, trip_id):
+        raise NotImplementedError
+
+    def save(self, trip_id, trip_events):
+        """Persists the trip and returns its new version number."""
+        raise NotImplementedError
+
+    def get_version(self, trip_id):
+        """Returns the trip's version, bumped on every save, or None if it does not exist."""
+        raise NotImplementedError
+
+    def delete(self, trip_id):
+        raise NotImplementedError
+
+    def prune(self):
+        """Deletes expired trips; returns how many were removed."""
+        raise NotImplementedError
+
+    def _cutoff(self):
+        return time.time() - self.ttl if self.ttl else 0.0
+
+    def _prune_due(self):
+        now = time.time()
+        if now - self._last_prune < PRUNE_INTERVAL:
+            return False
+        self._last_prune = now
+        return True
+
+
+class MemoryTripStore(TripStore):
+    """Keeps trips in a process-local dict. Intended for tests and local runs.
+
+    Holds at most `max_trips` trips, evicting the least recently saved first.
+    """
+
+    def __init__(self, ttl=None, max_trips=10000):
+        self.ttl = ttl
+        self.max_trips = max_trips
+        self._trips = OrderedDict()  # trip_id -> (data, version, updated_at)
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def _get(self, trip_id):
+        entry = self._trips.get(trip_id)
+        return entry if entry is not None and entry[2] >= self._cutoff() else None
+
+    def load(self, trip_id):
+        with self._lock:
+            entry = self._get(trip_id)
+        # Hand out a copy so callers can mutate freely until they save
+        return json.loads(entry[0]) if entry is not None else None
+
+    def save(self, trip_id, trip_events):
+        data = json.dumps(trip_events)
+        trip_payload_bytes.observe(len(data))
+        with self._lock:
+            entry = self._trips.get(trip_id)
+            version = entry[1] + 1 if entry else 1
+            self._trips[trip_id] = (data, version, time.time())
+            self._trips.move_to_end(trip_id)
+            while len(self._trips) > self.max_trips:
+                self._trips.popitem(last=False)
+        if self.ttl and self._prune_due():
+            self.prune()
+        return version
+
+    def get_version(self, trip_id):
+        with self._lock:
+            entry = self._get(trip_id)
+        return entry[1] if entry else None
+
+    def delete(self, trip_id):
+        with self._lock:
+            self._trips.pop(trip_id, None)
+
+    def prune(self):
+        cutoff = self._cutoff()
+        removed = 0
+        with self._lock:
+            # Saves move trips to the end, so expired ones are at the front
+            while self._trips and next(iter(self._trips.values()))[2] < cutoff:
+                self._trips.popitem(last=False)
+                removed += 1
+        return removed
+
+
+class SQLiteTripStore(TripStore):
+    """Persists trips as JSON rows in a local SQLite database."""
+
+    def __init__(self, path, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_prune = 0.0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS trips ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 1, "
+                "updated_at REAL NOT NULL)"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(trips)")]
+            if "version" not in columns:
+                conn.execute("ALTER TABLE trips ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+            conn.execute("CREATE INDEX IF NOT EXISTS trips_updated_at ON trips (updated_at)")
+
+    def _connect(self):
+        # sqlite3 connections are not shareable across threads, keep one per worker thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, trip_id):
+        row = self._connect().execute(
+            "SELECT data FROM trips WHERE id = ? AND updated_at >= ?", (trip_id, self._cutoff())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, trip_id, trip_events):
+        data = json.dumps(trip_events)
+        trip_payload_bytes.observe(len(data))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO trips (id, data, version, updated_at) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, "
+                "version = trips.version + 1, updated_at = excluded.updated_at",
+                (trip_id, data, time.time())
+            )
+            version = conn.execute("SELECT version FROM trips WHERE id = ?", (trip_id,)).fetchone()[0]
+        if self.ttl and self._prune_due():
+            self.prune()
+        return version
+
+    def get_version(self, trip_id):
+        row = self._connect().execute(
+            "SELECT version FROM trips WHERE id = ? AND updated_at >= ?", (trip_id, self._cutoff())
+        ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, trip_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM trips WHERE id = ?", (trip_id,))
+
+    def prune(self):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM trips WHERE updated_at < ?", (self._cutoff(),)).rowcount
+
+
+_store = None
+
+
+def get_trip_store():
+    """Returns the process-wide trip store, created from the TRIP_STORE* env vars.
+
+    TRIP_STORE_TTL (seconds, default 31 days like Flask's session lifetime; 0
+    keeps trips forever) expires trips that were not saved for that long.
+    """
+    global _store
+    if _store is None:
+        backend = os.getenv("TRIP_STORE", "sqlite").lower()
+        ttl = float(os.getenv("TRIP_STORE_TTL", 31 * 24 * 3600)) or None
+        if backend == "memory":
+            _store = MemoryTripStore(ttl=ttl, max_trips=int(os.getenv("TRIP_STORE_MAX_TRIPS", 10000)))
+        elif backend == "sqlite":
+            _store = SQLiteTripStore(os.getenv("TRIP_STORE_PATH", "trip_store.db"), ttl=ttl)
+        else:
+            raise ValueError(f"❌ Error: Unknown TRIP_STORE backend '{backend}'")
+    return _store
+
+
+def set_trip_store(store):
+    """Replaces the process-wide trip store (e.g. with MemoryTripStore in tests)."""
+    global _store
+    _store = store
@@ -1,25 +1,10 @@
 import json
-import anthropic
 import uuid
-import re
-from flask import session
-
-def extract_json_from_claude(response_text):
-    """Extracts JSON from Claude responses and ensures it is valid."""
-    match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-    json_str = match.group(1) if match else response_text  # Extract JSON block
-
-    try:
-        return json.loads(json_str)  # ✅ Parse JSON safely
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON Parsing Error: {e}")
-        print(f"❌ Raw Response: {response_text}")  # Debugging output
-        return None  # Return None if JSON parsing fails
+from utils.model_router import route_message
+from utils.json_extract import extract_json_from_claude
 
 def generate_trip_plan(natural_input, parameters):
     """Calls Claude AI to generate a structured trip plan including travel logistics."""
-    client = anthropic.Anthropic(api_key=session.get("ANTHROPIC_API_KEY"))
-
     prompt = f"""
     You are an AI assistant that generates structured travel itineraries in JSON format.
 
@@ -32,8 +17,8 @@ def generate_trip_plan(natural_input, parameters):
     """
 
     try:
-        response = client.messages.create(
-            model="claude-3-opus-20240229",
+        response = route_message(
+            "trip_plan",
             max_tokens=4000,
             temperature=0.7,
             system="Generate a JSON itinerary with unique IDs.",